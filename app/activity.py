@@ -0,0 +1,124 @@
+import asyncio
+import logging
+import time
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DAY = 24 * 60 * 60
+# Дни — номера суток от 1970-01-01 по часовому поясу бота
+_EPOCH = date(1970, 1, 1).toordinal()
+
+# Дневные строки старше стольких дней сворачиваются в недельные и месячные
+DAILY_KEEP_DAYS = 35
+# Недельные свёртки старше стольких недель удаляются: дальше хватает месячных
+WEEKLY_KEEP_WEEKS = 12
+# Что показывает /stats: столько последних недель и месяцев
+TREND_WEEKS = 8
+TREND_MONTHS = 3
+# Сжатие истории: раз в столько секунд
+COMPACT_INTERVAL = 6 * 60 * 60
+# Пользователей за одну транзакцию сжатия
+COMPACT_USERS = 2000
+# Первое сжатие — через столько секунд после запуска, когда схема БД уже готова
+COMPACT_DELAY = 60
+
+
+def day_number(timestamp: float, utc_offset: int) -> int:
+    """Номер суток для unix-времени; utc_offset — смещение часового пояса в минутах"""
+    return int((timestamp + utc_offset * 60) // DAY)
+
+
+def week_start(day: int) -> int:
+    """Понедельник недели, в которую попадает день"""
+    return day - (day + 3) % 7  # 1970-01-01 — четверг
+
+
+def month_start(day: int) -> int:
+    """Первое число месяца, в который попадает день"""
+    return day - date.fromordinal(_EPOCH + day).day + 1
+
+
+def months_before(day: int, months: int) -> int:
+    """Первое число месяца, отстоящего от месяца дня на months назад"""
+    current = date.fromordinal(_EPOCH + day)
+    index = current.year * 12 + current.month - 1 - months
+    return date(index // 12, index % 12 + 1, 1).toordinal() - _EPOCH
+
+
+def month_name(day: int) -> str:
+    return ("янв", "фев", "мар", "апр", "май", "июн", "июл", "авг", "сен", "окт",
+            "ноя", "дек")[date.fromordinal(_EPOCH + day).month - 1]
+
+
+def trend_since(today: int) -> Tuple[int, int, int]:
+    """Начала окон /stats: (дневных строк, недельных свёрток, месячных свёрток)"""
+    weeks = week_start(today) - 7 * (TREND_WEEKS - 1)
+    months = months_before(today, TREND_MONTHS - 1)
+    return min(weeks, months), weeks, months
+
+
+def build_trend(rows: Iterable[Tuple[str, int, int, int, int]], today: int) -> Dict:
+    """
+    Недели и месяцы /stats из строк Database.activity_rows: день ("d")
+    попадает и в свою неделю, и в свой месяц, свёртка ("w", "m") — только
+    в свой период. Свёрнутый день из дневной таблицы удалён, так что сумма
+    свёрток и оставшихся дней — точный итог периода.
+    """
+    _, weeks_since, months_since = trend_since(today)
+    weeks = {weeks_since + 7 * i: [0, 0, 0] for i in range(TREND_WEEKS)}
+    months = {months_before(today, TREND_MONTHS - 1 - i): [0, 0, 0] for i in range(TREND_MONTHS)}
+
+    def add(bucket: Optional[List[int]], correct: int, wrong: int, words: int):
+        if bucket is not None:
+            bucket[0] += correct
+            bucket[1] += wrong
+            bucket[2] += words
+
+    for kind, start, correct, wrong, words in rows:
+        if kind == "d":
+            add(weeks.get(week_start(start)), correct, wrong, words)
+            add(months.get(month_start(start)), correct, wrong, words)
+        elif kind == "w":
+            add(weeks.get(start), correct, wrong, words)
+        else:
+            add(months.get(start), correct, wrong, words)
+    return {
+        "weeks": [(start, tuple(totals)) for start, totals in sorted(weeks.items())],
+        "months": [(start, tuple(totals)) for start, totals in sorted(months.items())],
+    }
+
+
+async def compact(db, today: int) -> int:
+    """
+    Свернуть дневные строки старше DAILY_KEEP_DAYS в недельные и месячные
+    (транзакция на COMPACT_USERS пользователей: сбой посреди не теряет
+    и не удваивает счёт) и удалить старые недельные свёртки.
+    Возвращает число свёрнутых дневных строк.
+    """
+    first, last = await db.activity_user_range()
+    rows = 0
+    if first is not None:
+        for start in range(first, last + 1, COMPACT_USERS):
+            rows += await db.compact_activity(start, start + COMPACT_USERS - 1,
+                                              today - DAILY_KEEP_DAYS)
+    dropped = await db.drop_weekly_rollups(week_start(today) - 7 * WEEKLY_KEEP_WEEKS)
+    if rows or dropped:
+        logger.info(f"История активности сжата: дневных строк {rows}, "
+                    f"удалено недельных свёрток {dropped}")
+    return rows
+
+
+async def run_compactor(db, interval: float = COMPACT_INTERVAL, delay: float = COMPACT_DELAY):
+    """
+    Фоновая задача: сжатие вскоре после запуска (бот может перезапускаться
+    чаще интервала) и дальше периодически
+    """
+    await asyncio.sleep(delay)
+    while True:
+        try:
+            await compact(db, day_number(time.time(), db.utc_offset))
+        except Exception as e:
+            logger.error(f"Ошибка сжатия истории активности: {e}")
+        await asyncio.sleep(interval)
@@ -28,7 +28,7 @@ BOT_COMMANDS = [
     BotCommand(command="help", description="Справка по использованию"),
     BotCommand(command="search", description="Поиск слова"),
     BotCommand(command="quiz", description="Мини-квиз для тренировки"),
-    BotCommand(command="stats", description="Статистика изучения"),
+    BotCommand(command="stats", description="Статистика и динамика по неделям"),
 ]
 
 # Приветственное сообщение
@@ -50,6 +50,11 @@ HELP_MESSAGE = """Wordy Dasha — твой помощник в изучении
 Как использовать:
 • Просто напиши слово: run или бежать
 • Или используй команду: /search слово
+• Список слов (по строкам или через запятую) добавлю в словарь целиком
+• /find начало слова или перевода — поиск по твоему словарю
+• /export — выгрузить словарь (csv, jsonl, anki), /import — загрузить из файла
+• /remind 19:30 — напоминать о повторении каждый день, /remind off — выключить
+• /top_learners — рейтинг по правильным ответам в квизах
 
 Что ты получишь:
 • 📖 Перевод и транскрипцию
@@ -0,0 +1,164 @@
+import asyncio
+import logging
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from aiogram import Bot
+
+from .database import Database
+from .sender import Pacer, Priority, deliver, send_priority
+
+logger = logging.getLogger(__name__)
+
+# Получателей за одну выборку и одну контрольную точку: после перезапуска
+# повторно уйдёт не больше одной порции
+BATCH_SIZE = 100
+# Одновременных отправок рассылки: очередь BULK в лимитере не растёт
+CONCURRENCY = 8
+# Доля глобального лимита лимитера для рассылки: остальное — запас
+# интерактивным ответам, которые приходят посреди рассылки
+RATE_SHARE = 0.6
+
+
+class Broadcaster:
+    """
+    Рассылка всем пользователям. Получатели читаются из БД порциями по
+    ключу (users.id), сообщения уходят через лимитер исходящих с
+    приоритетом BULK и собственным темпом rate — интерактивные ответы
+    обгоняют рассылку и не ждут окна. После каждой порции прогресс
+    сохраняется в broadcasts; прерванная остановкой рассылка продолжается
+    с контрольной точки (resume). Заблокировавшие бота помечаются
+    в users.blocked_at и в следующие рассылки не попадают.
+    """
+
+    def __init__(self, db: Database, rate: float, batch_size: int = BATCH_SIZE,
+                 concurrency: int = CONCURRENCY):
+        self.db = db
+        self.rate = rate
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self._task: Optional[asyncio.Task] = None
+        self.current: Optional[Dict] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self, bot: Bot, broadcast: Dict,
+              on_finish: Optional[Callable[[Dict], object]] = None) -> bool:
+        """Запустить рассылку (строку broadcasts) в фоне; False — уже идёт другая"""
+        if self.running:
+            return False
+        self.current = dict(broadcast)
+        self._task = asyncio.create_task(self._run(bot, self.current, on_finish))
+        return True
+
+    async def resume(self, bot: Bot, on_finish: Optional[Callable[[Dict], object]] = None):
+        """Продолжить рассылку, прерванную остановкой (фаза запуска)"""
+        for broadcast in await self.db.get_running_broadcasts():
+            if self.start(bot, broadcast, on_finish):
+                logger.info(f"Рассылка {broadcast['id']} продолжается "
+                            f"после users.id={broadcast['last_user_id']}")
+            else:
+                break
+
+    def cancel(self) -> bool:
+        """Остановить текущую рассылку насовсем (status='cancelled')"""
+        if not self.running:
+            return False
+        self.current["status"] = "cancelled"
+        self._task.cancel()
+        return True
+
+    async def stop(self):
+        """Остановка бота: прогресс сохраняется, после запуска рассылка продолжится"""
+        if self.running:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def _run_batch(self, bot: Bot, broadcast: Dict, pacer: Pacer, slots: asyncio.Semaphore,
+                         recipients: List[Tuple[int, int]]) -> Tuple[int, List[int]]:
+        """
+        Отправляет порцию; возвращает последний users.id, до которого (включительно)
+        все отправки завершены, и telegram_id заблокировавших бота
+        """
+        results: Dict[int, str] = {}
+
+        async def send(user_id: int, telegram_id: int):
+            try:
+                results[user_id] = await deliver(bot, telegram_id, broadcast["text"])
+            finally:
+                slots.release()
+
+        tasks = []
+        try:
+            for user_id, telegram_id in recipients:
+                await slots.acquire()
+                await pacer.tick()
+                tasks.append(asyncio.create_task(send(user_id, telegram_id)))
+            await asyncio.gather(*tasks)
+        finally:
+            # При отмене — дожидаемся уже отправленных, чтобы не повторять их
+            if tasks:
+                await asyncio.shield(asyncio.gather(*tasks, return_exceptions=True))
+            last_done = broadcast["last_user_id"]
+            blocked: List[int] = []
+            for user_id, telegram_id in recipients:
+                outcome = results.get(user_id)
+                if outcome is None:
+                    break
+                broadcast[outcome] += 1
+                if outcome == "blocked":
+                    blocked.append(telegram_id)
+                last_done = user_id
+            broadcast["last_user_id"] = last_done
+            await self._checkpoint(broadcast, blocked)
+        return last_done, blocked
+
+    async def _checkpoint(self, broadcast: Dict, blocked: List[int]):
+        await self.db.save_broadcast_progress(
+            broadcast["id"], broadcast["last_user_id"], broadcast["sent"],
+            broadcast["blocked"], broadcast["failed"], blocked, broadcast["status"],
+        )
+
+    async def _run(self, bot: Bot, broadcast: Dict, on_finish):
+        pacer = Pacer(self.rate)
+        slots = asyncio.Semaphore(self.concurrency)
+        broadcast["status"] = "running"
+        started = time.monotonic()
+        try:
+            with send_priority(Priority.BULK):
+                while True:
+                    recipients = await self.db.get_broadcast_recipients(
+                        broadcast["last_user_id"], self.batch_size
+                    )
+                    if not recipients:
+                        break
+                    await self._run_batch(bot, broadcast, pacer, slots, recipients)
+            broadcast["status"] = "done"
+            await self._checkpoint(broadcast, [])
+        except asyncio.CancelledError:
+            if broadcast["status"] == "cancelled":
+                await asyncio.shield(self._checkpoint(broadcast, []))
+            raise
+        except Exception as e:
+            logger.error(f"Рассылка {broadcast['id']} прервана: {e}")
+            raise
+        finally:
+            logger.info(f"Рассылка {broadcast['id']}: {broadcast['status']}, "
+                        f"отправлено {broadcast['sent']}, заблокировали {broadcast['blocked']}, "
+                        f"ошибок {broadcast['failed']} за {time.monotonic() - started:.0f} с")
+            if on_finish and broadcast["status"] in ("done", "cancelled"):
+                try:
+                    await on_finish(broadcast)
+                except Exception as e:
+                    logger.error(f"Ошибка уведомления о рассылке: {e}")
+
+    def stats(self) -> Dict:
+        if self.current is None:
+            return {"running": False}
+        keys = ("id", "status", "last_user_id", "sent", "blocked", "failed")
+        return {"running": self.running, **{key: self.current[key] for key in keys}}
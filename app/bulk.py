@@ -0,0 +1,105 @@
+import asyncio
+import itertools
+import logging
+import re
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from .skyeng_client import SkyengClient, SkyengUnavailable
+
+logger = logging.getLogger(__name__)
+
+# Больше слов за раз не ищем: остальные пользователь пришлёт вторым сообщением
+MAX_BULK_WORDS = 100
+# Одновременных запросов к Skyeng на один список
+BULK_CONCURRENCY = 8
+# Сколько последних списков помним для листания страниц итога
+MAX_BULK_RESULTS = 256
+BULK_PAGE_SIZE = 10
+
+# Разделители списка: строки, запятые, точки с запятой
+_SEPARATORS = re.compile(r"[\n,;]+")
+# Нумерация и маркеры в начале строки: "1.", "2)", "-", "•", "*"
+_BULLET = re.compile(r"^\s*(?:\d+[.)]|[-•*–—])\s*")
+
+
+def parse_word_list(text: str) -> Optional[List[str]]:
+    """
+    Список слов из сообщения: по строкам или через запятую. Маркеры и
+    нумерация снимаются, регистр и пробелы нормализуются, повторы
+    отбрасываются с сохранением порядка. None — это не список, а обычный
+    запрос (одно слово или фраза).
+    """
+    if not _SEPARATORS.search(text):
+        return None
+    words = []
+    seen = set()
+    for item in _SEPARATORS.split(text):
+        word = " ".join(_BULLET.sub("", item).split()).lower()
+        if word and word not in seen:
+            seen.add(word)
+            words.append(word)
+    if len(words) < 2:
+        return None
+    return words[:MAX_BULK_WORDS]
+
+
+async def lookup_words(skyeng: SkyengClient, words: List[str],
+                       concurrency: int = BULK_CONCURRENCY) -> List[Tuple[str, Optional[Dict]]]:
+    """
+    Ищет слова параллельно, не больше concurrency запросов сразу; запросы
+    идут через кеш и объединение одинаковых запросов SkyengClient.
+    Возвращает (слово, первое значение со словом в "word" или None) в
+    исходном порядке. Если предохранитель Skyeng разомкнут, оставшиеся
+    слова не ищутся.
+    """
+    slots = asyncio.Semaphore(concurrency)
+
+    async def lookup(word: str) -> Optional[Dict]:
+        async with slots:
+            try:
+                found = await skyeng.search_words(word)
+            except SkyengUnavailable:
+                raise
+            except Exception as e:
+                logger.warning(f"Слово '{word}' из списка не найдено: {e}")
+                return None
+        if not found or not found[0].get("meanings"):
+            return None
+        meaning = dict(found[0]["meanings"][0])
+        meaning["word"] = found[0]["text"]
+        return meaning
+
+    tasks = [asyncio.ensure_future(lookup(word)) for word in words]
+    try:
+        meanings = await asyncio.gather(*tasks)
+    except BaseException:
+        # gather не отменяет остальные: без этого они продолжили бы ходить в Skyeng
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+    return list(zip(words, meanings))
+
+
+class BulkResults:
+    """Итоги последних списков для листания: id -> [(слово, перевод или None)]"""
+
+    def __init__(self, size: int = MAX_BULK_RESULTS):
+        self.size = size
+        self._items: "OrderedDict[int, List[Tuple[str, Optional[str]]]]" = OrderedDict()
+        self._ids = itertools.count(1)
+
+    def put(self, rows: List[Tuple[str, Optional[str]]]) -> int:
+        bulk_id = next(self._ids)
+        self._items[bulk_id] = rows
+        if len(self._items) > self.size:
+            self._items.popitem(last=False)
+        return bulk_id
+
+    def get(self, bulk_id: int) -> Optional[List[Tuple[str, Optional[str]]]]:
+        return self._items.get(bulk_id)
+
+
+def page_count(total: int, page_size: int = BULK_PAGE_SIZE) -> int:
+    return max(1, -(-total // page_size))
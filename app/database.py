@@ -1,17 +1,151 @@
 import aiosqlite
+import asyncio
 import logging
-from typing import Dict, List, Optional
+import random
+import re
+import time
+from typing import AsyncIterator, Callable, Dict, Iterable, List, Optional, Tuple
+
+from .activity import day_number
 
 logger = logging.getLogger(__name__)
 
+# Сколько раз добираем кандидатов при выборке, если часть отсеялась
+SAMPLE_MAX_ROUNDS = 8
+# Как часто сбрасываем накопленные ответы квиза одной транзакцией
+FLUSH_INTERVAL = 2.0
+# Не больше стольких слов в запросе /find (каждое — префиксный терм FTS5)
+MAX_SEARCH_TERMS = 8
+# Минимальная длина слова в запросе /find (короче — слишком дорогой префикс)
+MIN_SEARCH_TERM = 2
+# По стольким пользователям за запрос читаем счёт после сброса ответов
+STATS_CHUNK = 500
+
+# Полнотекстовый индекс словарей: строка на запись user_words (rowid = user_words.id),
+# владелец — токен "u<user_id>", чтобы поиск шёл только по своим словам.
+# Contentless: сами тексты лежат в words, индекс хранит только токены.
+# unicode61 приводит регистр и латиницу, и кириллицу; ё заменяем на е сами.
+FTS_SCHEMA = """
+    CREATE VIRTUAL TABLE dictionary_fts USING fts5(
+        owner, word, translation,
+        content='', tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )
+"""
+FTS_TRIGGERS = (
+    """
+    CREATE TRIGGER IF NOT EXISTS user_words_fts_insert AFTER INSERT ON user_words BEGIN
+        INSERT INTO dictionary_fts (rowid, owner, word, translation)
+        SELECT NEW.id, 'u' || NEW.user_id, replace(replace(w.word, 'ё', 'е'), 'Ё', 'Е'),
+               replace(replace(w.translation, 'ё', 'е'), 'Ё', 'Е')
+        FROM words w WHERE w.id = NEW.word_id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS user_words_fts_delete AFTER DELETE ON user_words BEGIN
+        INSERT INTO dictionary_fts (dictionary_fts, rowid, owner, word, translation)
+        SELECT 'delete', OLD.id, 'u' || OLD.user_id,
+               replace(replace(w.word, 'ё', 'е'), 'Ё', 'Е'),
+               replace(replace(w.translation, 'ё', 'е'), 'Ё', 'Е')
+        FROM words w WHERE w.id = OLD.word_id;
+    END
+    """,
+)
+
+
+def fts_query(user_id: int, text: str) -> Optional[str]:
+    """
+    Запрос FTS5 из пользовательского ввода: каждое слово — префиксный терм
+    в кавычках (операторы и спецсимволы FTS5 не проходят), все обязательны
+    и ищутся только в слове и переводе (не в owner: иначе «u» совпало бы
+    с «u<id>» у каждой записи) среди слов владельца.
+    Слова короче MIN_SEARCH_TERM отбрасываются: префикс из одной буквы
+    не покрыт индексом prefix='2 3' и читает весь список совпадений по базе.
+    None — искать нечего.
+    """
+    terms = [term for term in re.findall(r"\w+", text.lower().replace("ё", "е"))
+             if len(term) >= MIN_SEARCH_TERM][:MAX_SEARCH_TERMS]
+    if not terms:
+        return None
+    return f"owner:u{user_id} AND " + " AND ".join(
+        f'{{word translation}} : "{term}"*' for term in terms)
+
+
 class Database:
     def __init__(self, db_path: str = "data/bot_database.db"):
         self.db_path = db_path
+        # Подписчики на добавление слов: callback(user_id, word, translation, part_of_speech)
+        self._word_listeners: List[Callable[[int, str, str, Optional[str]], None]] = []
+        # Подписчики на изменение правильных ответов: callback([(user_id, было, стало)])
+        self._stats_listeners: List[Callable[[List[Tuple[int, int, int]]], None]] = []
+        # Подписчики на ошибки, которые метод перехватил и заменил пустым
+        # результатом: callback(имя метода). Проброшенные видит вызывающий
+        self._error_listeners: List[Callable[[str], None]] = []
+        # Буфер ответов квиза: user_id -> [правильных, неправильных]
+        # и (user_id, user_word_id) -> изменение wrong_count
+        self._pending_stats: Dict[int, List[int]] = {}
+        self._pending_word_answers: Dict[Tuple[int, int], int] = {}
+        # и (user_id, день) -> [правильных, неправильных, добавлено слов] для activity_daily
+        self._pending_activity: Dict[Tuple[int, int], List[int]] = {}
+        self._flush_lock = asyncio.Lock()
+        # Часовой пояс бота (смещение от UTC в минутах): граница суток в истории активности
+        self.utc_offset = 0
+        # Есть ли FTS5 (выясняется в init)
+        self.search_enabled = True
+    
+    def add_word_listener(self, callback: Callable[[int, str, str, Optional[str]], None]):
+        """Подписаться на добавление слов в словари пользователей"""
+        self._word_listeners.append(callback)
+    
+    def _notify_word_added(self, user_id: int, word: str, translation: str,
+                           part_of_speech: Optional[str]):
+        for callback in self._word_listeners:
+            try:
+                callback(user_id, word, translation, part_of_speech)
+            except Exception as e:
+                logger.error(f"Ошибка в подписчике на добавление слова: {e}")
+    
+    def add_stats_listener(self, callback: Callable[[List[Tuple[int, int, int]]], None]):
+        """Подписаться на изменение числа правильных ответов (после записи в БД)"""
+        self._stats_listeners.append(callback)
+    
+    def _notify_stats_changed(self, changes: List[Tuple[int, int, int]]):
+        for callback in self._stats_listeners:
+            try:
+                callback(changes)
+            except Exception as e:
+                logger.error(f"Ошибка в подписчике на статистику: {e}")
+    
+    def add_error_listener(self, callback: Callable[[str], None]):
+        """Подписаться на ошибки БД, которые метод не пробрасывает (метрика db_errors_total)"""
+        self._error_listeners.append(callback)
+    
+    def _notify_error(self, method: str):
+        for callback in self._error_listeners:
+            try:
+                callback(method)
+            except Exception as e:
+                logger.error(f"Ошибка в подписчике на ошибки БД: {e}")
+    
+    async def _correct_answers(self, db: aiosqlite.Connection,
+                               user_ids: List[int]) -> Dict[int, int]:
+        """Текущие правильные ответы пользователей (внутри транзакции записи)"""
+        result = {}
+        for start in range(0, len(user_ids), STATS_CHUNK):
+            chunk = user_ids[start:start + STATS_CHUNK]
+            cursor = await db.execute(
+                f"SELECT user_id, correct_answers FROM user_stats "
+                f"WHERE user_id IN ({','.join('?' * len(chunk))})", chunk
+            )
+            result.update(await cursor.fetchall())
+        return result
     
     async def init(self):
         """Инициализация базы данных"""
         try:
             async with aiosqlite.connect(self.db_path) as db:
+                # WAL: читатели не блокируют писателя, в т.ч. из разных процессов-воркеров
+                await db.execute("PRAGMA journal_mode=WAL")
+                
                 # Создаем таблицу пользователей
                 await db.execute("""
                     CREATE TABLE IF NOT EXISTS users (
@@ -31,6 +165,7 @@ class Database:
                         translation TEXT NOT NULL,
                         transcription TEXT,
                         examples TEXT,
+                        part_of_speech TEXT,
                         created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
                     )
                 """)
@@ -43,6 +178,8 @@ class Database:
                         word_id INTEGER NOT NULL,
                         mastered BOOLEAN DEFAULT FALSE,
                         added_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        seq INTEGER,
+                        wrong_count INTEGER DEFAULT 0,
                         FOREIGN KEY (user_id) REFERENCES users (id),
                         FOREIGN KEY (word_id) REFERENCES words (id)
                     )
@@ -59,6 +196,85 @@ class Database:
                     )
                 """)
                 
+                # Рассылки: прогресс (последний обработанный users.id) переживает перезапуск
+                await db.execute("""
+                    CREATE TABLE IF NOT EXISTS broadcasts (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        text TEXT NOT NULL,
+                        created_by INTEGER NOT NULL,
+                        status TEXT NOT NULL DEFAULT 'draft',
+                        last_user_id INTEGER NOT NULL DEFAULT 0,
+                        sent INTEGER NOT NULL DEFAULT 0,
+                        blocked INTEGER NOT NULL DEFAULT 0,
+                        failed INTEGER NOT NULL DEFAULT 0,
+                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        finished_at TIMESTAMP
+                    )
+                """)
+                
+                # Напоминания о повторении: время по местному часовому поясу
+                # пользователя и ближайшее срабатывание (unix-время, UTC).
+                # Индекс по next_at — очередь с приоритетом: планировщик
+                # читает из него только наступившие
+                await db.execute("""
+                    CREATE TABLE IF NOT EXISTS reminders (
+                        user_id INTEGER PRIMARY KEY,
+                        local_minute INTEGER NOT NULL,
+                        utc_offset INTEGER NOT NULL,
+                        next_at INTEGER NOT NULL,
+                        FOREIGN KEY (user_id) REFERENCES users (id)
+                    )
+                """)
+                await db.execute(
+                    "CREATE INDEX IF NOT EXISTS idx_reminders_next_at ON reminders (next_at)"
+                )
+                
+                # Популярность слов: топ каждого окна подсчёта (app.popularity)
+                # дописывается сюда; по ней — /top и прогрев кеша Skyeng
+                await db.execute("""
+                    CREATE TABLE IF NOT EXISTS word_popularity (
+                        word TEXT PRIMARY KEY,
+                        searches INTEGER NOT NULL DEFAULT 0,
+                        last_searched TIMESTAMP
+                    )
+                """)
+                await db.execute(
+                    "CREATE INDEX IF NOT EXISTS idx_word_popularity_searches "
+                    "ON word_popularity (searches)"
+                )
+                
+                # История активности: строка на пользователя и день (номер
+                # суток от 1970-01-01), пишется вместе со сбросом ответов квиза.
+                # Старые дни сворачиваются в activity_rollups (app.activity)
+                await db.execute("""
+                    CREATE TABLE IF NOT EXISTS activity_daily (
+                        user_id INTEGER NOT NULL,
+                        day INTEGER NOT NULL,
+                        correct INTEGER NOT NULL DEFAULT 0,
+                        wrong INTEGER NOT NULL DEFAULT 0,
+                        words_added INTEGER NOT NULL DEFAULT 0,
+                        PRIMARY KEY (user_id, day)
+                    ) WITHOUT ROWID
+                """)
+                # Свёртки: kind 'w' — неделя с понедельника start, 'm' — месяц с первого числа
+                await db.execute("""
+                    CREATE TABLE IF NOT EXISTS activity_rollups (
+                        user_id INTEGER NOT NULL,
+                        kind TEXT NOT NULL,
+                        start INTEGER NOT NULL,
+                        correct INTEGER NOT NULL DEFAULT 0,
+                        wrong INTEGER NOT NULL DEFAULT 0,
+                        words_added INTEGER NOT NULL DEFAULT 0,
+                        PRIMARY KEY (user_id, kind, start)
+                    ) WITHOUT ROWID
+                """)
+                await db.execute(
+                    "CREATE INDEX IF NOT EXISTS idx_activity_rollups_kind_start "
+                    "ON activity_rollups (kind, start)"
+                )
+                
+                await self._migrate(db)
+                
                 await db.commit()
                 logger.info("База данных инициализирована")
                 
@@ -66,6 +282,115 @@ class Database:
             logger.error(f"Ошибка инициализации БД: {e}")
             raise
     
+    async def _migrate(self, db: aiosqlite.Connection):
+        """Доводит схему старых баз до текущей"""
+        cursor = await db.execute("PRAGMA table_info(users)")
+        if "blocked_at" not in {row[1] for row in await cursor.fetchall()}:
+            # Когда пользователь заблокировал бота (рассылки его пропускают)
+            await db.execute("ALTER TABLE users ADD COLUMN blocked_at TIMESTAMP")
+        
+        cursor = await db.execute("PRAGMA table_info(words)")
+        if "part_of_speech" not in {row[1] for row in await cursor.fetchall()}:
+            await db.execute("ALTER TABLE words ADD COLUMN part_of_speech TEXT")
+        
+        cursor = await db.execute("PRAGMA table_info(user_words)")
+        columns = {row[1] for row in await cursor.fetchall()}
+        
+        if "wrong_count" not in columns:
+            await db.execute(
+                "ALTER TABLE user_words ADD COLUMN wrong_count INTEGER DEFAULT 0"
+            )
+        
+        if "seq" not in columns:
+            # seq — плотный порядковый номер слова внутри словаря пользователя
+            # (1..N), по нему выборка случайных слов идёт без сортировки
+            await db.execute("ALTER TABLE user_words ADD COLUMN seq INTEGER")
+            await db.execute("""
+                UPDATE user_words SET seq = (
+                    SELECT rn FROM (
+                        SELECT id, ROW_NUMBER() OVER (
+                            PARTITION BY user_id ORDER BY id
+                        ) AS rn
+                        FROM user_words
+                    ) numbered
+                    WHERE numbered.id = user_words.id
+                )
+            """)
+            logger.info("Миграция: заполнен user_words.seq")
+        
+        await db.execute("""
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_user_words_user_seq
+            ON user_words (user_id, seq)
+        """)
+        await db.execute("""
+            CREATE INDEX IF NOT EXISTS idx_user_words_weak
+            ON user_words (user_id) WHERE wrong_count > 0
+        """)
+        
+        # Рейтинг: гистограмма очков и топ читаются по индексу, без сортировки
+        await db.execute("""
+            CREATE INDEX IF NOT EXISTS idx_user_stats_correct
+            ON user_stats (correct_answers DESC, wrong_answers)
+        """)
+        
+        await self._create_search_index(db)
+    
+    async def _create_search_index(self, db: aiosqlite.Connection):
+        """Индекс FTS5 для /find: создаётся и заполняется один раз, дальше — триггерами"""
+        cursor = await db.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'dictionary_fts'"
+        )
+        if await cursor.fetchone() is None:
+            try:
+                await db.execute(FTS_SCHEMA)
+            except aiosqlite.OperationalError as e:
+                # SQLite собран без FTS5: бот работает, /find отвечает, что поиск недоступен
+                logger.warning(f"FTS5 недоступен, поиск по словарю отключён: {e}")
+                self.search_enabled = False
+                return
+            started = time.perf_counter()
+            await db.execute("""
+                INSERT INTO dictionary_fts (rowid, owner, word, translation)
+                SELECT uw.id, 'u' || uw.user_id,
+                       replace(replace(w.word, 'ё', 'е'), 'Ё', 'Е'),
+                       replace(replace(w.translation, 'ё', 'е'), 'Ё', 'Е')
+                FROM user_words uw JOIN words w ON w.id = uw.word_id
+            """)
+            logger.info(f"Миграция: построен индекс поиска по словарям за "
+                        f"{time.perf_counter() - started:.1f} с")
+        for trigger in FTS_TRIGGERS:
+            await db.execute(trigger)
+        self.search_enabled = True
+
+    async def warm_up(self):
+        """
+        Прогрев после деплоя: первые запросы пользователей не должны
+        ждать чтения файла БД с диска и планировщика SQLite.
+        Проходит по горячим индексам и обновляет статистику (PRAGMA optimize).
+        """
+        try:
+            async with aiosqlite.connect(self.db_path) as db:
+                await db.execute("PRAGMA optimize")
+                for query in (
+                    "SELECT COUNT(*) FROM users",
+                    "SELECT COUNT(*) FROM user_words INDEXED BY idx_user_words_user_seq",
+                    "SELECT COUNT(*) FROM words",
+                    "SELECT COUNT(*) FROM user_stats",
+                ):
+                    cursor = await db.execute(query)
+                    await cursor.fetchone()
+        except Exception as e:
+            logger.error(f"Ошибка прогрева БД: {e}")
+            raise
+
+    async def ping(self) -> float:
+        """Проверка БД для /health: открыть соединение и выполнить запрос; время в секундах"""
+        started = time.perf_counter()
+        async with aiosqlite.connect(self.db_path) as db:
+            cursor = await db.execute("SELECT COUNT(*) FROM users WHERE id = 1")
+            await cursor.fetchone()
+        return time.perf_counter() - started
+
     async def get_user_by_telegram_id(self, telegram_id: int) -> Optional[Dict]:
         """Получить пользователя по telegram_id"""
         try:
@@ -82,6 +407,7 @@ class Database:
                 
         except Exception as e:
             logger.error(f"Ошибка получения пользователя: {e}")
+            self._notify_error("get_user_by_telegram_id")
             return None
 
     async def get_or_create_user(self, telegram_id: int, username: str = None, first_name: str = None) -> Dict:
@@ -129,33 +455,91 @@ class Database:
     
     async def add_word_to_user(self, user_id: int, meaning: Dict):
         """Добавить слово в словарь пользователя"""
+        word = meaning.get('word', '')  # Английское слово
+        translation = meaning.get('translation', {}).get('text', '')  # Русский перевод
+        part_of_speech = meaning.get('partOfSpeechCode')
         try:
             async with aiosqlite.connect(self.db_path) as db:
                 # Добавляем слово в общую таблицу
                 cursor = await db.execute(
-                    "INSERT INTO words (word, translation, transcription, examples) VALUES (?, ?, ?, ?)",
+                    "INSERT INTO words (word, translation, transcription, examples, part_of_speech) "
+                    "VALUES (?, ?, ?, ?, ?)",
                     (
-                        meaning.get('word', ''),  # Английское слово
-                        meaning.get('translation', {}).get('text', ''),  # Русский перевод
+                        word,
+                        translation,
                         meaning.get('transcription', ''),
-                        str(meaning.get('examples', []))
+                        str(meaning.get('examples', [])),
+                        part_of_speech
                     )
                 )
                 word_id = cursor.lastrowid
                 
-                # Добавляем в словарь пользователя
-                await db.execute(
-                    "INSERT INTO user_words (user_id, word_id) VALUES (?, ?)",
-                    (user_id, word_id)
-                )
+                # Добавляем в словарь пользователя под следующим seq
+                await db.execute("""
+                    INSERT INTO user_words (user_id, word_id, seq)
+                    VALUES (?, ?, (
+                        SELECT COALESCE(MAX(seq), 0) + 1
+                        FROM user_words WHERE user_id = ?
+                    ))
+                """, (user_id, word_id, user_id))
                 
                 await db.commit()
-                logger.info(f"Слово добавлено в словарь пользователя {user_id}")
+                logger.debug("Слово добавлено в словарь", extra={"user_id": user_id})
                 
         except Exception as e:
             logger.error(f"Ошибка добавления слова: {e}")
             raise
-    
+        
+        self._queue_activity(user_id, words_added=1)
+        self._notify_word_added(user_id, word, translation, part_of_speech)
+
+    async def add_words_to_user(self, user_id: int, meanings: List[Dict]) -> int:
+        """
+        Добавить список слов одной транзакцией (executemany); возвращает
+        число добавленных. Записи user_words получают seq подряд в порядке списка.
+        """
+        if not meanings:
+            return 0
+        rows = [(
+            meaning.get('word', ''),
+            meaning.get('translation', {}).get('text', ''),
+            meaning.get('transcription', ''),
+            str(meaning.get('examples', [])),
+            meaning.get('partOfSpeechCode'),
+        ) for meaning in meanings]
+        try:
+            async with aiosqlite.connect(self.db_path) as db:
+                # Блокировка записи сразу: id новых слов идут подряд, и последний
+                # известен из last_insert_rowid(); seq никто не займёт до commit
+                await db.execute("BEGIN IMMEDIATE")
+                await db.executemany(
+                    "INSERT INTO words (word, translation, transcription, examples, part_of_speech) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    rows
+                )
+                cursor = await db.execute("SELECT last_insert_rowid()")
+                last_word_id = (await cursor.fetchone())[0]
+                cursor = await db.execute(
+                    "SELECT COALESCE(MAX(seq), 0) FROM user_words WHERE user_id = ?", (user_id,)
+                )
+                last_seq = (await cursor.fetchone())[0]
+                first_word_id = last_word_id - len(rows) + 1
+                await db.executemany(
+                    "INSERT INTO user_words (user_id, word_id, seq) VALUES (?, ?, ?)",
+                    [(user_id, first_word_id + i, last_seq + 1 + i) for i in range(len(rows))]
+                )
+                await db.commit()
+                logger.debug("Добавлено %d слов списком", len(rows), extra={"user_id": user_id})
+
+        except Exception as e:
+            logger.error(f"Ошибка добавления списка слов: {e}")
+            raise
+
+        self._queue_activity(user_id, words_added=len(rows))
+        for word, translation, _, _, part_of_speech in rows:
+            self._notify_word_added(user_id, word, translation, part_of_speech)
+        return len(rows)
+
     async def get_user_words(self, telegram_id: int, limit: int = 10) -> List[Dict]:
         """Получить слова пользователя"""
         try:
@@ -177,8 +561,276 @@ class Database:
                 
         except Exception as e:
             logger.error(f"Ошибка получения слов пользователя: {e}")
+            self._notify_error("get_user_words")
             return []
     
+    async def iter_user_words(self, user_id: int,
+                              batch_size: int = 1000) -> AsyncIterator[List[Dict]]:
+        """
+        Весь словарь пользователя порциями по batch_size в порядке добавления.
+        Строки читаются из курсора по мере надобности (fetchmany), а не
+        целиком: подходит для словарей в сотни тысяч слов.
+        """
+        async with aiosqlite.connect(self.db_path) as db:
+            db.row_factory = aiosqlite.Row
+            cursor = await db.execute("""
+                SELECT w.word, w.translation, w.transcription, w.part_of_speech
+                FROM user_words uw
+                JOIN words w ON uw.word_id = w.id
+                WHERE uw.user_id = ?
+                ORDER BY uw.seq
+            """, (user_id,))
+            while True:
+                rows = await cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield [dict(row) for row in rows]
+    
+    async def search_user_words(self, user_id: int, text: str, limit: int = 10,
+                                offset: int = 0) -> List[Dict]:
+        """
+        Поиск по словарю пользователя (слово и перевод, по началу слов),
+        лучшие совпадения первыми (bm25, совпадение в слове весит больше).
+        """
+        query = fts_query(user_id, text)
+        if query is None or not self.search_enabled:
+            return []
+        try:
+            async with aiosqlite.connect(self.db_path) as db:
+                db.row_factory = aiosqlite.Row
+                cursor = await db.execute("""
+                    SELECT uw.id AS user_word_id, w.word, w.translation, w.transcription
+                    FROM dictionary_fts f
+                    JOIN user_words uw ON uw.id = f.rowid
+                    JOIN words w ON w.id = uw.word_id
+                    WHERE dictionary_fts MATCH ?
+                    ORDER BY bm25(dictionary_fts, 0.0, 10.0, 5.0)
+                    LIMIT ? OFFSET ?
+                """, (query, limit, offset))
+                return [dict(row) for row in await cursor.fetchall()]
+                
+        except Exception as e:
+            logger.error(f"Ошибка поиска по словарю: {e}")
+            raise
+    
+    async def word_frequencies(self, limit: int, recent_rows: int) -> List[Tuple[str, int]]:
+        """
+        Самые частые слова и однословные переводы среди последних recent_rows
+        строк words (словарь для индекса опечаток), частые — первыми.
+        Окно ограничивает чтение на больших базах: полный проход по words
+        с группировкой занимал бы минуты.
+        """
+        try:
+            async with aiosqlite.connect(self.db_path) as db:
+                cursor = await db.execute("""
+                    WITH recent AS (
+                        SELECT word, translation FROM words
+                        WHERE id > (SELECT COALESCE(MAX(id), 0) FROM words) - ?
+                    )
+                    SELECT text, COUNT(*) AS uses FROM (
+                        SELECT word AS text FROM recent
+                        UNION ALL
+                        SELECT translation FROM recent WHERE translation NOT LIKE '% %'
+                    )
+                    GROUP BY text
+                    ORDER BY uses DESC
+                    LIMIT ?
+                """, (recent_rows, limit))
+                return [(row[0], row[1]) for row in await cursor.fetchall()]
+                
+        except Exception as e:
+            logger.error(f"Ошибка чтения частот слов: {e}")
+            raise
+    
+    async def get_broadcast_recipients(self, after_user_id: int, limit: int) -> List[Tuple[int, int]]:
+        """
+        Следующая порция получателей рассылки: (users.id, telegram_id) с id
+        больше after_user_id, без заблокировавших бота. Постранично по ключу:
+        каждая порция — короткий запрос по первичному ключу, без OFFSET и
+        без долгой читающей транзакции.
+        """
+        async with aiosqlite.connect(self.db_path) as db:
+            cursor = await db.execute(
+                "SELECT id, telegram_id FROM users "
+                "WHERE id > ? AND blocked_at IS NULL ORDER BY id LIMIT ?",
+                (after_user_id, limit)
+            )
+            return [(row[0], row[1]) for row in await cursor.fetchall()]
+    
+    async def create_broadcast(self, text: str, created_by: int) -> int:
+        async with aiosqlite.connect(self.db_path) as db:
+            cursor = await db.execute(
+                "INSERT INTO broadcasts (text, created_by) VALUES (?, ?)", (text, created_by)
+            )
+            await db.commit()
+            return cursor.lastrowid
+    
+    async def get_broadcast(self, broadcast_id: int) -> Optional[Dict]:
+        async with aiosqlite.connect(self.db_path) as db:
+            db.row_factory = aiosqlite.Row
+            cursor = await db.execute("SELECT * FROM broadcasts WHERE id = ?", (broadcast_id,))
+            row = await cursor.fetchone()
+            return dict(row) if row else None
+    
+    async def get_running_broadcasts(self) -> List[Dict]:
+        """Рассылки, прерванные остановкой бота: их продолжают с last_user_id"""
+        async with aiosqlite.connect(self.db_path) as db:
+            db.row_factory = aiosqlite.Row
+            cursor = await db.execute(
+                "SELECT * FROM broadcasts WHERE status = 'running' ORDER BY id"
+            )
+            return [dict(row) for row in await cursor.fetchall()]
+    
+    async def save_broadcast_progress(self, broadcast_id: int, last_user_id: int, sent: int,
+                                      blocked: int, failed: int, blocked_users: List[int],
+                                      status: str = 'running'):
+        """
+        Контрольная точка рассылки одной транзакцией: прогресс, статус и
+        пометка заблокировавших бота (по telegram_id).
+        """
+        try:
+            async with aiosqlite.connect(self.db_path) as db:
+                await db.executemany(
+                    "UPDATE users SET blocked_at = CURRENT_TIMESTAMP WHERE telegram_id = ?",
+                    [(telegram_id,) for telegram_id in blocked_users]
+                )
+                await db.execute("""
+                    UPDATE broadcasts
+                    SET last_user_id = ?, sent = ?, blocked = ?, failed = ?, status = ?,
+                        finished_at = CASE WHEN ? IN ('done', 'cancelled')
+                                           THEN CURRENT_TIMESTAMP END
+                    WHERE id = ?
+                """, (last_user_id, sent, blocked, failed, status, status, broadcast_id))
+                await db.commit()
+                
+        except Exception as e:
+            logger.error(f"Ошибка сохранения прогресса рассылки {broadcast_id}: {e}")
+            raise
+    
+    async def unblock_user(self, telegram_id: int):
+        """Пользователь снова написал боту — рассылки опять до него доходят"""
+        async with aiosqlite.connect(self.db_path) as db:
+            await db.execute(
+                "UPDATE users SET blocked_at = NULL "
+                "WHERE telegram_id = ? AND blocked_at IS NOT NULL",
+                (telegram_id,)
+            )
+            await db.commit()
+    
+    async def set_reminder(self, user_id: int, local_minute: int, utc_offset: int, next_at: int):
+        """Включить или перенастроить напоминание (local_minute — минута суток, utc_offset — в минутах)"""
+        async with aiosqlite.connect(self.db_path) as db:
+            await db.execute("""
+                INSERT INTO reminders (user_id, local_minute, utc_offset, next_at)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(user_id) DO UPDATE SET
+                    local_minute = excluded.local_minute,
+                    utc_offset = excluded.utc_offset,
+                    next_at = excluded.next_at
+            """, (user_id, local_minute, utc_offset, next_at))
+            await db.commit()
+    
+    async def delete_reminder(self, user_id: int) -> bool:
+        async with aiosqlite.connect(self.db_path) as db:
+            cursor = await db.execute("DELETE FROM reminders WHERE user_id = ?", (user_id,))
+            await db.commit()
+            return cursor.rowcount > 0
+    
+    async def get_reminder(self, user_id: int) -> Optional[Dict]:
+        async with aiosqlite.connect(self.db_path) as db:
+            db.row_factory = aiosqlite.Row
+            cursor = await db.execute("SELECT * FROM reminders WHERE user_id = ?", (user_id,))
+            row = await cursor.fetchone()
+            return dict(row) if row else None
+    
+    async def next_reminder_at(self) -> Optional[int]:
+        """Ближайшее срабатывание: MIN по индексу — одна страница B-дерева"""
+        async with aiosqlite.connect(self.db_path) as db:
+            cursor = await db.execute("SELECT MIN(next_at) FROM reminders")
+            row = await cursor.fetchone()
+            return row[0]
+    
+    async def due_reminders(self, now: int, limit: int) -> List[Dict]:
+        """
+        Наступившие напоминания (next_at <= now, самые ранние первыми) вместе
+        с тем, что нужно для текста: размер словаря и число слов с ошибками.
+        Счётчики — одним сгруппированным запросом на всю порцию.
+        """
+        async with aiosqlite.connect(self.db_path) as db:
+            db.row_factory = aiosqlite.Row
+            cursor = await db.execute("""
+                SELECT r.user_id, r.local_minute, r.utc_offset, r.next_at,
+                       u.telegram_id, u.blocked_at
+                FROM reminders r JOIN users u ON u.id = r.user_id
+                WHERE r.next_at <= ?
+                ORDER BY r.next_at
+                LIMIT ?
+            """, (now, limit))
+            rows = [dict(row) for row in await cursor.fetchall()]
+            if not rows:
+                return rows
+            
+            placeholders = ",".join("?" * len(rows))
+            cursor = await db.execute(f"""
+                SELECT user_id, COUNT(*) AS words,
+                       COALESCE(SUM(wrong_count > 0), 0) AS weak
+                FROM user_words
+                WHERE user_id IN ({placeholders})
+                GROUP BY user_id
+            """, [row["user_id"] for row in rows])
+            counts = {row["user_id"]: (row["words"], row["weak"])
+                      for row in await cursor.fetchall()}
+            for row in rows:
+                row["words"], row["weak"] = counts.get(row["user_id"], (0, 0))
+            return rows
+    
+    async def reschedule_reminders(self, updates: List[Tuple[int, int]],
+                                   blocked_users: List[int]):
+        """
+        Итог порции напоминаний одной транзакцией: новые next_at
+        (пары next_at, user_id) и пометка заблокировавших бота (по telegram_id)
+        """
+        try:
+            async with aiosqlite.connect(self.db_path) as db:
+                await db.executemany(
+                    "UPDATE reminders SET next_at = ? WHERE user_id = ?", updates
+                )
+                await db.executemany(
+                    "UPDATE users SET blocked_at = CURRENT_TIMESTAMP WHERE telegram_id = ?",
+                    [(telegram_id,) for telegram_id in blocked_users]
+                )
+                await db.commit()
+                
+        except Exception as e:
+            logger.error(f"Ошибка переноса напоминаний: {e}")
+            raise
+    
+    async def add_word_searches(self, counts: List[Tuple[str, int]]):
+        """Дописать число поисков слов за окно подсчёта (слово, поисков)"""
+        try:
+            async with aiosqlite.connect(self.db_path) as db:
+                await db.executemany("""
+                    INSERT INTO word_popularity (word, searches, last_searched)
+                    VALUES (?, ?, CURRENT_TIMESTAMP)
+                    ON CONFLICT(word) DO UPDATE SET
+                        searches = searches + excluded.searches,
+                        last_searched = excluded.last_searched
+                """, counts)
+                await db.commit()
+                
+        except Exception as e:
+            logger.error(f"Ошибка записи популярности слов: {e}")
+            raise
+    
+    async def popular_words(self, limit: int) -> List[Tuple[str, int]]:
+        """Самые искомые слова за всё время (по индексу, без сортировки таблицы)"""
+        async with aiosqlite.connect(self.db_path) as db:
+            cursor = await db.execute(
+                "SELECT word, searches FROM word_popularity ORDER BY searches DESC LIMIT ?",
+                (limit,)
+            )
+            return [(row[0], row[1]) for row in await cursor.fetchall()]
+    
     async def get_user_stats(self, user_id: int) -> Dict:
         """Получить статистику пользователя"""
         try:
@@ -202,10 +854,12 @@ class Database:
                 row = await cursor.fetchone()
                 
                 if row:
+                    # Ответы, ещё не сброшенные в БД, тоже учитываем
+                    pending_correct, pending_wrong = self._pending_stats.get(user_id, (0, 0))
                     total_words = row['total_words']
                     mastered_words = row['mastered_words']
-                    correct_answers = row['correct_answers']
-                    wrong_answers = row['wrong_answers']
+                    correct_answers = row['correct_answers'] + pending_correct
+                    wrong_answers = row['wrong_answers'] + pending_wrong
                     
                     accuracy = (correct_answers / (correct_answers + wrong_answers) * 100) if (correct_answers + wrong_answers) > 0 else 0
                     
@@ -227,6 +881,7 @@ class Database:
                 
         except Exception as e:
             logger.error(f"Ошибка получения статистики: {e}")
+            self._notify_error("get_user_stats")
             return {
                 'total_words': 0,
                 'mastered_words': 0,
@@ -265,13 +920,112 @@ class Database:
                         (user_id, correct_answers, wrong_answers)
                     )
                 
+                changes = []
+                if correct_answers > 0 and self._stats_listeners:
+                    new = (await self._correct_answers(db, [user_id]))[user_id]
+                    changes.append((user_id, new - correct_answers, new))
                 await db.commit()
-                logger.info(f"Статистика пользователя {user_id} обновлена: +{correct_answers} правильных, +{wrong_answers} неправильных")
+                if changes:
+                    self._notify_stats_changed(changes)
+                logger.debug("Статистика обновлена: +%d правильных, +%d неправильных",
+                             correct_answers, wrong_answers, extra={"user_id": user_id})
                 
         except Exception as e:
             logger.error(f"Ошибка обновления статистики: {e}")
             raise
     
+    async def score_histogram(self) -> List[Tuple[int, int]]:
+        """Сколько пользователей набрали каждое число правильных ответов (> 0), по индексу"""
+        async with aiosqlite.connect(self.db_path) as db:
+            cursor = await db.execute("""
+                SELECT correct_answers, COUNT(*) FROM user_stats
+                WHERE correct_answers > 0
+                GROUP BY correct_answers
+            """)
+            return [(row[0], row[1]) for row in await cursor.fetchall()]
+    
+    async def top_learners(self, limit: int) -> List[Dict]:
+        """Лучшие по правильным ответам; при равенстве выше тот, у кого меньше ошибок"""
+        async with aiosqlite.connect(self.db_path) as db:
+            db.row_factory = aiosqlite.Row
+            cursor = await db.execute("""
+                SELECT us.user_id, us.correct_answers, us.wrong_answers, u.first_name
+                FROM user_stats us JOIN users u ON u.id = us.user_id
+                WHERE us.correct_answers > 0
+                ORDER BY us.correct_answers DESC, us.wrong_answers
+                LIMIT ?
+            """, (limit,))
+            return [dict(row) for row in await cursor.fetchall()]
+    
+    async def activity_rows(self, user_id: int, daily_since: int, weekly_since: int,
+                            monthly_since: int) -> List[Tuple[str, int, int, int, int]]:
+        """
+        История активности для /stats: дни ("d", день, ...) начиная с daily_since
+        и свёртки ("w" / "m", начало, ...) — по первичному ключу, строк не больше
+        нескольких десятков. Несброшенная активность тоже учитывается.
+        """
+        async with aiosqlite.connect(self.db_path) as db:
+            cursor = await db.execute("""
+                SELECT 'd', day, correct, wrong, words_added FROM activity_daily
+                WHERE user_id = ? AND day >= ?
+                UNION ALL
+                SELECT kind, start, correct, wrong, words_added FROM activity_rollups
+                WHERE user_id = ? AND kind = 'w' AND start >= ?
+                UNION ALL
+                SELECT kind, start, correct, wrong, words_added FROM activity_rollups
+                WHERE user_id = ? AND kind = 'm' AND start >= ?
+            """, (user_id, daily_since, user_id, weekly_since, user_id, monthly_since))
+            rows = [tuple(row) for row in await cursor.fetchall()]
+        rows.extend(("d", day, *counts) for (pending_user, day), counts in self._pending_activity.items()
+                    if pending_user == user_id)
+        return rows
+    
+    async def activity_user_range(self) -> Tuple[Optional[int], Optional[int]]:
+        """Наименьший и наибольший user_id в activity_daily — границы прохода сжатия"""
+        async with aiosqlite.connect(self.db_path) as db:
+            cursor = await db.execute("SELECT MIN(user_id), MAX(user_id) FROM activity_daily")
+            return tuple(await cursor.fetchone())
+    
+    async def compact_activity(self, first_user_id: int, last_user_id: int, before_day: int) -> int:
+        """
+        Свернуть дни раньше before_day пользователей first_user_id..last_user_id
+        в недельные и месячные свёртки и удалить их дневные строки — одной
+        транзакцией. Строки пользователя лежат в первичном ключе подряд, так что
+        диапазон пользователей читается последовательно. Возвращает число строк.
+        """
+        params = (first_user_id, last_user_id, before_day)
+        async with aiosqlite.connect(self.db_path) as db:
+            await db.execute("BEGIN IMMEDIATE")
+            # Неделя — с понедельника (1970-01-01 — четверг), месяц — с первого числа
+            for kind, start in (("w", "day - (day + 3) % 7"),
+                                ("m", "CAST(julianday(day * 86400, 'unixepoch', 'start of month') "
+                                      "- 2440587.5 AS INTEGER)")):
+                await db.execute(f"""
+                    INSERT INTO activity_rollups (user_id, kind, start, correct, wrong, words_added)
+                    SELECT user_id, '{kind}', {start}, SUM(correct), SUM(wrong), SUM(words_added)
+                    FROM activity_daily
+                    WHERE user_id BETWEEN ? AND ? AND day < ?
+                    GROUP BY 1, 3
+                    ON CONFLICT (user_id, kind, start) DO UPDATE SET
+                        correct = correct + excluded.correct,
+                        wrong = wrong + excluded.wrong,
+                        words_added = words_added + excluded.words_added
+                """, params)
+            cursor = await db.execute(
+                "DELETE FROM activity_daily WHERE user_id BETWEEN ? AND ? AND day < ?", params
+            )
+            await db.commit()
+            return cursor.rowcount
+    
+    async def drop_weekly_rollups(self, before: int) -> int:
+        """Удалить недельные свёртки, начавшиеся раньше before (месячные остаются)"""
+        async with aiosqlite.connect(self.db_path) as db:
+            cursor = await db.execute(
+                "DELETE FROM activity_rollups WHERE kind = 'w' AND start < ?", (before,)
+            )
+            await db.commit()
+            return cursor.rowcount
+    
     async def get_user_words_count(self, telegram_id: int) -> int:
         """Получить общее количество слов пользователя"""
         try:
@@ -288,4 +1042,248 @@ class Database:
                 
         except Exception as e:
             logger.error(f"Ошибка получения количества слов: {e}")
+            self._notify_error("get_user_words_count")
             return 0
+
+    async def sample_user_words(self, user_id: int, k: int, weighted: bool = False,
+                                exclude_ids: Iterable[int] = ()) -> List[Dict]:
+        """
+        Выбрать k различных случайных слов из словаря пользователя.
+        
+        Выборка идёт по плотному индексу (user_id, seq): случайные номера
+        1..N достаются точечными запросами по индексу, без ORDER BY RANDOM()
+        и без чтения всего словаря. При weighted=True вес слова равен
+        1 + wrong_count, т.е. слова с ошибками выпадают чаще.
+        exclude_ids — id записей user_words, которые не нужно возвращать.
+        """
+        try:
+            async with aiosqlite.connect(self.db_path) as db:
+                db.row_factory = aiosqlite.Row
+                
+                cursor = await db.execute(
+                    "SELECT COALESCE(MAX(seq), 0) FROM user_words WHERE user_id = ?",
+                    (user_id,)
+                )
+                total = (await cursor.fetchone())[0]
+                excluded = set(exclude_ids)
+                k = min(k, total - len(excluded))
+                if k <= 0:
+                    return []
+                
+                # Слова с ошибками: их мало, берутся по частичному индексу
+                weak_seqs: List[int] = []
+                weak_weights: List[int] = []
+                if weighted:
+                    cursor = await db.execute(
+                        "SELECT seq, wrong_count FROM user_words "
+                        "WHERE user_id = ? AND wrong_count > 0",
+                        (user_id,)
+                    )
+                    for row in await cursor.fetchall():
+                        weak_seqs.append(row['seq'])
+                        weak_weights.append(row['wrong_count'])
+                weak_total = sum(weak_weights)
+                
+                def draw() -> int:
+                    # Смесь: равномерная часть даёт каждому слову вес 1,
+                    # «ошибочная» часть добавляет ещё wrong_count
+                    if weak_total and random.random() * (total + weak_total) >= total:
+                        return random.choices(weak_seqs, weights=weak_weights)[0]
+                    return random.randint(1, total)
+                
+                picked: List[Dict] = []
+                tried: set = set()
+                for _ in range(SAMPLE_MAX_ROUNDS):
+                    need = k - len(picked)
+                    if need <= 0 or len(tried) >= total:
+                        break
+                    
+                    batch: List[int] = []
+                    budget = (need + len(excluded)) * 4 + 8
+                    while len(batch) < need + len(excluded) and budget > 0:
+                        budget -= 1
+                        seq = draw()
+                        if seq not in tried:
+                            tried.add(seq)
+                            batch.append(seq)
+                    if not batch:
+                        continue
+                    
+                    placeholders = ",".join("?" * len(batch))
+                    cursor = await db.execute(f"""
+                        SELECT uw.id AS user_word_id, uw.seq, uw.wrong_count,
+                               w.id, w.word, w.translation, w.part_of_speech
+                        FROM user_words uw
+                        JOIN words w ON uw.word_id = w.id
+                        WHERE uw.user_id = ? AND uw.seq IN ({placeholders})
+                    """, (user_id, *batch))
+                    rows = {row['seq']: dict(row) for row in await cursor.fetchall()}
+                    
+                    # Сохраняем порядок розыгрыша, чтобы взвешивание не терялось
+                    for seq in batch:
+                        row = rows.get(seq)
+                        if row and row['user_word_id'] not in excluded:
+                            picked.append(row)
+                            if len(picked) == k:
+                                break
+                
+                return picked
+                
+        except Exception as e:
+            logger.error(f"Ошибка выборки слов пользователя: {e}")
+            self._notify_error("sample_user_words")
+            return []
+    
+    async def get_user_translations(self, user_id: int, limit: int) -> List[Dict]:
+        """Получить переводы и части речи последних limit слов пользователя (от старых к новым)"""
+        try:
+            async with aiosqlite.connect(self.db_path) as db:
+                db.row_factory = aiosqlite.Row
+                
+                cursor = await db.execute("""
+                    SELECT w.word, w.translation, w.part_of_speech
+                    FROM user_words uw
+                    JOIN words w ON uw.word_id = w.id
+                    WHERE uw.user_id = ?
+                    ORDER BY uw.seq DESC
+                    LIMIT ?
+                """, (user_id, limit))
+                
+                rows = await cursor.fetchall()
+                return [dict(row) for row in reversed(rows)]
+                
+        except Exception as e:
+            logger.error(f"Ошибка получения переводов пользователя: {e}")
+            self._notify_error("get_user_translations")
+            return []
+
+    def queue_answer(self, user_id: int, user_word_id: Optional[int], correct: bool):
+        """
+        Учесть ответ квиза без записи в БД прямо сейчас: счётчики копятся
+        в памяти и сбрасываются flush_pending() одной транзакцией.
+        """
+        stats = self._pending_stats.setdefault(user_id, [0, 0])
+        stats[0 if correct else 1] += 1
+        self._queue_activity(user_id, correct=int(correct), wrong=int(not correct))
+        if user_word_id is not None:
+            key = (user_id, user_word_id)
+            self._pending_word_answers[key] = (
+                self._pending_word_answers.get(key, 0) + (-1 if correct else 1)
+            )
+    
+    def _queue_activity(self, user_id: int, correct: int = 0, wrong: int = 0,
+                        words_added: int = 0):
+        """Учесть активность за сегодня; в activity_daily попадёт при flush_pending()"""
+        key = (user_id, day_number(time.time(), self.utc_offset))
+        activity = self._pending_activity.get(key)
+        if activity is None:
+            self._pending_activity[key] = [correct, wrong, words_added]
+        else:
+            activity[0] += correct
+            activity[1] += wrong
+            activity[2] += words_added
+    
+    @property
+    def pending_count(self) -> int:
+        return len(self._pending_stats) + len(self._pending_word_answers) + len(self._pending_activity)
+    
+    async def flush_pending(self) -> int:
+        """Записать накопленные ответы квиза и активность; возвращает число обновлённых строк"""
+        # Начатый сброс доводим до конца и при отмене вызывающего: коммит
+        # мог уже пройти, и без вычитания пакета из буферов он записался бы
+        # повторно
+        return await asyncio.shield(self._flush_locked())
+    
+    async def _flush_locked(self) -> int:
+        # Сбросы не пересекаются: пакет вычитается из буферов только после
+        # коммита, и второй сброс записал бы его повторно
+        async with self._flush_lock:
+            return await self._flush_batch()
+    
+    async def _flush_batch(self) -> int:
+        if not self._pending_stats and not self._pending_word_answers and not self._pending_activity:
+            return 0
+        # Пакет — копия буферов: до коммита он остаётся в них и виден /stats
+        # и /top_learners, а после коммита вычитается (ответы, пришедшие
+        # во время сброса, остаются до следующего). Сбой — буферы не тронуты.
+        stats = {user_id: list(counts) for user_id, counts in self._pending_stats.items()}
+        word_answers = dict(self._pending_word_answers)
+        activity = {key: list(counts) for key, counts in self._pending_activity.items()}
+        try:
+            async with aiosqlite.connect(self.db_path) as db:
+                await db.executemany(
+                    "INSERT OR IGNORE INTO user_stats (user_id) VALUES (?)",
+                    [(user_id,) for user_id in stats]
+                )
+                await db.executemany(
+                    "UPDATE user_stats SET correct_answers = correct_answers + ?, "
+                    "wrong_answers = wrong_answers + ? WHERE user_id = ?",
+                    [(correct, wrong, user_id) for user_id, (correct, wrong) in stats.items()]
+                )
+                await db.executemany(
+                    "UPDATE user_words SET wrong_count = MAX(wrong_count + ?, 0) "
+                    "WHERE id = ? AND user_id = ?",
+                    [(delta, user_word_id, user_id)
+                     for (user_id, user_word_id), delta in word_answers.items() if delta]
+                )
+                await db.executemany("""
+                    INSERT INTO activity_daily (user_id, day, correct, wrong, words_added)
+                    VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT (user_id, day) DO UPDATE SET
+                        correct = correct + excluded.correct,
+                        wrong = wrong + excluded.wrong,
+                        words_added = words_added + excluded.words_added
+                """, [(user_id, day, *counts) for (user_id, day), counts in activity.items()])
+                changes = []
+                if self._stats_listeners:
+                    gained = {user_id: correct for user_id, (correct, _) in stats.items() if correct}
+                    current = await self._correct_answers(db, list(gained))
+                    changes = [(user_id, current[user_id] - correct, current[user_id])
+                               for user_id, correct in gained.items()]
+                await db.commit()
+                self._drop_flushed(stats, word_answers, activity)
+                if changes:
+                    self._notify_stats_changed(changes)
+                logger.debug("Сброшены ответы квиза: %d пользователей, %d слов, %d дней активности",
+                             len(stats), len(word_answers), len(activity))
+                return len(stats) + len(word_answers) + len(activity)
+                
+        except Exception as e:
+            # Пакет остался в буферах и уйдёт при следующем сбросе
+            logger.error(f"Ошибка сброса ответов квиза: {e}")
+            raise
+    
+    def _drop_flushed(self, stats: Dict[int, List[int]], word_answers: Dict[Tuple[int, int], int],
+                      activity: Dict[Tuple[int, int], List[int]]):
+        """Вычесть записанный пакет из буферов; обнулившиеся ключи удаляются"""
+        for user_id, flushed in stats.items():
+            pending = self._pending_stats[user_id]
+            pending[0] -= flushed[0]
+            pending[1] -= flushed[1]
+            if not any(pending):
+                del self._pending_stats[user_id]
+        for key, delta in word_answers.items():
+            left = self._pending_word_answers[key] - delta
+            if left:
+                self._pending_word_answers[key] = left
+            else:
+                del self._pending_word_answers[key]
+        for key, flushed in activity.items():
+            pending = self._pending_activity[key]
+            for i, count in enumerate(flushed):
+                pending[i] -= count
+            if not any(pending):
+                del self._pending_activity[key]
+    
+    async def run_flusher(self, interval: float = FLUSH_INTERVAL):
+        """Фоновая задача: периодический сброс накопленных записей"""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.flush_pending()
+            except Exception:
+                pass  # уже залогировано, пакет остался в буфере
+    
+    async def close(self):
+        """Сбросить всё накопленное перед остановкой"""
+        await self.flush_pending()
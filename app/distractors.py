@@ -0,0 +1,205 @@
+import asyncio
+import importlib
+import logging
+import random
+import zlib
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Tuple
+
+from .database import Database
+
+if TYPE_CHECKING:
+    import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Размер хешированного пространства символьных n-грамм
+NGRAM_DIM = 128
+NGRAM_SIZES = (2, 3)
+
+# Части речи Skyeng (partOfSpeechCode); всё прочее попадает в последний слот
+POS_CODES = ("n", "v", "j", "r", "prp", "prn", "cjc", "crd", "exc", "art", "ph")
+# Вклад совпадения части речи в итоговую близость (квадрат веса)
+POS_WEIGHT = 0.5
+
+VECTOR_DIM = NGRAM_DIM + len(POS_CODES) + 1
+
+# Ограничения памяти: строк на пользователя и пользователей в памяти.
+# Строка — VECTOR_DIM float32, т.е. ~0.5 КБ; 10k слов ≈ 5.6 МБ
+MAX_ROWS_PER_USER = 10000
+MAX_USERS = 32
+INITIAL_ROWS = 256
+
+
+def vectorize(translation: str, part_of_speech: Optional[str]) -> "np.ndarray":
+    """Вектор перевода: нормированные хеши символьных n-грамм + часть речи"""
+    # numpy импортируется лениво: это ~60 мс холодного старта,
+    # а нужен он только к первому квизу (прогрев — DistractorIndex.warm_up)
+    import numpy as np
+
+    vector = np.zeros(VECTOR_DIM, dtype=np.float32)
+    text = f" {translation.lower().strip()} "
+    for n in NGRAM_SIZES:
+        for i in range(len(text) - n + 1):
+            bucket = zlib.crc32(text[i:i + n].encode("utf-8")) % NGRAM_DIM
+            vector[bucket] += 1.0
+
+    norm = np.linalg.norm(vector[:NGRAM_DIM])
+    if norm:
+        vector[:NGRAM_DIM] /= norm
+
+    if part_of_speech in POS_CODES:
+        vector[NGRAM_DIM + POS_CODES.index(part_of_speech)] = POS_WEIGHT
+    else:
+        vector[VECTOR_DIM - 1] = POS_WEIGHT
+    return vector
+
+
+class UserMatrix:
+    """Матрица векторов переводов одного пользователя.
+    Растёт удвоением до max_rows, дальше новые слова вытесняют самые старые."""
+
+    def __init__(self, max_rows: int = MAX_ROWS_PER_USER):
+        import numpy as np
+
+        self.max_rows = max_rows
+        self.vectors = np.zeros((min(INITIAL_ROWS, max_rows), VECTOR_DIM), dtype=np.float32)
+        self.translations: List[str] = []
+        self.size = 0
+        self._next = 0  # куда писать следующую строку после заполнения
+
+    def add(self, translation: str, part_of_speech: Optional[str]):
+        if not translation:
+            return
+        if self.size == len(self.vectors) and self.size < self.max_rows:
+            import numpy as np
+
+            grown = np.zeros((min(self.size * 2, self.max_rows), VECTOR_DIM), dtype=np.float32)
+            grown[:self.size] = self.vectors
+            self.vectors = grown
+
+        row = vectorize(translation, part_of_speech)
+        if self.size < len(self.vectors):
+            self.vectors[self.size] = row
+            self.translations.append(translation)
+            self.size += 1
+        else:
+            self.vectors[self._next] = row
+            self.translations[self._next] = translation
+            self._next = (self._next + 1) % self.max_rows
+
+    def nearest(self, query: "np.ndarray", k: int, exclude: Iterable[str]) -> List[str]:
+        """k самых похожих переводов, отличных от exclude (одно умножение матрицы на вектор)"""
+        import numpy as np
+
+        if not self.size:
+            return []
+        scores = self.vectors[:self.size] @ query
+
+        excluded = set(exclude)
+        # Берём с запасом: совпадающие переводы и дубликаты отсеются
+        top = min(self.size, (k + len(excluded)) * 2 + 4)
+        candidates = np.argpartition(-scores, top - 1)[:top]
+        candidates = candidates[np.argsort(-scores[candidates])]
+
+        result: List[str] = []
+        for index in candidates:
+            translation = self.translations[index]
+            if translation in excluded or translation in result:
+                continue
+            result.append(translation)
+            if len(result) == k:
+                break
+        return result
+
+    @property
+    def nbytes(self) -> int:
+        return self.vectors.nbytes
+
+
+class DistractorIndex:
+    """
+    Подбор «трудных» неверных вариантов для квиза.
+    Для каждого пользователя держит матрицу векторов его переводов;
+    матрицы загружаются лениво и вытесняются по LRU.
+    """
+
+    def __init__(self, db: Database, max_users: int = MAX_USERS,
+                 max_rows: int = MAX_ROWS_PER_USER):
+        self.db = db
+        self.max_users = max_users
+        self.max_rows = max_rows
+        self._users: "OrderedDict[int, UserMatrix]" = OrderedDict()
+        self._loading: Dict[int, asyncio.Task] = {}
+        # Слова, добавленные, пока матрица пользователя загружается:
+        # прочитанные из БД строки их могут не содержать
+        self._added_while_loading: Dict[int, List[Tuple[str, Optional[str]]]] = {}
+        db.add_word_listener(self.on_word_added)
+
+    async def warm_up(self):
+        """Импортировать numpy в фоновом потоке, пока идут остальные фазы запуска"""
+        await asyncio.to_thread(importlib.import_module, "numpy")
+
+    def on_word_added(self, user_id: int, word: str, translation: str,
+                      part_of_speech: Optional[str]):
+        """Инкрементальное обновление: вызывается из Database.add_word_to_user"""
+        matrix = self._users.get(user_id)
+        if matrix is not None:
+            matrix.add(translation, part_of_speech)
+        elif user_id in self._added_while_loading:
+            self._added_while_loading[user_id].append((translation, part_of_speech))
+
+    async def _get_matrix(self, user_id: int) -> UserMatrix:
+        matrix = self._users.get(user_id)
+        if matrix is not None:
+            self._users.move_to_end(user_id)
+            return matrix
+
+        # Один запрос к БД на пользователя, даже если квизов несколько сразу
+        task = self._loading.get(user_id)
+        if task is None:
+            task = asyncio.ensure_future(self._load(user_id))
+            self._loading[user_id] = task
+        try:
+            return await asyncio.shield(task)
+        finally:
+            self._loading.pop(user_id, None)
+
+    def _build(self, rows: List[Dict]) -> UserMatrix:
+        matrix = UserMatrix(self.max_rows)
+        for row in rows:
+            matrix.add(row['translation'], row['part_of_speech'])
+        return matrix
+
+    async def _load(self, user_id: int) -> UserMatrix:
+        self._added_while_loading[user_id] = []
+        try:
+            rows = await self.db.get_user_translations(user_id, self.max_rows)
+            # Векторизация до max_rows переводов — сотни миллисекунд CPU:
+            # в потоке, чтобы не останавливать цикл событий
+            matrix = await asyncio.to_thread(self._build, rows)
+        finally:
+            added = self._added_while_loading.pop(user_id)
+        # Слово могло попасть и в прочитанные строки, если запрос шёл после commit
+        loaded = {row['translation'] for row in rows}
+        for translation, part_of_speech in added:
+            if translation not in loaded:
+                matrix.add(translation, part_of_speech)
+
+        self._users[user_id] = matrix
+        while len(self._users) > self.max_users:
+            self._users.popitem(last=False)
+        logger.info(f"Загружена матрица дистракторов пользователя {user_id}: "
+                    f"{matrix.size} слов, {matrix.nbytes // 1024} КБ")
+        return matrix
+
+    async def pick(self, user_id: int, translation: str, part_of_speech: Optional[str],
+                   k: int = 3) -> List[str]:
+        """
+        k правдоподобных неверных вариантов к переводу translation.
+        Из 2k самых похожих берём k случайных, чтобы квиз не повторялся.
+        """
+        matrix = await self._get_matrix(user_id)
+        query = vectorize(translation, part_of_speech)
+        pool = matrix.nearest(query, k * 2, exclude=[translation])
+        return random.sample(pool, min(k, len(pool)))
@@ -0,0 +1,152 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Как часто меряем задержку event loop и сколько последних замеров учитываем
+LAG_INTERVAL = 0.25
+LAG_WINDOW = 20
+# Порог задержки loop, после которого /ready отвечает 503
+MAX_LOOP_LAG_MS = 500.0
+# Как часто и с каким таймаутом проверяем БД
+PROBE_INTERVAL = 5.0
+PROBE_TIMEOUT = 2.0
+# Проверка медленнее этого помечается как slow (для БД — признак перегрузки диска)
+SLOW_PROBE_MS = 500.0
+
+
+class LoopLagMonitor:
+    """
+    Задержка event loop: задача засыпает на interval и меряет, насколько
+    позже положенного проснулась. Большая задержка — loop чем-то занят
+    (синхронный код, тяжёлый CPU) и апдейты ждут.
+    """
+
+    def __init__(self, interval: float = LAG_INTERVAL, window: int = LAG_WINDOW):
+        self.interval = interval
+        self.samples: Deque[float] = deque(maxlen=window)
+        self.max_lag = 0.0
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - started - self.interval)
+            self.samples.append(lag)
+            self.max_lag = max(self.max_lag, lag)
+
+    def current_ms(self) -> float:
+        """Худшая задержка за последние window замеров, мс"""
+        return round(max(self.samples, default=0.0) * 1000, 1)
+
+    def stats(self) -> Dict:
+        samples = sorted(self.samples)
+        return {
+            "lag_ms": self.current_ms(),
+            "lag_p50_ms": round(samples[len(samples) // 2] * 1000, 1) if samples else 0.0,
+            "lag_max_since_start_ms": round(self.max_lag * 1000, 1),
+        }
+
+
+class HealthMonitor:
+    """
+    Состояние процесса для /health и /ready: задержка event loop,
+    периодическая проверка БД, состояние зависимостей (предохранитель
+    Skyeng) и глубина очередей с порогами. Проверки идут в фоне,
+    сам отчёт ничего не ждёт и не нагружает БД.
+    """
+
+    def __init__(self, max_loop_lag_ms: float = MAX_LOOP_LAG_MS,
+                 probe_interval: float = PROBE_INTERVAL):
+        self.max_loop_lag_ms = max_loop_lag_ms
+        self.probe_interval = probe_interval
+        self.lag = LoopLagMonitor()
+        self._probes: List[Tuple[str, Callable[[], Awaitable[Any]]]] = []
+        self._probe_results: Dict[str, Dict] = {}
+        self._queues: List[Tuple[str, Callable[[], int], int]] = []
+        self._dependencies: List[Tuple[str, Callable[[], Dict]]] = []
+        self._tasks: List[asyncio.Task] = []
+
+    def add_probe(self, name: str, probe: Callable[[], Awaitable[Any]]):
+        """Периодическая проверка; ошибка или таймаут делают процесс неготовым"""
+        self._probes.append((name, probe))
+
+    def add_queue(self, name: str, depth: Callable[[], int], limit: int):
+        """Очередь с порогом: глубже limit — процесс перегружен и неготов"""
+        self._queues.append((name, depth, limit))
+
+    def add_dependency(self, name: str, state: Callable[[], Dict]):
+        """Внешняя зависимость: state() со значением 'state' != 'closed' —
+        сервис деградировал, но готовность не снимается"""
+        self._dependencies.append((name, state))
+
+    def start(self):
+        self._tasks = [asyncio.create_task(self.lag.run()),
+                       asyncio.create_task(self._run_probes())]
+
+    def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+
+    async def _run_probes(self):
+        while True:
+            await asyncio.gather(*(self._probe(name, probe) for name, probe in self._probes))
+            await asyncio.sleep(self.probe_interval)
+
+    async def _probe(self, name: str, probe: Callable[[], Awaitable[Any]]):
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(probe(), PROBE_TIMEOUT)
+            ms = round((time.perf_counter() - started) * 1000, 1)
+            self._probe_results[name] = {"ok": True, "ms": ms, "slow": ms > SLOW_PROBE_MS}
+        except Exception as e:
+            if self._probe_results.get(name, {}).get("ok", True):
+                logger.error(f"Проверка '{name}' не прошла: {e!r}")
+            self._probe_results[name] = {
+                "ok": False,
+                "ms": round((time.perf_counter() - started) * 1000, 1),
+                "error": repr(e),
+            }
+
+    def report(self) -> Dict:
+        """Сводка; ready=False с причинами, если превышены пороги"""
+        reasons = []
+        lag_ms = self.lag.current_ms()
+        if lag_ms > self.max_loop_lag_ms:
+            reasons.append(f"loop_lag {lag_ms} ms > {self.max_loop_lag_ms} ms")
+
+        for name, result in self._probe_results.items():
+            if not result["ok"]:
+                reasons.append(f"{name} probe failed")
+
+        queues = {}
+        for name, depth, limit in self._queues:
+            value = depth()
+            queues[name] = {"depth": value, "limit": limit}
+            if value > limit:
+                reasons.append(f"{name} queue {value} > {limit}")
+
+        dependencies = {name: state() for name, state in self._dependencies}
+        degraded = [name for name, state in dependencies.items()
+                    if state.get("state") != "closed"]
+
+        if reasons:
+            status = "overloaded"
+        elif degraded:
+            status = "degraded"
+        else:
+            status = "ok"
+        return {
+            "status": status,
+            "ready": not reasons,
+            "reasons": reasons,
+            "loop": self.lag.stats(),
+            "probes": self._probe_results,
+            "queues": queues,
+            "dependencies": dependencies,
+        }
@@ -0,0 +1,148 @@
+import asyncio
+import logging
+from typing import Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Начальный размер шкалы очков; растёт удвоением
+INITIAL_SCORES = 1024
+# Сверка с user_stats: раз в столько секунд
+CHECK_INTERVAL = 300
+# Сколько раз пересобирать, если во время чтения гистограммы пришли изменения
+REBUILD_ATTEMPTS = 3
+
+
+class FenwickTree:
+    """Дерево Фенвика над счётчиками 1..size: изменение и префиксная сумма за O(log size)"""
+
+    def __init__(self, counts: List[int]):
+        # counts[0] не используется: индексы с 1
+        self.size = len(counts) - 1
+        tree = list(counts)
+        for i in range(1, self.size + 1):
+            parent = i + (i & -i)
+            if parent <= self.size:
+                tree[parent] += tree[i]
+        self._tree = tree
+
+    def add(self, index: int, delta: int):
+        tree, size = self._tree, self.size
+        while index <= size:
+            tree[index] += delta
+            index += index & -index
+
+    def prefix(self, index: int) -> int:
+        """Сумма счётчиков 1..index"""
+        tree = self._tree
+        index = min(index, self.size)
+        total = 0
+        while index > 0:
+            total += tree[index]
+            index -= index & -index
+        return total
+
+
+class Leaderboard:
+    """
+    Рейтинг по правильным ответам: сколько пользователей набрали каждое
+    число очков, над этим — дерево Фенвика. Место пользователя — 1 + число
+    набравших больше, за O(log max очков) без запросов к БД; одинаковые
+    очки делят место. В рейтинге — пользователи хотя бы с одним правильным
+    ответом. Собирается из индекса user_stats при запуске (rebuild),
+    обновляется изменениями, которые Database сообщает после сброса
+    ответов квиза (apply), и периодически сверяется с БД (run_checker):
+    в многопроцессном режиме так подтягиваются изменения других воркеров.
+    """
+
+    def __init__(self, initial_scores: int = INITIAL_SCORES):
+        self._counts = [0] * (initial_scores + 1)
+        self._tree = FenwickTree(self._counts)
+        self.total = 0
+        # Растёт при каждом изменении: пересборка и сверка узнают, что
+        # пока они читали БД, рейтинг успел измениться
+        self.version = 0
+        self.ready = False
+        self.rebuilds = 0
+
+    def build(self, histogram: Iterable[Tuple[int, int]]):
+        """Собрать заново из пар (очки, пользователей) — O(max очков)"""
+        histogram = [(score, users) for score, users in histogram if score > 0]
+        size = INITIAL_SCORES
+        top = max((score for score, _ in histogram), default=0)
+        while size < top:
+            size *= 2
+        counts = [0] * (size + 1)
+        for score, users in histogram:
+            counts[score] += users
+        self._counts = counts
+        self._tree = FenwickTree(counts)
+        self.total = sum(users for _, users in histogram)
+        self.version += 1
+        self.ready = True
+
+    def _grow(self, score: int):
+        size = len(self._counts) - 1
+        while size < score:
+            size *= 2
+        self._counts.extend([0] * (size + 1 - len(self._counts)))
+        self._tree = FenwickTree(self._counts)
+
+    def _move(self, score: int, delta: int):
+        if score <= 0:
+            return
+        if score >= len(self._counts):
+            self._grow(score)
+        self._counts[score] += delta
+        self._tree.add(score, delta)
+        self.total += delta
+
+    def apply(self, changes: Iterable[Tuple[int, int, int]]):
+        """Изменения очков (user_id, было, стало) — подписчик Database"""
+        for _, old, new in changes:
+            if old != new:
+                self._move(old, -1)
+                self._move(new, 1)
+        self.version += 1
+
+    def rank(self, score: int) -> Optional[int]:
+        """Место с таким числом очков; None — без правильных ответов в рейтинге нет"""
+        if score <= 0:
+            return None
+        return 1 + self.total - self._tree.prefix(score)
+
+    def histogram(self) -> List[Tuple[int, int]]:
+        return [(score, users) for score, users in enumerate(self._counts) if users and score]
+
+    async def rebuild(self, db) -> bool:
+        """Собрать из БД; False — рейтинг всё время менялся, оставили как есть"""
+        for _ in range(REBUILD_ATTEMPTS):
+            version = self.version
+            histogram = await db.score_histogram()
+            if self.version == version:
+                self.build(histogram)
+                self.rebuilds += 1
+                logger.info(f"Рейтинг собран: {self.total} пользователей")
+                return True
+        return False
+
+    async def check(self, db) -> bool:
+        """Сверка с user_stats; при расхождении — пересборка. True — совпало"""
+        version = self.version
+        histogram = await db.score_histogram()
+        if self.version != version:
+            return True  # изменился во время чтения — сверим в следующий раз
+        if sorted((score, users) for score, users in histogram if score > 0) == self.histogram():
+            return True
+        logger.info(f"Рейтинг разошёлся с БД ({self.total} в памяти), пересобираем")
+        self.build(histogram)
+        self.rebuilds += 1
+        return False
+
+    async def run_checker(self, db, interval: float = CHECK_INTERVAL):
+        """Фоновая задача: периодическая сверка с БД"""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.check(db)
+            except Exception as e:
+                logger.error(f"Ошибка сверки рейтинга: {e}")
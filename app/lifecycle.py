@@ -0,0 +1,120 @@
+import asyncio
+import inspect
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+logger = logging.getLogger(__name__)
+
+# Сколько ждём доработки начатых апдейтов при остановке.
+# docker stop по умолчанию даёт 10 с, в docker-compose.yml выставлено 30 с
+DRAIN_TIMEOUT = 20.0
+# Сколько даём каждому шагу сброса и закрытия
+STEP_TIMEOUT = 5.0
+
+Hook = Callable[[], Any]
+Step = Tuple[str, Hook, float]
+
+
+async def stop_task(task: asyncio.Task):
+    """Отменить фоновую задачу и дождаться, пока она действительно завершится"""
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+
+
+class Lifecycle(BaseMiddleware):
+    """
+    Учёт апдейтов в обработке и упорядоченная остановка бота.
+    Как outer-middleware на dp.update считает начатые и завершённые апдейты;
+    shutdown() по шагам: перестать принимать апдейты → дождаться начатых
+    (не дольше drain_timeout) → сбросить буферы → закрыть ресурсы.
+    """
+
+    def __init__(self, drain_timeout: float = DRAIN_TIMEOUT):
+        self.drain_timeout = drain_timeout
+        self.accepting = True
+        self.inflight = 0
+        self.handled = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._stop_hooks: List[Step] = []
+        self._flush_hooks: List[Step] = []
+        self._close_hooks: List[Step] = []
+        self._report: Dict = {}
+
+    def on_stop_accepting(self, name: str, hook: Hook, timeout: float = STEP_TIMEOUT):
+        self._stop_hooks.append((name, hook, timeout))
+
+    def on_flush(self, name: str, hook: Hook, timeout: float = STEP_TIMEOUT):
+        """Сброс буферов на диск; hook может вернуть число сброшенных записей"""
+        self._flush_hooks.append((name, hook, timeout))
+
+    def on_close(self, name: str, hook: Hook, timeout: float = STEP_TIMEOUT):
+        """Закрытие ресурсов — в порядке регистрации"""
+        self._close_hooks.append((name, hook, timeout))
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        self.inflight += 1
+        self._idle.clear()
+        try:
+            return await handler(event, data)
+        finally:
+            self.inflight -= 1
+            self.handled += 1
+            if not self.inflight:
+                self._idle.set()
+
+    async def _run_hooks(self, hooks: List[Step]) -> Dict[str, Any]:
+        results = {}
+        for name, hook, timeout in hooks:
+            try:
+                result = hook()
+                if inspect.isawaitable(result):
+                    result = await asyncio.wait_for(result, timeout)
+                results[name] = result if result is not None else "ok"
+            except Exception as e:
+                logger.error(f"Остановка: шаг '{name}' завершился ошибкой: {e}")
+                results[name] = f"error: {e}"
+        return results
+
+    async def shutdown(self) -> Dict:
+        """Остановить бота; повторный вызов возвращает отчёт первого"""
+        if not self.accepting:
+            return self._report
+        self.accepting = False
+        started = time.monotonic()
+        logger.info(f"Остановка: перестаём принимать апдейты, в обработке {self.inflight}")
+
+        report: Dict[str, Any] = {"stopped": await self._run_hooks(self._stop_hooks)}
+
+        inflight_before = self.inflight
+        handled_before = self.handled
+        try:
+            await asyncio.wait_for(self._idle.wait(), self.drain_timeout)
+        except asyncio.TimeoutError:
+            logger.error(f"Остановка: не дождались {self.inflight} апдейтов "
+                         f"за {self.drain_timeout} с")
+        report["drained"] = {
+            "inflight_at_stop": inflight_before,
+            "completed": self.handled - handled_before,
+            "abandoned": self.inflight,
+        }
+
+        report["flushed"] = await self._run_hooks(self._flush_hooks)
+        report["closed"] = await self._run_hooks(self._close_hooks)
+        report["seconds"] = round(time.monotonic() - started, 2)
+
+        logger.info(f"Остановка завершена: {report}")
+        self._report = report
+        return report
@@ -1,39 +1,208 @@
+import copy
+import json
 import logging
+import logging.handlers
 import os
-from datetime import datetime
-
-# Создаем директорию для логов
-os.makedirs("logs", exist_ok=True)
-
-# Настраиваем логирование
-def setup_logger():
-    """Настройка логирования для бота"""
-    logger = logging.getLogger("lingua_bot")
-    logger.setLevel(logging.INFO)
-    
-    # Форматтер для логов
-    formatter = logging.Formatter(
-        "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-    )
-    
-    # Хендлер для файла
-    file_handler = logging.FileHandler(
-        f"logs/bot_{datetime.now().strftime('%Y%m%d')}.log",
-        encoding="utf-8"
+import queue
+import random
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+# Настройки по умолчанию (переопределяются переменными окружения)
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+LOG_DIR = os.getenv("LOG_DIR", "logs")
+# Формат записей: kv (key=value) или json
+LOG_FORMAT = os.getenv("LOG_FORMAT", "kv")
+# Ротация: size — по размеру файла, time — каждую полночь
+LOG_ROTATE = os.getenv("LOG_ROTATE", "size")
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+LOG_BACKUPS = int(os.getenv("LOG_BACKUPS", "7"))
+# Выборка шумных debug-событий: "app.main=0.1,app.skyeng_client=0.5"
+LOG_SAMPLE = os.getenv("LOG_SAMPLE", "")
+# Отдельный файл для трасс медленных апдейтов (логгер app.tracing)
+TRACE_LOG_FILE = "slow_traces.log"
+
+# Атрибуты LogRecord, которые не считаются полями из extra=
+_RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def record_fields(record: logging.LogRecord) -> Dict:
+    """Поля, переданные через extra={...}"""
+    return {key: value for key, value in vars(record).items() if key not in _RECORD_ATTRS}
+
+
+def _timestamp(record: logging.LogRecord) -> str:
+    return datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds")
+
+
+class StructuredQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler, который кладёт в очередь готовый текст сообщения, а трейсбек —
+    отдельным полем (стандартный склеивает их в одну строку msg).
+    Аргументы форматируются здесь, пока их не успели изменить.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.message = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class StructuredFormatter(logging.Formatter):
+    """Общая часть форматтеров: стандартные поля, поля из extra= и трейсбек"""
+
+    def fields(self, record: logging.LogRecord) -> Dict:
+        fields = {
+            "ts": _timestamp(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+            **record_fields(record),
+        }
+        if record.exc_info:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            fields["exc"] = record.exc_text
+        return fields
+
+
+class KeyValueFormatter(StructuredFormatter):
+    """ts=... level=INFO logger=app.main msg="..." user_id=42"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        return " ".join(f"{key}={self._quote(value)}"
+                        for key, value in self.fields(record).items())
+
+    @staticmethod
+    def _quote(value) -> str:
+        text = str(value)
+        if not text or any(ch in text for ch in ' "=\n'):
+            return json.dumps(text, ensure_ascii=False)
+        return text
+
+
+class JsonFormatter(StructuredFormatter):
+    """Одна JSON-запись на строку"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        return json.dumps(self.fields(record), ensure_ascii=False, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Пропускает долю rate записей не выше max_level; остальные уровни — все.
+    Вешается на конкретный логгер, поэтому отброшенная запись
+    не форматируется и не попадает в очередь.
+    """
+
+    def __init__(self, rate: float, max_level: int = logging.DEBUG):
+        super().__init__()
+        self.rate = rate
+        self.max_level = max_level
+        self.dropped = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > self.max_level or random.random() < self.rate:
+            return True
+        self.dropped += 1
+        return False
+
+
+def parse_sampling(spec: str) -> Dict[str, float]:
+    """'app.main=0.1,app.db=0.5' -> {'app.main': 0.1, 'app.db': 0.5}"""
+    rates = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, rate = item.partition("=")
+        rates[name.strip()] = float(rate)
+    return rates
+
+
+def _file_handler(path: str, rotate: str) -> logging.Handler:
+    if rotate == "time":
+        return logging.handlers.TimedRotatingFileHandler(
+            path, when="midnight", backupCount=LOG_BACKUPS, encoding="utf-8"
+        )
+    return logging.handlers.RotatingFileHandler(
+        path, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUPS, encoding="utf-8"
     )
-    file_handler.setLevel(logging.INFO)
-    file_handler.setFormatter(formatter)
-    
-    # Хендлер для консоли
-    console_handler = logging.StreamHandler()
-    console_handler.setLevel(logging.INFO)
-    console_handler.setFormatter(formatter)
-    
-    # Добавляем хендлеры
-    logger.addHandler(file_handler)
-    logger.addHandler(console_handler)
-    
-    return logger
-
-# Создаем логгер
-logger = setup_logger()
+
+
+def trace_filename(filename: str) -> str:
+    """
+    Файл трасс для процесса с основным логом filename: bot.log ->
+    slow_traces.log, worker0.log -> slow_traces.worker0.log. У каждого
+    процесса свой файл — несколько процессов не ротируют один и тот же
+    """
+    if filename == "bot.log":
+        return TRACE_LOG_FILE
+    stem, ext = os.path.splitext(TRACE_LOG_FILE)
+    return f"{stem}.{os.path.splitext(filename)[0]}{ext}"
+
+
+def setup_logging(level: str = LOG_LEVEL, log_dir: str = LOG_DIR, fmt: str = LOG_FORMAT,
+                  rotate: str = LOG_ROTATE, sampling: str = LOG_SAMPLE,
+                  filename: str = "bot.log") -> logging.handlers.QueueListener:
+    """
+    Настройка логирования для бота.
+    Корневой логгер пишет только в очередь (QueueHandler) — это дёшево
+    и не блокирует event loop; консоль и файл с ротацией обслуживает
+    QueueListener в отдельном потоке. Трассы медленных апдейтов
+    дополнительно пишутся в свой файл (trace_filename). Остановить — stop_logging().
+    """
+    global _listener
+    stop_logging()
+
+    formatter = JsonFormatter() if fmt == "json" else KeyValueFormatter()
+    handlers = [logging.StreamHandler()]
+    if log_dir:
+        os.makedirs(log_dir, exist_ok=True)
+        handlers.append(_file_handler(os.path.join(log_dir, filename), rotate))
+        traces = _file_handler(os.path.join(log_dir, trace_filename(filename)), rotate)
+        traces.addFilter(logging.Filter("app.tracing"))
+        handlers.append(traces)
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(StructuredQueueHandler(log_queue))
+    root.setLevel(level.upper())
+
+    for name, rate in parse_sampling(sampling).items():
+        target = logging.getLogger(name)
+        for old in [f for f in target.filters if isinstance(f, SamplingFilter)]:
+            target.removeFilter(old)
+        target.addFilter(SamplingFilter(rate))
+
+    _listener = logging.handlers.QueueListener(log_queue, *handlers,
+                                               respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+
+def stop_logging():
+    """
+    Дописать оставшиеся записи из очереди и закрыть файлы.
+    Дальнейшие записи идут в консоль напрямую, без очереди.
+    """
+    global _listener
+    if _listener is None:
+        return
+    root = logging.getLogger()
+    for handler in [h for h in root.handlers if isinstance(h, StructuredQueueHandler)]:
+        root.removeHandler(handler)
+    _listener.stop()
+    console = logging.StreamHandler()
+    console.setFormatter(_listener.handlers[0].formatter)
+    for handler in _listener.handlers:
+        handler.close()
+    root.addHandler(console)
+    _listener = None
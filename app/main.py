@@ -1,40 +1,312 @@
 import asyncio
 import logging
 import os
-from dotenv import load_dotenv
+import random
+import signal
+import tempfile
+import time
+from typing import Optional
+from dotenv import dotenv_values, load_dotenv
 from aiogram import Bot, Dispatcher, F
-from aiogram.filters import Command
-from aiogram.types import Message, CallbackQuery
-from aiogram.utils.keyboard import InlineKeyboardBuilder
+from aiogram.filters import Command, CommandObject
+from aiogram.types import Message, CallbackQuery, BufferedInputFile, FSInputFile, User
 from aiogram.client.default import DefaultBotProperties
+from aiogram.client.session.base import BaseSession
 
 # Исправляем импорты - добавляем точку для относительных импортов
 from .skyeng_client import SkyengClient
-from .ui.keyboards import kb_search_card, kb_quiz
+from .ui.keyboards import (
+    kb_search_card, kb_quiz, kb_quiz_answers, kb_quiz_next, kb_speak_random, kb_bulk_pages,
+    kb_find_pages, kb_spelling, kb_broadcast_confirm, kb_reminder
+)
 from .ui.renderers import (
-    render_word_card, render_examples, render_quiz_question, render_quiz_result
+    render_word_card, render_examples, render_quiz_question, render_quiz_result,
+    render_cache_stats, render_bulk_page, render_find_results, render_broadcast_report,
+    render_reminder, render_reminder_settings, render_top_words, render_top_learners,
+    render_stats
+)
+from .activity import build_trend, day_number, run_compactor, trend_since
+from .database import MIN_SEARCH_TERM, Database, fts_query
+from .distractors import DistractorIndex
+from .broadcast import Broadcaster, RATE_SHARE as BROADCAST_RATE_SHARE
+from .bulk import BULK_PAGE_SIZE, BulkResults, lookup_words, page_count, parse_word_list
+from .leaderboard import Leaderboard
+from .popularity import WordPopularity
+from .reminders import (
+    RATE_SHARE as REMINDER_RATE_SHARE, ReminderScheduler, next_fire, parse_reminder_time
+)
+from .spelling import MAX_WORDS as SPELL_MAX_WORDS, SCAN_ROWS as SPELL_SCAN_ROWS, SpellIndex
+from .transfer import (
+    EXTENSIONS, FORMATS, MAX_IMPORT_BYTES, Progress, detect_format, export_words, import_words
+)
+from .webserver import WebServer
+from .throttling import ThrottlingMiddleware
+from .sender import OutboundLimiter, GLOBAL_RATE
+from .lifecycle import Lifecycle, stop_task
+from .startup import run_startup, start_background
+from .logger import setup_logging, stop_logging
+from .metrics import (
+    REGISTRY, CONTENT_TYPE, DB_ERRORS, DB_SECONDS, SKYENG_SECONDS, HandlerMetrics, instrument
 )
-from .database import Database
+from .tracing import (
+    HandlerSpans, TelegramSpans, TracingMiddleware, install_log_trace_id, record_span,
+    trace_methods
+)
+from .profiler import SamplingProfiler
+from .health import HealthMonitor
+from .recorder import UpdateRecorder
 from .bot_settings import WELCOME_MESSAGE, HELP_MESSAGE
 
 # Загружаем переменные окружения
 load_dotenv()
 
-# Настройка логирования
-logging.basicConfig(level=logging.INFO)
+# Логирование настраивается в main() (setup_logging): запись в очередь,
+# файл и консоль — в отдельном потоке
 logger = logging.getLogger(__name__)
 
-# Получаем токен из переменных окружения
+# Получаем токен из переменных окружения (проверяется в create_bot)
 BOT_TOKEN = os.getenv("BOT_TOKEN")
-if not BOT_TOKEN:
-    raise ValueError("BOT_TOKEN не найден в переменных окружения!")
 
-# Инициализация
-bot = Bot(token=BOT_TOKEN, 
-          default=DefaultBotProperties(parse_mode="HTML"))
+# Режим получения апдейтов: polling (по умолчанию) или webhook
+BOT_MODE = os.getenv("BOT_MODE", "polling")
+WEBHOOK_URL = os.getenv("WEBHOOK_URL", "")
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/webhook")
+# Секрет заголовка X-Telegram-Bot-Api-Secret-Token: в режиме webhook обязателен
+# и должен быть одинаковым у всех реплик за балансировщиком (каждая вызывает
+# set_webhook при старте, и Telegram помнит только последний секрет)
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET", "")
+# Встроенный HTTP-сервер (/health, /ready, webhook)
+WEB_HOST = os.getenv("WEB_HOST", "0.0.0.0")
+WEB_PORT = int(os.getenv("WEB_PORT", "8080"))
+# Токен служебных эндпоинтов (/metrics, /throttling, /sender): там есть id
+# пользователей. Не задан — эндпоинты отвечают только на запросы с localhost
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+# Число процессов-воркеров; больше 1 — апдейты шардируются по id пользователя
+WORKERS = int(os.getenv("WORKERS", "1"))
+# Лимиты на пользователя: пополнение бюджета в секунду и размер всплеска
+THROTTLE_MESSAGE_RATE = float(os.getenv("THROTTLE_MESSAGE_RATE", "1"))
+THROTTLE_MESSAGE_BURST = int(os.getenv("THROTTLE_MESSAGE_BURST", "5"))
+THROTTLE_CALLBACK_RATE = float(os.getenv("THROTTLE_CALLBACK_RATE", "2"))
+THROTTLE_CALLBACK_BURST = int(os.getenv("THROTTLE_CALLBACK_BURST", "6"))
+# Сколько секунд при остановке ждём доработки начатых апдейтов
+DRAIN_TIMEOUT = float(os.getenv("DRAIN_TIMEOUT", "20"))
+# Снимок кеша ответов Skyeng: сохраняется при остановке, читается при запуске
+SKYENG_CACHE_PATH = os.getenv("SKYENG_CACHE_PATH", "data/skyeng_cache.json")
+# Апдейты дольше порога (мс) пишутся в logs/slow_traces.log с разбивкой по спанам
+SLOW_TRACE_MS = float(os.getenv("SLOW_TRACE_MS", "1000"))
+# Пороги готовности (/ready): задержка event loop и глубина очередей
+MAX_LOOP_LAG_MS = float(os.getenv("MAX_LOOP_LAG_MS", "500"))
+MAX_OUTBOUND_QUEUE = int(os.getenv("MAX_OUTBOUND_QUEUE", "1000"))
+MAX_INFLIGHT_UPDATES = int(os.getenv("MAX_INFLIGHT_UPDATES", "500"))
+MAX_PENDING_ANSWERS = 10_000
+MAX_SHARD_QUEUE = 5_000
+# Журнал входящих апдейтов для воспроизведения (bench.replay); пусто — не пишем
+RECORD_UPDATES_PATH = os.getenv("RECORD_UPDATES_PATH", "")
+RECORD_SALT = os.getenv("RECORD_SALT", "")
+# Telegram id администраторов через запятую (команды /profile и /broadcast)
+ADMIN_IDS = {int(i) for i in os.getenv("ADMIN_IDS", "").replace(" ", "").split(",") if i}
+# Часовой пояс /remind, если пользователь его не указал: смещение от UTC в часах
+REMINDER_UTC_OFFSET = int(float(os.getenv("REMINDER_UTC_OFFSET", "3")) * 60)
+
+# Инициализация. Бот создаётся при запуске (create_bot), а не при импорте:
+# так модуль можно импортировать без токена (бенчмарки, воркеры)
+bot: Bot = None
+# Все исходящие запросы идут через общий лимитер; в многопроцессном
+# режиме глобальный лимит Telegram делится между воркерами
+outbound = OutboundLimiter(global_rate=GLOBAL_RATE / WORKERS)
 dp = Dispatcher()
 skyeng = SkyengClient()
 db = Database()
+# Сутки в истории активности (/stats) — по тому же часовому поясу
+db.utc_offset = REMINDER_UTC_OFFSET
+distractors = DistractorIndex(db)
+# Индекс опечаток: строится в фоне после запуска (build_spell_index)
+# и пополняется сохранёнными словами и удачными запросами
+spelling = SpellIndex()
+# Рассылка администратора: берёт часть глобального лимита, остальное —
+# запас интерактивным ответам
+broadcaster = Broadcaster(db, rate=outbound.global_rate * BROADCAST_RATE_SHARE)
+
+
+def reminder_message(reminder: dict):
+    """Текст напоминания по строке due_reminders; пустой словарь — не напоминаем"""
+    if not reminder["words"]:
+        return None
+    return render_reminder(reminder["words"], reminder["weak"]), {"reply_markup": kb_reminder()}
+
+
+# Рейтинг по правильным ответам: собирается после запуска, дальше
+# обновляется при сбросе ответов квиза в БД
+leaderboard = Leaderboard()
+db.add_stats_listener(leaderboard.apply)
+TOP_LEARNERS = 10
+
+# Популярность найденных слов: считается в памяти (скетч + топ), топ окна
+# раз в 5 минут дописывается в word_popularity; по ней /top и прогрев кеша
+popularity = WordPopularity()
+# Сколько самых популярных слов прогревать в кеше Skyeng после запуска
+PREWARM_WORDS = 300
+PREWARM_CONCURRENCY = 4
+
+# Ежедневные напоминания: планировщик работает в одном процессе (в
+# многопроцессном режиме — во фронте), расписание — в таблице reminders
+reminder_scheduler = ReminderScheduler(
+    db, reminder_message, rate=outbound.global_rate * REMINDER_RATE_SHARE
+)
+
+
+def learn_word(user_id: int, word: str, translation: str, part_of_speech: Optional[str]):
+    """Подписчик Database: сохранённые слова и однословные переводы пополняют индекс опечаток"""
+    spelling.add(word)
+    spelling.add(translation)
+
+
+def learn_query(key: str, seconds: float, result):
+    """Подписчик SkyengClient: запрос, на который API что-то нашёл, — не опечатка"""
+    if key.startswith("search:") and result:
+        spelling.add(key[len("search:"):])
+
+
+db.add_word_listener(learn_word)
+skyeng.add_response_listener(learn_query)
+
+# Итоги поиска списков слов для листания страниц
+bulk_results = BulkResults()
+# Импорт и экспорт словаря: кто ждёт загрузки файла после /import (до какого
+# времени) и у кого перенос уже идёт — второй параллельно не запускаем
+IMPORT_WAIT = 600
+awaiting_import: dict = {}
+transfers_running: set = set()
+
+# Защита от флуда: лишние нажатия и сообщения не доходят до Skyeng и БД
+throttling = ThrottlingMiddleware(
+    message_rate=THROTTLE_MESSAGE_RATE,
+    message_burst=THROTTLE_MESSAGE_BURST,
+    callback_rate=THROTTLE_CALLBACK_RATE,
+    callback_burst=THROTTLE_CALLBACK_BURST,
+)
+dp.message.outer_middleware(throttling)
+dp.callback_query.outer_middleware(throttling)
+
+# Учёт апдейтов в обработке и упорядоченная остановка
+lifecycle = Lifecycle(DRAIN_TIMEOUT)
+dp.update.outer_middleware(lifecycle)
+
+# Трассировка апдейтов: спаны вокруг Skyeng, БД и запросов к Telegram
+tracing = TracingMiddleware(SLOW_TRACE_MS)
+dp.update.outer_middleware(tracing)
+dp.message.middleware(HandlerSpans())
+dp.callback_query.middleware(HandlerSpans())
+trace_methods(db, "db", exclude=("run_flusher",))
+trace_methods(skyeng, "skyeng", exclude=("aclose", "warm_up"))
+skyeng.add_request_listener(
+    lambda endpoint, seconds, error: record_span(f"skyeng.api.{endpoint}", seconds)
+)
+install_log_trace_id()
+profiler = SamplingProfiler()
+
+# Запись трафика (включается RECORD_UPDATES_PATH): апдейты и ответы Skyeng
+recorder = None
+if RECORD_UPDATES_PATH:
+    recorder = UpdateRecorder(RECORD_UPDATES_PATH, RECORD_SALT.encode())
+    dp.update.outer_middleware(recorder)
+    skyeng.add_response_listener(recorder.record_skyeng)
+
+# Метрики: время хендлеров, запросов к Skyeng и методов БД, кеш и очереди
+handler_metrics = HandlerMetrics()
+dp.message.middleware(handler_metrics)
+dp.callback_query.middleware(handler_metrics)
+instrument(db, DB_SECONDS, DB_ERRORS, exclude=("run_flusher",))
+# Большинство методов чтения сами перехватывают ошибку и отдают пустой результат —
+# до обёртки timed() она не доходит, поэтому считаем её через подписку
+db.add_error_listener(DB_ERRORS.inc)
+skyeng.add_request_listener(
+    lambda endpoint, seconds, error:
+        SKYENG_SECONDS.observe(seconds, endpoint, "error" if error else "ok")
+)
+REGISTRY.gauge("skyeng_cache_hits_total", "Ответы Skyeng из кеша",
+               lambda: skyeng.cache_hits, kind="counter")
+REGISTRY.gauge("skyeng_cache_misses_total", "Запросы к Skyeng мимо кеша",
+               lambda: skyeng.cache_misses, kind="counter")
+REGISTRY.gauge("skyeng_cache_entries", "Записей в кеше Skyeng", lambda: skyeng.cache_stats()["size"])
+REGISTRY.gauge("ui_render_cache_hits_total", "Карточки и примеры из кеша рендера",
+               lambda: {name: s["hits"] for name, s in render_cache_stats().items()},
+               labels=("cache",), kind="counter")
+# Не counter: счёт у каждой рассылки свой и начинается с нуля
+REGISTRY.gauge("broadcast_sent", "Доставлено сообщений текущей рассылки",
+               lambda: broadcaster.stats().get("sent", 0))
+REGISTRY.gauge("leaderboard_users", "Пользователей в рейтинге", lambda: leaderboard.total)
+REGISTRY.gauge("word_searches_total", "Найденные слова, учтённые в популярности",
+               lambda: popularity.total, kind="counter")
+REGISTRY.gauge("reminders_sent_total", "Отправленные напоминания",
+               lambda: reminder_scheduler.sent, kind="counter")
+REGISTRY.gauge("spelling_index_words", "Слов в индексе опечаток", lambda: len(spelling))
+REGISTRY.gauge("outbound_queue_depth", "Отправки, ждущие очереди лимитера",
+               outbound.depths, labels=("priority",))
+REGISTRY.gauge("outbound_retries_total", "Повторы после 429",
+               lambda: outbound.retries, kind="counter")
+REGISTRY.gauge("db_pending_answers", "Ответы квиза в буфере до сброса в БД",
+               lambda: db.pending_count)
+REGISTRY.gauge("updates_inflight", "Апдейты в обработке", lambda: lifecycle.inflight)
+REGISTRY.gauge("throttled_updates_total", "Апдейты, отброшенные антифлудом",
+               lambda: throttling.total_throttled, kind="counter")
+
+# Состояние процесса для /health и /ready
+health = HealthMonitor(MAX_LOOP_LAG_MS)
+health.add_probe("sqlite", db.ping)
+health.add_dependency("skyeng", skyeng.breaker.stats)
+health.add_queue("outbound", outbound.depth, MAX_OUTBOUND_QUEUE)
+health.add_queue("inflight_updates", lambda: lifecycle.inflight, MAX_INFLIGHT_UPDATES)
+health.add_queue("pending_answers", lambda: db.pending_count, MAX_PENDING_ANSWERS)
+REGISTRY.gauge("event_loop_lag_seconds", "Худшая задержка event loop за последние секунды",
+               lambda: health.lag.current_ms() / 1000)
+REGISTRY.gauge("skyeng_breaker_open", "Предохранитель Skyeng разомкнут (1) или нет (0)",
+               lambda: int(skyeng.breaker.state != "closed"))
+
+# Сколько случайных слов словаря берём в кандидаты на неверные варианты
+QUIZ_CANDIDATES = 8
+
+
+async def build_quiz(user_id: int):
+    """
+    Собирает вопрос квиза по всему словарю пользователя.
+    Слово для вопроса выбирается с упором на ошибки, неверные варианты —
+    самые похожие переводы из словаря (DistractorIndex), при нехватке
+    добираются случайными. Возвращает (текст, клавиатура) или None,
+    если слов для квиза не хватает.
+    """
+    picked = await db.sample_user_words(user_id, 1, weighted=True)
+    if not picked:
+        return None
+    quiz_word = picked[0]
+    
+    wrong_options = await distractors.pick(
+        user_id, quiz_word['translation'], quiz_word['part_of_speech'], k=3
+    )
+    if len(wrong_options) < 3:
+        candidates = await db.sample_user_words(
+            user_id, QUIZ_CANDIDATES, exclude_ids=[quiz_word['user_word_id']]
+        )
+        for w in candidates:
+            translation = w['translation']
+            if translation != quiz_word['translation'] and translation not in wrong_options:
+                wrong_options.append(translation)
+            if len(wrong_options) == 3:
+                break
+    if not wrong_options:
+        return None
+    
+    options = [quiz_word['translation']] + wrong_options
+    random.shuffle(options)
+    correct_index = options.index(quiz_word['translation'])
+    
+    # В callback_data передаём id записи словаря, чтобы учесть ответ по слову
+    markup = kb_quiz_answers(options, correct_index, quiz_word['user_word_id'])
+    
+    logger.debug("Вопрос квиза: %s", quiz_word['word'], extra={"user_id": user_id})
+    question_text = render_quiz_question(quiz_word['word'], options, correct_index)
+    return question_text, markup
+
 
 # Обработчик команды /start
 @dp.message(Command("start"))
@@ -46,7 +318,10 @@ async def on_start(m: Message):
             m.from_user.username,
             m.from_user.first_name
         )
-        logger.info(f"Пользователь {m.from_user.id} запустил бота")
+        if user.get('blocked_at'):
+            # Вернулся после блокировки — снова получает рассылки
+            await db.unblock_user(m.from_user.id)
+        logger.info("Пользователь запустил бота", extra={"user_id": m.from_user.id})
         await m.answer(WELCOME_MESSAGE)
     except Exception as e:
         logger.error(f"Ошибка в /start: {e}")
@@ -62,34 +337,16 @@ async def on_help(m: Message):
 @dp.message(Command("quiz"))
 async def on_quiz_command(m: Message):
     try:
-        # Получаем слова пользователя для квиза
+        # Получаем пользователя и собираем квиз по его словарю
         user = await db.get_or_create_user(m.from_user.id)
-        words = await db.get_user_words(m.from_user.id, limit=5)
+        quiz = await build_quiz(user['id'])
         
-        if len(words) < 2:
+        if not quiz:
             await m.answer("😔 Добавь больше слов в словарь для квиза!")
             return
         
-        # Выбираем случайное слово
-        import random
-        quiz_word = random.choice(words)
-        
-        # Создаем варианты ответов
-        options = [quiz_word['translation']]
-        other_words = [w for w in words if w['id'] != quiz_word['id']]
-        options.extend([w['translation'] for w in random.sample(other_words, min(3, len(other_words)))])
-        random.shuffle(options)
-        
-        correct_index = options.index(quiz_word['translation'])
-        
-        # Создаем кнопки
-        builder = InlineKeyboardBuilder()
-        for i, option in enumerate(options):
-            builder.button(text=option, callback_data=f"quiz_answer_{i}_{correct_index}")
-        builder.adjust(1)
-        
-        question_text = render_quiz_question(quiz_word['word'], options, correct_index)
-        await m.answer(question_text, reply_markup=builder.as_markup())
+        question_text, markup = quiz
+        await m.answer(question_text, reply_markup=markup)
         
     except Exception as e:
         logger.error(f"Ошибка в /quiz: {e}")
@@ -135,20 +392,36 @@ async def on_stats(m: Message):
             return
         
         stats = await db.get_user_stats(user['id'])
-        stats_text = f"""📊 <b>Твоя статистика:</b>
-
-📚 Слов в словаре: {stats['total_words']}
-✅ Изучено: {stats['mastered_words']}
-🎯 Правильных ответов: {stats['correct_answers']}
-❌ Ошибок: {stats['wrong_answers']}
-📈 Точность: {stats['accuracy']:.1f}%"""
+        today = day_number(time.time(), db.utc_offset)
+        trend = None
+        try:
+            trend = build_trend(await db.activity_rows(user['id'], *trend_since(today)), today)
+        except Exception as e:
+            logger.error(f"Ошибка чтения истории активности: {e}")
         
-        await m.answer(stats_text)
+        await m.answer(render_stats(stats, trend))
     except Exception as e:
         logger.error(f"Ошибка в /stats: {e}")
         await m.answer("😅 Не удалось загрузить статистику. Попробуй позже!")
 
 
+# Обработчик команды /top_learners — рейтинг по правильным ответам
+@dp.message(Command("top_learners"))
+async def on_top_learners(m: Message):
+    try:
+        user = await db.get_or_create_user(m.from_user.id, m.from_user.username,
+                                           m.from_user.first_name)
+        stats = await db.get_user_stats(user['id'])
+        top = await db.top_learners(TOP_LEARNERS)
+        rank = leaderboard.rank(stats['correct_answers']) if leaderboard.ready else None
+        await m.answer(render_top_learners(top, user['id'], rank,
+                                           max(leaderboard.total, rank or 0),
+                                           stats['correct_answers']))
+    except Exception as e:
+        logger.error(f"Ошибка в /top_learners: {e}")
+        await m.answer("😅 Не удалось загрузить рейтинг. Попробуй позже!")
+
+
 # Обработчик команды /dictionary
 @dp.message(Command("dictionary"))
 async def on_dictionary(m: Message):
@@ -176,36 +449,353 @@ async def on_dictionary(m: Message):
             words_text += f"\n... и ещё {total_words - 20} слов"
         
         # Добавляем кнопку озвучки
-        from aiogram.utils.keyboard import InlineKeyboardBuilder
-        builder = InlineKeyboardBuilder()
-        builder.button(text="🔊 Произнести случайное слово", callback_data="speak_random")
-        builder.adjust(1)
-        
-        await m.answer(words_text, reply_markup=builder.as_markup())
+        await m.answer(words_text, reply_markup=kb_speak_random())
     except Exception as e:
         logger.error(f"Ошибка в /dictionary: {e}")
         await m.answer("😅 Не удалось загрузить словарь. Попробуй позже!")
 
 
+# Обработчик команды /top (только для администраторов): популярные слова
+@dp.message(Command("top"))
+async def on_top(m: Message, command: CommandObject):
+    if m.from_user.id not in ADMIN_IDS:
+        return
+    
+    try:
+        limit = min(int(command.args or 20), 50)
+    except ValueError:
+        await m.answer("Использование: /top [сколько слов, до 50]")
+        return
+    try:
+        all_time = await db.popular_words(limit)
+        # Сколько из прогреваемого топа уже в кеше Skyeng — ориентир для CACHE_SIZE
+        prewarm = await db.popular_words(PREWARM_WORDS)
+        cached = sum(1 for word, _ in prewarm if skyeng.is_cached(word))
+        await m.answer(render_top_words(all_time, popularity.top(10), popularity.window_total,
+                                        cached, len(prewarm)))
+    except Exception as e:
+        logger.error(f"Ошибка в /top: {e}")
+        await m.answer("😅 Не удалось собрать статистику")
+
+
+# Обработчик команды /profile (только для администраторов)
+@dp.message(Command("profile"))
+async def on_profile(m: Message, command: CommandObject):
+    if m.from_user.id not in ADMIN_IDS:
+        return
+    
+    try:
+        seconds = int(command.args or 30)
+    except ValueError:
+        await m.answer("Использование: /profile [секунд]")
+        return
+    if profiler.running:
+        await m.answer("⏳ Профилирование уже идёт")
+        return
+    
+    await m.answer(f"🔬 Снимаю профиль {seconds} с...")
+    try:
+        result = await profiler.profile(seconds)
+        await m.answer_document(
+            BufferedInputFile(result["folded"].encode("utf-8"),
+                              filename=f"profile-{int(time.time())}.folded"),
+            caption=(f"{result['samples']} сэмплов за {result['seconds']} с. "
+                     f"Открыть: speedscope.app или flamegraph.pl"),
+        )
+    except Exception as e:
+        logger.error(f"Ошибка в /profile: {e}")
+        await m.answer("😅 Не удалось снять профиль")
+
+
+async def report_broadcast(broadcast: dict):
+    """Итог рассылки — тому, кто её запустил"""
+    await bot.send_message(broadcast["created_by"], render_broadcast_report(broadcast))
+
+
+# Обработчик команды /broadcast (только для администраторов):
+# /broadcast текст — предпросмотр и подтверждение; status, stop, resume
+@dp.message(Command("broadcast"))
+async def on_broadcast(m: Message, command: CommandObject):
+    if m.from_user.id not in ADMIN_IDS:
+        return
+    
+    action = (command.args or "").strip().lower()
+    try:
+        if action == "status":
+            stats = broadcaster.stats()
+            if not stats["running"]:
+                await m.answer("Рассылка сейчас не идёт")
+            else:
+                await m.answer(render_broadcast_report(stats))
+        elif action == "stop":
+            if broadcaster.cancel():
+                await m.answer("⏹ Останавливаю рассылку...")
+            else:
+                await m.answer("Рассылка сейчас не идёт")
+        elif action == "resume":
+            # Прерванная остановкой бота (в многопроцессном режиме сама не продолжается)
+            if broadcaster.running:
+                await m.answer("⏳ Рассылка уже идёт")
+            else:
+                await broadcaster.resume(bot, report_broadcast)
+                await m.answer("▶️ Продолжаю рассылку" if broadcaster.running
+                               else "Прерванных рассылок нет")
+        elif not action:
+            await m.answer("Использование: /broadcast текст | status | stop | resume")
+        else:
+            # Текст — с разметкой исходного сообщения, без самой команды
+            text = m.html_text.split(maxsplit=1)[1]
+            broadcast_id = await db.create_broadcast(text, m.from_user.id)
+            await m.answer(text)
+            await m.answer("👆 Так сообщение увидят все пользователи. Отправляем?",
+                           reply_markup=kb_broadcast_confirm(broadcast_id))
+    except Exception as e:
+        logger.error(f"Ошибка в /broadcast: {e}")
+        await m.answer("😅 Ошибка при работе с рассылкой")
+
+
+async def add_word_list(m: Message, words: list):
+    """Список слов одним сообщением: параллельный поиск, одна запись в БД, сводка"""
+    logger.debug("Поиск списка из %d слов", len(words), extra={"user_id": m.from_user.id})
+    user = await db.get_or_create_user(m.from_user.id, m.from_user.username,
+                                       m.from_user.first_name)
+    found = await lookup_words(skyeng, words)
+    await db.add_words_to_user(user['id'], [meaning for _, meaning in found if meaning])
+    for word, meaning in found:
+        if meaning:
+            popularity.add(word)
+
+    rows = [(word, (meaning.get("translation") or {}).get("text", "") if meaning else None)
+            for word, meaning in found]
+    bulk_id = bulk_results.put(rows)
+    pages = page_count(len(rows))
+    await m.answer(render_bulk_page(rows, 0, BULK_PAGE_SIZE),
+                   reply_markup=kb_bulk_pages(bulk_id, 0, pages))
+
+
+# Обработчик команды /remind — ежедневное напоминание о повторении
+@dp.message(Command("remind"))
+async def on_remind(m: Message, command: CommandObject):
+    args = (command.args or "").strip()
+    try:
+        user = await db.get_or_create_user(m.from_user.id, m.from_user.username,
+                                           m.from_user.first_name)
+        if not args:
+            reminder = await db.get_reminder(user['id'])
+            await m.answer(render_reminder_settings(reminder, REMINDER_UTC_OFFSET))
+            return
+        if args.lower() in ("off", "выкл", "стоп"):
+            if await db.delete_reminder(user['id']):
+                await m.answer("🔕 Напоминания выключены")
+            else:
+                await m.answer("Напоминания и так выключены")
+            return
+        
+        try:
+            local_minute, utc_offset = parse_reminder_time(args, REMINDER_UTC_OFFSET)
+        except ValueError:
+            await m.answer("🤔 Не понял время. Пример: /remind 19:30 или /remind 19:30 +5")
+            return
+        await db.set_reminder(user['id'], local_minute, utc_offset,
+                              next_fire(local_minute, utc_offset, time.time()))
+        reminder_scheduler.wake()
+        hours, minutes = divmod(local_minute, 60)
+        await m.answer(f"⏰ Буду напоминать о повторении каждый день в {hours:02d}:{minutes:02d}")
+    except Exception as e:
+        logger.error(f"Ошибка в /remind: {e}")
+        await m.answer("😅 Не удалось настроить напоминание. Попробуй позже!")
+
+
+FIND_PAGE_SIZE = 10
+# callback_data ограничена 64 байтами: запрос /find едет в ней целиком
+FIND_QUERY_BYTES = 48
+
+
+async def find_page(user_id: int, query: str, page: int):
+    """Текст и клавиатура страницы /find; лишняя строка в выборке — признак следующей страницы"""
+    rows = await db.search_user_words(user_id, query, FIND_PAGE_SIZE + 1, page * FIND_PAGE_SIZE)
+    has_next = len(rows) > FIND_PAGE_SIZE
+    rows = rows[:FIND_PAGE_SIZE]
+    return (render_find_results(query, rows, page, FIND_PAGE_SIZE),
+            kb_find_pages(query, page, has_next))
+
+
+# Обработчик команды /find — поиск по своему словарю
+@dp.message(Command("find"))
+async def on_find(m: Message, command: CommandObject):
+    query = " ".join((command.args or "").split())
+    query = query.encode()[:FIND_QUERY_BYTES].decode(errors="ignore").strip()
+    # Из запроса без слов длиной от MIN_SEARCH_TERM искать нечего
+    if fts_query(m.from_user.id, query) is None:
+        await m.answer(f"Использование: /find слово или перевод "
+                       f"(можно начало от {MIN_SEARCH_TERM} букв: /find прив)")
+        return
+    if not db.search_enabled:
+        await m.answer("😔 Поиск по словарю сейчас недоступен")
+        return
+    try:
+        user = await db.get_user_by_telegram_id(m.from_user.id)
+        if not user:
+            await m.answer("😔 Сначала запусти бота командой /start")
+            return
+        text, markup = await find_page(user['id'], query, 0)
+        await m.answer(text, reply_markup=markup)
+    except Exception as e:
+        logger.error(f"Ошибка в /find: {e}")
+        await m.answer("😅 Не удалось выполнить поиск. Попробуй позже!")
+
+
+# Обработчик команды /export [csv|jsonl|anki]
+@dp.message(Command("export"))
+async def on_export(m: Message, command: CommandObject):
+    fmt = (command.args or "csv").strip().lower()
+    if fmt not in FORMATS:
+        await m.answer("Использование: /export [csv|jsonl|anki]")
+        return
+    user = await db.get_user_by_telegram_id(m.from_user.id)
+    if not user:
+        await m.answer("😔 Сначала запусти бота командой /start")
+        return
+    if m.from_user.id in transfers_running:
+        await m.answer("⏳ Перенос словаря уже идёт, дождись его окончания")
+        return
+    
+    transfers_running.add(m.from_user.id)
+    fd, path = tempfile.mkstemp(suffix=f".{EXTENSIONS[fmt]}")
+    os.close(fd)
+    try:
+        status = await m.answer("📤 Выгружаю словарь...")
+        progress = Progress(lambda done: status.edit_text(f"📤 Выгружено слов: {done}"))
+        exported = await export_words(db, user['id'], fmt, path, progress)
+        if not exported:
+            await status.edit_text("📚 Твой словарь пуст — выгружать нечего")
+            return
+        await m.answer_document(
+            FSInputFile(path, filename=f"dictionary.{EXTENSIONS[fmt]}"),
+            caption=f"📚 Слов: {exported}",
+        )
+        await status.delete()
+    except Exception as e:
+        logger.error(f"Ошибка в /export: {e}")
+        await m.answer("😅 Не удалось выгрузить словарь. Попробуй позже!")
+    finally:
+        transfers_running.discard(m.from_user.id)
+        os.remove(path)
+
+
+async def import_document(m: Message):
+    """Скачать присланный файл на диск и добавить слова из него в словарь"""
+    document = m.document
+    fmt = detect_format(document.file_name or "")
+    if fmt is None:
+        await m.answer("😔 Поддерживаются файлы .csv, .jsonl и .txt (текстовый экспорт Anki)")
+        return
+    if (document.file_size or 0) > MAX_IMPORT_BYTES:
+        await m.answer("😔 Файл больше 20 МБ — раздели его на части")
+        return
+    if m.from_user.id in transfers_running:
+        await m.answer("⏳ Перенос словаря уже идёт, дождись его окончания")
+        return
+    
+    transfers_running.add(m.from_user.id)
+    fd, path = tempfile.mkstemp(suffix=f".{EXTENSIONS[fmt]}")
+    os.close(fd)
+    try:
+        user = await db.get_or_create_user(m.from_user.id, m.from_user.username,
+                                           m.from_user.first_name)
+        status = await m.answer("📥 Загружаю файл...")
+        await m.bot.download(document, destination=path)
+        progress = Progress(lambda done: status.edit_text(f"📥 Добавлено слов: {done}..."))
+        result = await import_words(db, user['id'], fmt, path, progress)
+        await status.edit_text(
+            f"✅ Импорт завершён\n\n"
+            f"📚 Добавлено: {result['added']}\n"
+            f"🔁 Уже были в словаре: {result['duplicates']}\n"
+            f"⚠️ Пропущено строк без слова или перевода: {result['invalid']}"
+        )
+    except Exception as e:
+        logger.error(f"Ошибка импорта словаря: {e}")
+        await m.answer("😅 Не удалось импортировать файл. Проверь формат и попробуй ещё раз!")
+    finally:
+        transfers_running.discard(m.from_user.id)
+        os.remove(path)
+
+
+# Обработчик команды /import (и файла с подписью /import)
+@dp.message(Command("import"))
+async def on_import(m: Message):
+    if m.document:
+        await import_document(m)
+        return
+    awaiting_import[m.from_user.id] = time.monotonic() + IMPORT_WAIT
+    await m.answer("📥 Пришли файл со словами:\n"
+                   "• .csv — колонки word, translation (transcription, part_of_speech по желанию)\n"
+                   "• .jsonl — по объекту {\"word\": ..., \"translation\": ...} в строке\n"
+                   "• .txt — текстовый экспорт Anki: слово и перевод через табуляцию\n\n"
+                   "Слова, которые уже есть в словаре, пропущу.")
+
+
+# Файлы: импортируем, если перед этим была команда /import
+@dp.message(F.document)
+async def on_document(m: Message):
+    now = time.monotonic()
+    for user_id in [u for u, deadline in awaiting_import.items() if deadline < now]:
+        del awaiting_import[user_id]
+    if awaiting_import.pop(m.from_user.id, None) is None:
+        await m.answer("📎 Чтобы добавить слова из файла, сначала отправь /import")
+        return
+    await import_document(m)
+
+
 # Обработчик текстовых сообщений
 @dp.message()
 async def on_text(m: Message):
     if m.text.startswith('/'):
         return
-        
+    
+    # Несколько слов по строкам или через запятую — добавляем списком
+    words_list = parse_word_list(m.text)
+    if words_list:
+        try:
+            await add_word_list(m, words_list)
+        except Exception as e:
+            logger.error(f"Ошибка при добавлении списка из {len(words_list)} слов: {e}")
+            await m.answer("😅 Не удалось обработать список. Попробуй позже!")
+        return
+    
+    await search_word(m, m.from_user, m.text)
+
+
+async def search_word(m: Message, from_user: User, query: str, check_spelling: bool = True):
+    """Карточка слова: поиск в Skyeng, сохранение в словарь, ответ в чат сообщения m"""
+    # Опечатка в знакомом слове: предлагаем исправление, не дожидаясь пустого ответа API
+    if check_spelling:
+        suggestions = spelling.suspicious(query)
+        if suggestions:
+            logger.debug("Похоже на опечатку: %s -> %s", query, suggestions)
+            await m.answer("🤔 Может быть, имелось в виду:",
+                           reply_markup=kb_spelling(suggestions, query))
+            return
+    
     try:
-        logger.info(f"Поиск слова: {m.text}")
+        logger.debug("Поиск слова: %s", query, extra={"user_id": from_user.id})
         
         # Поиск слов
-        words = await skyeng.search_words(m.text)
+        words = await skyeng.search_words(query)
         if not words:
-            await m.answer("😔 Слово не найдено. Попробуй другое!")
+            suggestions = spelling.lookup(query)
+            if suggestions:
+                await m.answer("😔 Слово не найдено. Может быть, имелось в виду:",
+                               reply_markup=kb_spelling(suggestions))
+            else:
+                await m.answer("😔 Слово не найдено. Попробуй другое!")
             return
+        popularity.add(query)
         
         # Получаем детали первого слова
         # API теперь возвращает meanings напрямую
         meanings = words[0].get("meanings", [])
-        logger.info(f"Получены meanings: {meanings}")
+        logger.debug("Получены meanings: %s", meanings)
         
         if not meanings:
             logger.warning("meanings пустой!")
@@ -213,28 +803,22 @@ async def on_text(m: Message):
             return
         
         meaning = meanings[0]
-        logger.info(f"Выбранное meaning: {meaning}")
         
         # Сохраняем слово в словарь пользователя
         try:
-            logger.info("Начинаем сохранение в базу данных...")
-            user = await db.get_or_create_user(m.from_user.id)
-            logger.info(f"Пользователь получен: {user}")
+            user = await db.get_or_create_user(from_user.id)
             
             # Добавляем слово из родительского объекта
             meaning_with_word = meaning.copy()
             meaning_with_word["word"] = words[0]["text"]  # Добавляем английское слово
             
             await db.add_word_to_user(user['id'], meaning_with_word)
-            logger.info("Слово сохранено в базу данных")
         except Exception as e:
             if "UNIQUE constraint failed" in str(e):
                 # Пользователь уже существует, получаем его данные
-                user = await db.get_user_by_telegram_id(m.from_user.id)
+                user = await db.get_user_by_telegram_id(from_user.id)
                 if user:
                     await db.add_word_to_user(user['id'], meaning)
-                    logger.info("Слово сохранено в базу данных "
-                               "(пользователь уже существовал)")
                 else:
                     logger.error(f"Не удалось получить пользователя: {e}")
                     await m.answer("😔 Не удалось сохранить слово. "
@@ -247,12 +831,11 @@ async def on_text(m: Message):
         
         # Отправляем карточку слова
         try:
-            logger.info(f"Данные meaning: {meaning}")
+            logger.debug("Данные meaning: %s", meaning)
             # Добавляем слово из родительского объекта
             meaning_with_word = meaning.copy()
             meaning_with_word["word"] = words[0]["text"]  # Добавляем слово
             card_text = render_word_card(meaning_with_word)
-            logger.info(f"Создана карточка: {card_text[:100]}...")
 
             
             # Проверяем наличие изображения
@@ -269,27 +852,31 @@ async def on_text(m: Message):
                         caption=card_text,
                         reply_markup=kb_search_card()
                     )
-                    logger.info("Карточка с изображением отправлена успешно")
                 except Exception as e:
                     logger.warning(f"Не удалось отправить изображение: {e}")
                     # Отправляем только текст
                     await m.answer(card_text, reply_markup=kb_search_card())
-                    logger.info("Карточка без изображения отправлена успешно")
             else:
                 # Отправляем только текст
                 await m.answer(card_text, reply_markup=kb_search_card())
-                logger.info("Карточка без изображения отправлена успешно")
         except Exception as e:
             logger.error(f"Ошибка в render_word_card: {e}")
             logger.error(f"Тип данных meaning: {type(meaning)}")
             await m.answer("😔 Ошибка при создании карточки слова")
         
     except Exception as e:
-        logger.error(f"Ошибка при поиске слова '{m.text}': {e}")
+        logger.error(f"Ошибка при поиске слова '{query}': {e}")
         await m.answer("😅 Упс! Что-то пошло не так. Проблема с сетью "
                        "или сервисом. Попробуй позже!")
 
 
+# Кнопка исправления опечатки: ищем выбранное слово как есть
+@dp.callback_query(lambda c: c.data.startswith("spell_"))
+async def on_spelling(c: CallbackQuery):
+    await c.answer()
+    await search_word(c.message, c.from_user, c.data[len("spell_"):], check_spelling=False)
+
+
 # Обработчик кнопки "Произнести"
 @dp.callback_query(lambda c: c.data == "speak")
 async def on_pronounce(c: CallbackQuery):
@@ -307,7 +894,7 @@ async def on_pronounce(c: CallbackQuery):
                 .strip())
         
         # Ищем слово заново для получения озвучки
-        logger.info(f"Ищем озвучку для слова: '{word}'")
+        logger.debug("Ищем озвучку для слова: %s", word)
         words = await skyeng.search_words(word)
         if not words:
             await c.answer("😔 Озвучка не найдена!")
@@ -321,7 +908,7 @@ async def on_pronounce(c: CallbackQuery):
         
         meaning = meanings[0]
         sound_url = meaning.get("soundUrl")
-        logger.info(f"Найден soundUrl: {sound_url}")
+        logger.debug("Найден soundUrl: %s", sound_url)
         
         if sound_url:
             try:
@@ -397,12 +984,11 @@ async def on_examples(c: CallbackQuery):
 @dp.callback_query(lambda c: c.data == "quiz")
 async def on_quiz(c: CallbackQuery):
     try:
-        logger.info(f"Начинаем квиз для пользователя {c.from_user.id}")
+        logger.debug("Квиз по кнопке", extra={"user_id": c.from_user.id})
         
         # Получаем слова пользователя для квиза
         try:
             user = await db.get_or_create_user(c.from_user.id)
-            logger.info(f"Пользователь получен: {user}")
         except Exception as e:
             if "UNIQUE constraint failed" in str(e):
                 # Пользователь уже существует, получаем его данные
@@ -415,35 +1001,14 @@ async def on_quiz(c: CallbackQuery):
                 await c.answer("😔 Ошибка при работе с пользователем!")
                 return
         
-        words = await db.get_user_words(c.from_user.id, limit=5)
-        logger.info(f"Получены слова для квиза: {len(words)} слов")
+        quiz = await build_quiz(user['id'])
         
-        if len(words) < 2:
-            await c.answer("�� Добавь больше слов в словарь для квиза!")
+        if not quiz:
+            await c.answer("😔 Добавь больше слов в словарь для квиза!")
             return
         
-        # Выбираем случайное слово
-        import random
-        quiz_word = random.choice(words)
-        logger.info(f"Выбранное слово для квиза: {quiz_word}")
-        
-        # Создаем варианты ответов
-        all_words = [w['translation'] for w in words
-                     if w['translation'] != quiz_word['translation']]
-        options = ([quiz_word['translation']] +
-                  random.sample(all_words, min(3, len(all_words))))
-        random.shuffle(options)
-        correct_index = options.index(quiz_word['translation'])
-        
-        # Создаем кнопки для квиза
-        builder = InlineKeyboardBuilder()
-        for i, option in enumerate(options):
-            builder.button(text=option, callback_data=f"quiz_answer_{i}_{correct_index}")
-        builder.adjust(1)
-        
-        logger.info(f"Создаем вопрос квиза для слова: '{quiz_word['word']}'")
-        question_text = render_quiz_question(quiz_word['word'], options, correct_index)
-        await c.message.answer(question_text, reply_markup=builder.as_markup())
+        question_text, markup = quiz
+        await c.message.answer(question_text, reply_markup=markup)
         await c.answer()
         
     except Exception as e:
@@ -457,12 +1022,14 @@ async def on_quiz_answer(c: CallbackQuery):
     try:
         # Получаем данные из callback_data
         data = c.data.split("_")
-        if len(data) != 4:
+        if len(data) not in (4, 5):
             await c.answer("😅 Ошибка в данных квиза!")
             return
         
         answer_index = int(data[2])
         correct_index = int(data[3])
+        # В старых сообщениях id слова нет
+        user_word_id = int(data[4]) if len(data) == 5 else None
         
         # Получаем пользователя для обновления статистики
         user = await db.get_or_create_user(c.from_user.id)
@@ -479,26 +1046,18 @@ async def on_quiz_answer(c: CallbackQuery):
                 option = line.strip().split('.', 1)[1].strip()
                 options.append(option)
         
+        # Учитываем ответ в статистике и по слову (для взвешенной выборки);
+        # запись копится в буфере и уходит в БД пакетом
+        db.queue_answer(user['id'], user_word_id, answer_index == correct_index)
+        
         # Проверяем ответ
         if answer_index == correct_index:
             result_text = "🎉 Правильно!"
-            # Увеличиваем счетчик правильных ответов
-            await db.update_user_stats(user['id'], correct_answers=1)
         else:
             result_text = f"❌ Неправильно! Правильный ответ: {options[correct_index]}"
-            # Увеличиваем счетчик неправильных ответов
-            await db.update_user_stats(user['id'], wrong_answers=1)
-        
-        # Создаем кнопку для следующего раунда
-        from aiogram.utils.keyboard import InlineKeyboardBuilder
-        builder = InlineKeyboardBuilder()
-        builder.button(text="🔄 Следующий раунд", callback_data="quiz_next")
-        builder.adjust(1)
         
-        logger.info(f"Создана кнопка 'Следующий раунд' с callback_data: quiz_next")
-        
-        # Отправляем результат с кнопкой
-        await c.message.answer(result_text, reply_markup=builder.as_markup())
+        # Отправляем результат с кнопкой следующего раунда
+        await c.message.answer(result_text, reply_markup=kb_quiz_next())
         await c.answer()
         
     except Exception as e:
@@ -508,44 +1067,21 @@ async def on_quiz_answer(c: CallbackQuery):
 # Обработчик кнопки "Следующий раунд" - должен быть ПЕРЕД обработчиком quiz_answer
 @dp.callback_query(lambda c: c.data == "quiz_next")
 async def on_quiz_next(c: CallbackQuery):
-    logger.info("=== ОБРАБОТЧИК QUIZ_NEXT ВЫЗВАН ===")
     try:
-        logger.info(f"Получен запрос на следующий раунд квиза от пользователя {c.from_user.id}")
-        logger.info(f"Callback data: {c.data}")
+        logger.debug("Следующий раунд квиза", extra={"user_id": c.from_user.id})
         
-        # Получаем слова пользователя для квиза
+        # Получаем пользователя и собираем квиз по его словарю
         user = await db.get_or_create_user(c.from_user.id)
-        words = await db.get_user_words(c.from_user.id, limit=5)
-        logger.info(f"Найдено слов для квиза: {len(words)}")
+        quiz = await build_quiz(user['id'])
         
-        if len(words) < 2:
+        if not quiz:
             await c.answer("😔 Добавь больше слов в словарь для квиза!")
             return
         
-        # Выбираем случайное слово
-        import random
-        quiz_word = random.choice(words)
-        logger.info(f"Выбранное слово для квиза: {quiz_word}")
-        
-        # Создаем варианты ответов
-        all_words = [w['translation'] for w in words
-                     if w['translation'] != quiz_word['translation']]
-        options = ([quiz_word['translation']] +
-                  random.sample(all_words, min(3, len(all_words))))
-        random.shuffle(options)
-        correct_index = options.index(quiz_word['translation'])
-        
-        # Создаем кнопки для квиза
-        builder = InlineKeyboardBuilder()
-        for i, option in enumerate(options):
-            builder.button(text=option, callback_data=f"quiz_answer_{i}_{correct_index}")
-        builder.adjust(1)
-        
-        logger.info(f"Создаем вопрос квиза для слова: '{quiz_word['word']}'")
-        question_text = render_quiz_question(quiz_word['word'], options, correct_index)
+        question_text, markup = quiz
         
         # Отправляем новое сообщение с квизом
-        await c.message.answer(question_text, reply_markup=builder.as_markup())
+        await c.message.answer(question_text, reply_markup=markup)
         await c.answer()
         
     except Exception as e:
@@ -553,6 +1089,74 @@ async def on_quiz_next(c: CallbackQuery):
         await c.answer("😅 Ошибка при создании квиза!")
 
 
+# Листание итога списка слов
+@dp.callback_query(lambda c: c.data.startswith("bulk_page_"))
+async def on_bulk_page(c: CallbackQuery):
+    try:
+        _, _, bulk_id, page = c.data.split("_")
+        rows = bulk_results.get(int(bulk_id))
+        if rows is None:
+            await c.answer("⌛ Список устарел, пришли его ещё раз")
+            return
+        pages = page_count(len(rows))
+        page = min(max(int(page), 0), pages - 1)
+        await c.message.edit_text(render_bulk_page(rows, page, BULK_PAGE_SIZE),
+                                  reply_markup=kb_bulk_pages(int(bulk_id), page, pages))
+        await c.answer()
+    except Exception as e:
+        logger.error(f"Ошибка при листании списка: {e}")
+        await c.answer("😅 Не удалось открыть страницу")
+
+
+# Листание результатов /find: запрос — в callback_data
+@dp.callback_query(lambda c: c.data.startswith("find_"))
+async def on_find_page(c: CallbackQuery):
+    try:
+        _, page, query = c.data.split("_", 2)
+        page = max(int(page), 0)
+        user = await db.get_or_create_user(c.from_user.id)
+        text, markup = await find_page(user['id'], query, page)
+        await c.message.edit_text(text, reply_markup=markup)
+        await c.answer()
+    except Exception as e:
+        logger.error(f"Ошибка при листании /find: {e}")
+        await c.answer("😅 Не удалось открыть страницу")
+
+
+# Обработчик подтверждения рассылки
+@dp.callback_query(lambda c: c.data.startswith("broadcast_"))
+async def on_broadcast_confirm(c: CallbackQuery):
+    if c.from_user.id not in ADMIN_IDS:
+        await c.answer()
+        return
+    
+    try:
+        _, action, broadcast_id = c.data.split("_")
+        broadcast = await db.get_broadcast(int(broadcast_id))
+        if not broadcast or broadcast["status"] != "draft":
+            await c.answer("Эта рассылка уже запускалась")
+            return
+        if action == "cancel":
+            await db.save_broadcast_progress(broadcast["id"], 0, 0, 0, 0, [], "cancelled")
+            await c.message.edit_text("✖️ Рассылка отменена")
+        elif broadcaster.start(bot, broadcast, on_finish=report_broadcast):
+            await c.message.edit_text(f"📣 Рассылка #{broadcast['id']} запущена. "
+                                      f"Ход: /broadcast status")
+        else:
+            await c.answer("⏳ Уже идёт другая рассылка")
+            return
+        await c.answer()
+    except Exception as e:
+        logger.error(f"Ошибка при запуске рассылки: {e}")
+        await c.answer("😅 Не удалось запустить рассылку")
+
+
+# Кнопки-подписи (номер страницы) ничего не делают
+@dp.callback_query(lambda c: c.data == "noop")
+async def on_noop(c: CallbackQuery):
+    await c.answer()
+
+
 # Обработчик кнопки "Произнести случайное слово"
 @dp.callback_query(lambda c: c.data == "speak_random")
 async def on_speak_random(c: CallbackQuery):
@@ -566,11 +1170,10 @@ async def on_speak_random(c: CallbackQuery):
             return
         
         # Выбираем случайное слово
-        import random
         random_word = random.choice(words)
         word_text = random_word['word']
         
-        logger.info(f"Ищем озвучку для случайного слова: '{word_text}'")
+        logger.debug("Ищем озвучку для случайного слова: %s", word_text)
         
         # Ищем слово в API для получения озвучки
         words_api = await skyeng.search_words(word_text)
@@ -586,7 +1189,7 @@ async def on_speak_random(c: CallbackQuery):
         
         meaning = meanings[0]
         sound_url = meaning.get("soundUrl")
-        logger.info(f"Найден soundUrl: {sound_url}")
+        logger.debug("Найден soundUrl: %s", sound_url)
         
         if sound_url:
             try:
@@ -603,15 +1206,255 @@ async def on_speak_random(c: CallbackQuery):
         logger.error(f"Ошибка при получении озвучки случайного слова: {e}")
         await c.answer("😅 Ошибка при загрузке озвучки!")
 
+def create_bot(session: Optional[BaseSession] = None) -> Bot:
+    """Создаёт бота (один раз на процесс); session — своя сессия Bot API
+    (нагрузочные тесты подставляют фейковую)"""
+    global bot
+    if bot is None:
+        if not BOT_TOKEN:
+            raise ValueError("BOT_TOKEN не найден в переменных окружения!")
+        bot = Bot(token=BOT_TOKEN, session=session,
+                  default=DefaultBotProperties(parse_mode="HTML"))
+        # Спан Telegram снаружи лимитера: в него входит ожидание очереди
+        bot.session.middleware(TelegramSpans())
+        bot.session.middleware(outbound)
+    return bot
+
+
+def startup_phases():
+    """
+    Фазы запуска для run_startup: схема БД обязательна, остальное — прогрев.
+    Цепочки идут параллельно: схема → прогрев БД; соединения со Skyeng
+    и Telegram; снимок кеша Skyeng с диска.
+    """
+    return [
+        [("schema", db.init, True), ("db_warmup", db.warm_up, False)],
+        [("skyeng_warmup", skyeng.warm_up, False)],
+        [("telegram_warmup", bot.get_me, False)],
+        [("skyeng_cache", lambda: skyeng.load_cache(SKYENG_CACHE_PATH), False)],
+    ]
+
+
+def background_phases():
+    """
+    Прогрев после начала приёма апдейтов: numpy нужен только к первому квизу,
+    индекс опечаток — к первой опечатке (без него запросы идут в API как есть),
+    рейтинг — к первому /top_learners.
+    Рассылка, прерванная остановкой, продолжается с контрольной точки.
+    """
+    return [("distractors_warmup", distractors.warm_up, False),
+            ("spelling_index", build_spell_index, False),
+            ("skyeng_prewarm", prewarm_popular, False),
+            ("leaderboard", lambda: leaderboard.rebuild(db), False),
+            ("broadcast_resume", lambda: broadcaster.resume(bot, report_broadcast), False)]
+
+
+async def prewarm_popular():
+    """
+    Самые искомые слова (word_popularity), которых нет в снимке кеша, —
+    в кеш Skyeng заранее: первые запросы популярных слов не ждут API,
+    а при остановке попадают в снимок кеша на диске
+    """
+    words = [word for word, _ in await db.popular_words(PREWARM_WORDS)
+             if not skyeng.is_cached(word)]
+    if words:
+        found = await lookup_words(skyeng, words, concurrency=PREWARM_CONCURRENCY)
+        logger.info(f"Кеш Skyeng прогрет: {sum(1 for _, meaning in found if meaning)} "
+                    f"популярных слов из {len(words)}")
+
+
+async def build_spell_index():
+    """
+    Индекс опечаток из частых слов базы и удачных запросов из кеша Skyeng.
+    Строится в потоке новым объектом и подменяет старый целиком: слова,
+    добавленные подписчиками за время сборки, в новый индекс не попадут
+    до следующего сохранения.
+    """
+    global spelling
+    frequencies = await db.word_frequencies(SPELL_MAX_WORDS, SPELL_SCAN_ROWS)
+    queries = skyeng.known_queries()
+    index = SpellIndex()
+    await asyncio.to_thread(index.build, [*frequencies, *((query, 1) for query in queries)])
+    spelling = index
+
+
+
+async def setup_webhook() -> bool:
+    """Регистрирует вебхук в Telegram. False — нужно откатиться на polling"""
+    if not WEBHOOK_URL:
+        logger.error("BOT_MODE=webhook, но WEBHOOK_URL не задан — используем polling")
+        return False
+    
+    try:
+        await bot.set_webhook(
+            url=WEBHOOK_URL.rstrip("/") + WEBHOOK_PATH,
+            secret_token=WEBHOOK_SECRET,
+            allowed_updates=dp.resolve_used_update_types(),
+        )
+    except Exception as e:
+        logger.error(f"Не удалось установить вебхук, используем polling: {e}")
+        return False
+    
+    logger.info(f"Вебхук установлен: {WEBHOOK_URL.rstrip('/')}{WEBHOOK_PATH}")
+    return True
+
+
+async def wait_for_stop_signal():
+    """Ждёт SIGINT/SIGTERM"""
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    await stop.wait()
+
+
+def register_shutdown(server: WebServer, flusher: asyncio.Task, popularity_flusher: asyncio.Task,
+                      leaderboard_checker: asyncio.Task, compactor: asyncio.Task):
+    """Шаги остановки: сначала перестаём принимать апдейты, потом
+    дорабатываем начатые, сбрасываем буферы и закрываем ресурсы по порядку"""
+    lifecycle.on_stop_accepting("webserver", server.stop_accepting)
+    # Фоновый сброс останавливаем до финального: отменённый посреди записи,
+    # он не должен разминуться с ним (flush_pending всё равно дописывает
+    # начатый пакет, финальный сброс его дожидается)
+    lifecycle.on_flush("db_flusher", lambda: stop_task(flusher))
+    lifecycle.on_flush("quiz_answers", db.flush_pending)
+    lifecycle.on_flush("popularity_flusher", lambda: stop_task(popularity_flusher))
+    lifecycle.on_flush("word_popularity", lambda: popularity.flush(db.add_word_searches))
+    lifecycle.on_flush("skyeng_cache",
+                       lambda: skyeng.save_cache(SKYENG_CACHE_PATH))
+    lifecycle.on_close("broadcast", broadcaster.stop)
+    lifecycle.on_close("reminders", reminder_scheduler.stop)
+    lifecycle.on_close("health", health.stop)
+    if recorder:
+        lifecycle.on_close("recorder", recorder.close)
+    lifecycle.on_close("leaderboard_checker", leaderboard_checker.cancel)
+    lifecycle.on_close("activity_compactor", compactor.cancel)
+    lifecycle.on_close("skyeng", skyeng.aclose)
+    lifecycle.on_close("database", db.close)
+    lifecycle.on_close("webserver", server.stop)
+    lifecycle.on_close("bot_session", bot.session.close)
+
+
+def set_worker_count(workers: int):
+    """Пересчитать долю глобального лимита Telegram этого процесса под новое число воркеров"""
+    outbound.global_rate = GLOBAL_RATE / workers
+    broadcaster.rate = outbound.global_rate * BROADCAST_RATE_SHARE
+    reminder_scheduler.rate = outbound.global_rate * REMINDER_RATE_SHARE
+
+
+async def resize_workers(runtime, workers: int):
+    """Перебалансировка по SIGHUP: воркеры дорабатывают очереди, запускается новый набор"""
+    logger.info(f"Перебалансировка: {runtime.size} -> {workers} воркеров")
+    try:
+        await runtime.resize(workers)
+        set_worker_count(workers)
+    except Exception as e:
+        logger.error(f"Ошибка перебалансировки воркеров: {e}")
+
+
+async def run_sharded(server: WebServer, webhook: bool):
+    """
+    Многопроцессный режим: этот процесс только принимает апдейты
+    (вебхук или getUpdates) и раскладывает их по воркерам.
+    При остановке воркеры дорабатывают свои очереди и сбрасывают буферы.
+    """
+    # multiprocessing нужен только здесь — не тянем его в однопроцессный запуск
+    from .sharding import ShardedRuntime
+    
+    runtime = ShardedRuntime(WORKERS)
+    runtime.start()
+    REGISTRY.gauge("shard_queue_depth", "Апдейты в очереди воркера",
+                   lambda: {str(s["worker"]): s["queue"] for s in runtime.stats()},
+                   labels=("worker",))
+    health.add_queue("shards", lambda: sum(s["queue"] for s in runtime.stats()),
+                     MAX_SHARD_QUEUE)
+    supervisor = asyncio.create_task(runtime.supervise())
+    lifecycle.on_stop_accepting("supervisor", supervisor.cancel)
+    
+    def on_sighup():
+        # Число воркеров перечитывается из .env (иначе — из окружения при запуске)
+        try:
+            workers = int(dotenv_values().get("WORKERS") or WORKERS)
+        except ValueError as e:
+            logger.error(f"SIGHUP: неверное WORKERS в .env: {e}")
+            return
+        if workers < 1 or workers == runtime.size or runtime.resizing:
+            logger.info(f"SIGHUP: перебалансировка не нужна ({runtime.size} -> {workers})")
+            return
+        asyncio.create_task(resize_workers(runtime, workers))
+    
+    asyncio.get_running_loop().add_signal_handler(signal.SIGHUP, on_sighup)
+    if webhook:
+        server.enable_webhook_router(WEBHOOK_PATH, WEBHOOK_SECRET, runtime.route)
+        server.mode = "webhook-sharded"
+    else:
+        await bot.delete_webhook()
+        polling = asyncio.create_task(
+            runtime.run_polling(bot, allowed_updates=dp.resolve_used_update_types())
+        )
+        lifecycle.on_stop_accepting("polling", polling.cancel)
+        server.mode = "polling-sharded"
+    lifecycle.on_flush("shard_workers", runtime.stop, timeout=DRAIN_TIMEOUT + 5)
+    
+    await server.start()
+    server.ready = True
+    await wait_for_stop_signal()
+
+
 async def main():
     """Основная функция запуска бота"""
+    setup_logging()
+    if BOT_MODE == "webhook" and not WEBHOOK_SECRET:
+        raise ValueError("BOT_MODE=webhook требует WEBHOOK_SECRET в переменных окружения!")
+    create_bot()
+    server = WebServer(dp, bot, WEB_HOST, WEB_PORT, admin_token=ADMIN_TOKEN)
+    server.add_text_route("/metrics", REGISTRY.render, CONTENT_TYPE)
+    server.health = health.report
+    flusher = asyncio.create_task(db.run_flusher())
+    popularity_flusher = asyncio.create_task(popularity.run_flusher(db.add_word_searches))
+    leaderboard_checker = asyncio.create_task(leaderboard.run_checker(db))
+    # Сжатие истории активности — в одном процессе (в многопроцессном режиме — во фронте)
+    compactor = asyncio.create_task(run_compactor(db))
+    register_shutdown(server, flusher, popularity_flusher, leaderboard_checker, compactor)
     try:
-        logger.info("База данных инициализирована")
-        await dp.start_polling(bot)
+        timings = await run_startup(startup_phases())
+        start_background(background_phases(), timings)
+        health.start()
+        reminder_scheduler.start(bot)
+        
+        webhook = BOT_MODE == "webhook" and await setup_webhook()
+        if WORKERS > 1:
+            await run_sharded(server, webhook)
+            return
+        
+        if webhook:
+            server.enable_webhook(WEBHOOK_PATH, WEBHOOK_SECRET)
+        server.add_json_route("/throttling", throttling.stats)
+        server.add_json_route("/sender", outbound.stats)
+        await server.start()
+        
+        if webhook:
+            server.mode = "webhook"
+            server.ready = True
+            await wait_for_stop_signal()
+        else:
+            # Telegram не отдаёт getUpdates, пока установлен вебхук
+            await bot.delete_webhook()
+            server.mode = "polling"
+            server.ready = True
+            polling = asyncio.create_task(
+                dp.start_polling(bot, handle_signals=False, close_bot_session=False)
+            )
+            lifecycle.on_stop_accepting("polling", dp.stop_polling)
+            stop = asyncio.create_task(wait_for_stop_signal())
+            await asyncio.wait({polling, stop}, return_when=asyncio.FIRST_COMPLETED)
+            stop.cancel()
     except Exception as e:
         logger.error(f"Ошибка при запуске бота: {e}")
     finally:
+        await lifecycle.shutdown()
         logger.info("Бот остановлен")
+        stop_logging()
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    asyncio.run(main())
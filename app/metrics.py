@@ -0,0 +1,290 @@
+import bisect
+import functools
+import inspect
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+logger = logging.getLogger(__name__)
+
+# Границы корзин гистограмм, в секундах
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+Labels = Tuple[str, ...]
+# Метрики процесса для передачи в другой процесс: [(имя, help, тип, [(имя ряда, метки, значение)])]
+Snapshot = List[Tuple[str, str, str, List[Tuple[str, str, float]]]]
+
+
+def _format_labels(names: Tuple[str, ...], values: Labels, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _with_label(labels: str, extra: str) -> str:
+    """Добавить метку к уже отформатированным меткам ряда"""
+    if not extra:
+        return labels
+    return labels[:-1] + "," + extra + "}" if labels else "{" + extra + "}"
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if isinstance(value, int) or (isinstance(value, float) and value.is_integer()):
+        return str(int(value))
+    return repr(float(value))
+
+
+class Counter:
+    """Монотонный счётчик с метками"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help_text
+        self.label_names = labels
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, *labels: str, value: float = 1.0):
+        self._values[labels] = self._values.get(labels, 0.0) + value
+
+    def samples(self) -> Iterable[Tuple[str, str, float]]:
+        for labels, value in self._values.items():
+            yield self.name, _format_labels(self.label_names, labels), value
+
+
+class Gauge:
+    """
+    Значение, которое считывается при каждом запросе /metrics:
+    read() возвращает число или {кортеж меток: число}
+    """
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str, read: Callable[[], Any],
+                 labels: Tuple[str, ...] = (), kind: str = "gauge"):
+        self.name = name
+        self.help = help_text
+        self.label_names = labels
+        self.read = read
+        self.kind = kind
+
+    def samples(self) -> Iterable[Tuple[str, str, float]]:
+        value = self.read()
+        if isinstance(value, dict):
+            for labels, item in value.items():
+                if not isinstance(labels, tuple):
+                    labels = (labels,)
+                yield self.name, _format_labels(self.label_names, labels), item
+        else:
+            yield self.name, "", value
+
+
+class Histogram:
+    """
+    Гистограмма с фиксированными корзинами. observe() — бинарный поиск
+    корзины и три обновления в словаре; накопительные суммы по корзинам
+    (как требует формат Prometheus) считаются только при выдаче.
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.label_names = labels
+        self.buckets = tuple(sorted(buckets))
+        # метки -> [счётчики по корзинам (+Inf последней), сумма, количество]
+        self._series: Dict[Labels, List] = {}
+
+    def observe(self, value: float, *labels: str):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect.bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def samples(self) -> Iterable[Tuple[str, str, float]]:
+        for labels, (counts, total, count) in self._series.items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else _format_value(bound)
+                yield (f"{self.name}_bucket",
+                       _format_labels(self.label_names, labels, f'le="{le}"'), cumulative)
+            yield f"{self.name}_sum", _format_labels(self.label_names, labels), total
+            yield f"{self.name}_count", _format_labels(self.label_names, labels), count
+
+    def quantile(self, q: float, *labels: str) -> Optional[float]:
+        """Оценка квантиля по корзинам (верхняя граница корзины)"""
+        series = self._series.get(labels)
+        if not series or not series[2]:
+            return None
+        rank = q * series[2]
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets + (float("inf"),), series[0]):
+            cumulative += bucket_count
+            if cumulative >= rank:
+                return bound
+        return float("inf")
+
+
+class Registry:
+    """
+    Набор метрик процесса и их выдача в текстовом формате Prometheus.
+    В многопроцессном режиме фронт добавляет снимки метрик воркеров
+    (set_remote): тогда каждый ряд получает метку process.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, Any] = {}
+        self._remote: Dict[str, Snapshot] = {}
+
+    def _add(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Метрика {metric.name} уже зарегистрирована")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help_text: str, labels: Tuple[str, ...] = ()) -> Counter:
+        return self._add(Counter(name, help_text, labels))
+
+    def histogram(self, name: str, help_text: str, labels: Tuple[str, ...] = (),
+                  buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self._add(Histogram(name, help_text, labels, buckets))
+
+    def gauge(self, name: str, help_text: str, read: Callable[[], Any],
+              labels: Tuple[str, ...] = (), kind: str = "gauge") -> Gauge:
+        """kind="counter" — для счётчиков, которые ведёт сам объект (хиты кеша)"""
+        return self._add(Gauge(name, help_text, read, labels, kind))
+
+    def snapshot(self) -> Snapshot:
+        """Текущие значения всех метрик (сериализуются pickle для передачи фронту)"""
+        families = []
+        for metric in self._metrics.values():
+            try:
+                samples = list(metric.samples())
+            except Exception as e:
+                logger.error(f"Не удалось считать метрику {metric.name}: {e}")
+                continue
+            families.append((metric.name, metric.help, metric.kind, samples))
+        return families
+
+    def set_remote(self, process: str, snapshot: Snapshot):
+        """Последний снимок метрик другого процесса (воркера)"""
+        self._remote[process] = snapshot
+
+    def clear_remote(self):
+        self._remote.clear()
+
+    def render(self) -> str:
+        sources = [("front" if self._remote else "", self.snapshot()), *self._remote.items()]
+        # Ряды одной метрики из разных процессов — под общими HELP и TYPE
+        families: Dict[str, Tuple[str, str, List[str]]] = {}
+        for process, snapshot in sources:
+            extra = f'process="{_escape(process)}"' if process else ""
+            for name, help_text, kind, samples in snapshot:
+                family = families.setdefault(name, (help_text, kind, []))
+                family[2].extend(f"{sample}{_with_label(labels, extra)} {_format_value(value)}"
+                                 for sample, labels, value in samples)
+        lines = []
+        for name, (help_text, kind, samples) in families.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.extend(samples)
+        return "\n".join(lines) + "\n"
+
+
+# Метрики процесса бота
+REGISTRY = Registry()
+HANDLER_SECONDS = REGISTRY.histogram(
+    "bot_handler_seconds", "Время работы хендлера", ("handler",)
+)
+HANDLER_ERRORS = REGISTRY.counter(
+    "bot_handler_errors_total", "Исключения, вышедшие из хендлера", ("handler",)
+)
+SKYENG_SECONDS = REGISTRY.histogram(
+    "skyeng_request_seconds", "Время запроса к Skyeng API (без кеша)", ("endpoint", "outcome")
+)
+DB_SECONDS = REGISTRY.histogram(
+    "db_query_seconds", "Время вызова метода Database", ("method",), buckets=DB_BUCKETS
+)
+DB_ERRORS = REGISTRY.counter(
+    "db_errors_total", "Ошибки в методах Database (проброшенные и перехваченные)", ("method",)
+)
+
+
+class HandlerMetrics(BaseMiddleware):
+    """
+    Inner-middleware: время каждого хендлера по имени функции.
+    Вешается на dp.message и dp.callback_query (после фильтров,
+    поэтому handler в data уже известен).
+    """
+
+    def __init__(self, seconds: Histogram = HANDLER_SECONDS, errors: Counter = HANDLER_ERRORS):
+        self.seconds = seconds
+        self.errors = errors
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        handler_object = data.get("handler")
+        name = getattr(getattr(handler_object, "callback", None), "__name__", "unknown")
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        except Exception:
+            self.errors.inc(name)
+            raise
+        finally:
+            self.seconds.observe(time.perf_counter() - started, name)
+
+
+def timed(func: Callable[..., Awaitable[Any]], name: str, seconds: Histogram,
+          errors: Optional[Counter] = None) -> Callable[..., Awaitable[Any]]:
+    """Обёртка корутины: время вызова в seconds, исключения в errors"""
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return await func(*args, **kwargs)
+        except Exception:
+            if errors is not None:
+                errors.inc(name)
+            raise
+        finally:
+            seconds.observe(time.perf_counter() - started, name)
+
+    return wrapper
+
+
+def instrument(obj: Any, seconds: Histogram, errors: Optional[Counter] = None,
+               exclude: Iterable[str] = ()) -> List[str]:
+    """
+    Подменяет публичные async-методы объекта обёртками timed()
+    (на экземпляре, класс не меняется). Возвращает имена обёрнутых методов.
+    """
+    wrapped = []
+    skip = set(exclude)
+    for name, method in inspect.getmembers(type(obj), inspect.iscoroutinefunction):
+        if name.startswith("_") or name in skip:
+            continue
+        setattr(obj, name, timed(getattr(obj, name), name, seconds, errors))
+        wrapped.append(name)
+    return wrapped
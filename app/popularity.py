@@ -0,0 +1,179 @@
+import asyncio
+import logging
+from array import array
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Размер скетча: 4 ряда по 16k счётчиков (256 КБ). Ошибка оценки — не больше
+# ~e/16k ≈ 0.02% поисков окна с вероятностью 1 - e^-4 ≈ 98%
+SKETCH_WIDTH = 1 << 14
+SKETCH_DEPTH = 4
+# Сколько самых частых слов окна отслеживаем и сбрасываем в БД
+TOP_K = 200
+# Окно подсчёта: раз в столько секунд топ окна дописывается в word_popularity
+FLUSH_INTERVAL = 300
+
+_MASK64 = (1 << 64) - 1
+
+
+class CountMinSketch:
+    """
+    Count-Min Sketch с консервативным обновлением: оценка частоты ключа
+    по минимуму из depth счётчиков, память не зависит от числа разных ключей.
+    Оценка не меньше настоящей частоты и превышает её на долю от общего числа
+    добавлений. Хеши рядов — из одного hash() (схема Кирша–Митценмахера).
+    """
+
+    def __init__(self, width: int = SKETCH_WIDTH, depth: int = SKETCH_DEPTH):
+        if width & (width - 1):
+            raise ValueError("width должна быть степенью двойки")
+        self.width = width
+        self.depth = depth
+        self._mask = width - 1
+        self._rows = [array("I", bytes(4 * width)) for _ in range(depth)]
+
+    def _cells(self, key: str) -> List[Tuple[array, int]]:
+        h = hash(key) & _MASK64
+        low, high = h & 0xFFFFFFFF, (h >> 32) | 1
+        mask = self._mask
+        cells = []
+        for row in self._rows:
+            cells.append((row, low & mask))
+            low += high
+        return cells
+
+    def add(self, key: str, count: int = 1) -> int:
+        """Добавить count вхождений; возвращает новую оценку частоты ключа"""
+        cells = self._cells(key)
+        estimate = min(row[i] for row, i in cells) + count
+        # Консервативное обновление: растут только счётчики ниже новой оценки —
+        # меньше завышение от чужих ключей в тех же ячейках
+        for row, i in cells:
+            if row[i] < estimate:
+                row[i] = estimate
+        return estimate
+
+    def estimate(self, key: str) -> int:
+        return min(row[i] for row, i in self._cells(key))
+
+    def clear(self):
+        for row in self._rows:
+            row[:] = array("I", bytes(4 * self.width))
+
+
+class HeavyHitters:
+    """
+    Топ-k ключей по оценкам скетча: ключ с оценкой выше худшего в топе
+    вытесняет его. Худший пересчитывается (O(k)) только при вытеснении и
+    когда растёт сам худший — на частых ключах это редкость.
+    """
+
+    def __init__(self, k: int = TOP_K):
+        self.k = k
+        self._counts: Dict[str, int] = {}
+        self._min_key: Optional[str] = None
+        self._min = 0
+
+    def __len__(self) -> int:
+        return len(self._counts)
+
+    def offer(self, key: str, estimate: int):
+        counts = self._counts
+        if key in counts:
+            counts[key] = estimate
+            if key == self._min_key:
+                self._refresh_min()
+        elif len(counts) < self.k:
+            counts[key] = estimate
+            if self._min_key is None or estimate < self._min:
+                self._min_key, self._min = key, estimate
+        elif estimate > self._min:
+            del counts[self._min_key]
+            counts[key] = estimate
+            self._refresh_min()
+
+    def _refresh_min(self):
+        self._min_key = min(self._counts, key=self._counts.__getitem__)
+        self._min = self._counts[self._min_key]
+
+    def top(self, n: Optional[int] = None) -> List[Tuple[str, int]]:
+        ordered = sorted(self._counts.items(), key=lambda item: -item[1])
+        return ordered if n is None else ordered[:n]
+
+    def clear(self):
+        self._counts.clear()
+        self._min_key = None
+        self._min = 0
+
+
+class WordPopularity:
+    """
+    Потоковый подсчёт популярности найденных слов. Каждое добавление —
+    несколько операций над массивами скетча и словарём топа, без обращений
+    к БД. Подсчёт идёт окнами: раз в FLUSH_INTERVAL топ окна дописывается
+    в таблицу word_popularity (flush), а скетч и топ обнуляются. Редкие
+    слова в таблицу не попадают — её размер определяется популярными.
+    """
+
+    def __init__(self, width: int = SKETCH_WIDTH, depth: int = SKETCH_DEPTH, k: int = TOP_K):
+        self.sketch = CountMinSketch(width, depth)
+        self.heavy = HeavyHitters(k)
+        # Добавлений в текущем окне и всего с запуска
+        self.window_total = 0
+        self.total = 0
+
+    def add(self, word: str):
+        word = word.strip().lower()
+        if not word:
+            return
+        self.heavy.offer(word, self.sketch.add(word))
+        self.window_total += 1
+        self.total += 1
+
+    def estimate(self, word: str) -> int:
+        return self.sketch.estimate(word.strip().lower())
+
+    def top(self, n: int = 10) -> List[Tuple[str, int]]:
+        """Самые частые слова текущего окна с оценками"""
+        return self.heavy.top(n)
+
+    def drain(self) -> List[Tuple[str, int]]:
+        """Забрать топ окна и начать новое окно"""
+        items = self.heavy.top()
+        self.heavy.clear()
+        self.sketch.clear()
+        self.window_total = 0
+        return items
+
+    async def flush(self, save: Callable[[List[Tuple[str, int]]], Awaitable[object]]) -> int:
+        """Дописать топ окна через save (Database.add_word_searches); возвращает число слов"""
+        items = self.drain()
+        if not items:
+            return 0
+        try:
+            await save(items)
+        except BaseException as e:
+            # Возвращаем топ в новое окно, чтобы не потерять счёт популярных слов
+            # (и при отмене посреди записи — например, на остановке)
+            for word, count in items:
+                self.heavy.offer(word, self.sketch.add(word, count))
+            if isinstance(e, Exception):
+                logger.error(f"Ошибка сохранения популярности слов: {e}")
+            raise
+        logger.debug("Популярность слов: сброшено %d слов", len(items))
+        return len(items)
+
+    async def run_flusher(self, save: Callable[[List[Tuple[str, int]]], Awaitable[object]],
+                          interval: float = FLUSH_INTERVAL):
+        """Фоновая задача: сброс топа раз в окно"""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.flush(save)
+            except Exception:
+                pass  # уже залогировано, топ остался в памяти
+
+    def stats(self) -> Dict:
+        return {"total": self.total, "window_total": self.window_total,
+                "tracked": len(self.heavy)}
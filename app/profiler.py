@@ -0,0 +1,69 @@
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict
+
+logger = logging.getLogger(__name__)
+
+# Период опроса стека и пределы длительности одного профилирования
+SAMPLE_INTERVAL = 0.005
+MAX_SECONDS = 120
+MAX_DEPTH = 128
+
+
+class SamplingProfiler:
+    """
+    Статистический профайлер: фоновый поток раз в interval снимает стек
+    потока event loop (sys._current_frames) и копит одинаковые стеки.
+    Результат — collapsed stacks («a;b;c 42» на строку), формат
+    flamegraph.pl и speedscope. Одновременно идёт не больше одного замера.
+    """
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL):
+        self.interval = interval
+        self.running = False
+
+    async def profile(self, seconds: float) -> Dict:
+        """Снимать стеки seconds секунд; вернуть {'folded', 'samples', 'seconds'}"""
+        if self.running:
+            raise RuntimeError("Профилирование уже идёт")
+        seconds = max(1.0, min(float(seconds), MAX_SECONDS))
+        self.running = True
+        stacks: Counter = Counter()
+        stop = threading.Event()
+        sampler = threading.Thread(
+            target=self._sample,
+            args=(threading.get_ident(), stacks, stop),
+            name="sampling-profiler",
+            daemon=True,
+        )
+        started = time.monotonic()
+        try:
+            sampler.start()
+            await asyncio.sleep(seconds)
+        finally:
+            stop.set()
+            await asyncio.to_thread(sampler.join)
+            self.running = False
+
+        folded = "\n".join(f"{stack} {count}" for stack, count in stacks.most_common())
+        samples = sum(stacks.values())
+        logger.info(f"Профилирование завершено: {samples} сэмплов, {len(stacks)} стеков")
+        return {"folded": folded + "\n", "samples": samples,
+                "seconds": round(time.monotonic() - started, 1)}
+
+    def _sample(self, thread_id: int, stacks: Counter, stop: threading.Event):
+        while not stop.wait(self.interval):
+            frame = sys._current_frames().get(thread_id)
+            stack = []
+            while frame is not None and len(stack) < MAX_DEPTH:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}"
+                             f":{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                stacks[";".join(reversed(stack))] += 1
@@ -0,0 +1,118 @@
+import hashlib
+import json
+import logging
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, Update
+
+logger = logging.getLogger(__name__)
+
+# Запись прекращается, когда файл дорастает до этого размера
+MAX_BYTES = 1024 ** 3
+
+
+class UpdateRecorder(BaseMiddleware):
+    """
+    Outer-middleware на dp.update: пишет входящие апдейты в журнал для
+    воспроизведения (bench.replay). Журнал — JSON-строки, только дописывание:
+      {"t": время, "m": {"u": пользователь, "text": ...}}             сообщение
+      {"t": время, "c": {"u": ..., "data": ..., "msg": {...}}}         кнопка
+      {"t": время, "s": {"key": "search:hello", "ms": 120.5, "r": ...}} ответ Skyeng
+    Telegram id заменяются хешем с солью (blake2b), имена не пишутся,
+    текст сохраняется. Каждая строка уходит одним write() в файл с O_APPEND —
+    воркеры многопроцессного режима могут писать в один журнал.
+    """
+
+    def __init__(self, path: str, salt: Optional[bytes] = None, max_bytes: int = MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        if not salt:
+            logger.warning("RECORD_SALT не задан: хеши пользователей в журналах "
+                           "разных запусков не совпадут")
+        self._salt = salt or os.urandom(16)
+        self._fd: Optional[int] = None
+        self._size = 0
+        self.recorded = 0
+        self.skyeng_recorded = 0
+        self.stopped = False
+
+    def anonymize(self, telegram_id: int) -> int:
+        """Стабильный (при той же соли) положительный id вместо настоящего"""
+        digest = hashlib.blake2b(str(telegram_id).encode(), key=self._salt[:64], digest_size=6)
+        return int.from_bytes(digest.digest(), "big") or 1
+
+    def _write(self, record: Dict):
+        if self.stopped:
+            return
+        if self._fd is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+            self._size = os.fstat(self._fd).st_size
+        line = (json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n").encode()
+        if self._size + len(line) > self.max_bytes:
+            logger.warning(f"Журнал апдейтов {self.path} достиг {self.max_bytes} байт, "
+                           f"запись остановлена")
+            self.stopped = True
+            return
+        os.write(self._fd, line)
+        self._size += len(line)
+
+    def _compact(self, update: Update) -> Optional[Dict]:
+        if update.message and update.message.from_user:
+            message = update.message
+            body = {"u": self.anonymize(message.from_user.id)}
+            if message.text is not None:
+                body["text"] = message.text
+            else:
+                body["kind"] = message.content_type
+            return {"m": body}
+        if update.callback_query:
+            callback = update.callback_query
+            body = {"u": self.anonymize(callback.from_user.id), "data": callback.data}
+            message = callback.message
+            if message is not None:
+                # Хендлеры кнопок читают текст и варианты квиза из сообщения бота
+                msg = {}
+                text = getattr(message, "text", None) or getattr(message, "caption", None)
+                if text:
+                    msg["text"] = text
+                markup = getattr(message, "reply_markup", None)
+                if markup is not None:
+                    msg["markup"] = markup.model_dump(mode="json", exclude_none=True)
+                body["msg"] = msg
+            return {"c": body}
+        return None
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        try:
+            record = self._compact(event)
+            if record is not None:
+                self._write({"t": round(time.time(), 3), **record})
+                self.recorded += 1
+        except Exception as e:
+            logger.error(f"Не удалось записать апдейт: {e}")
+        return await handler(event, data)
+
+    def record_skyeng(self, key: str, seconds: float, result: Any):
+        """Подписчик SkyengClient.add_response_listener: ответ API для воспроизведения"""
+        try:
+            self._write({"t": round(time.time(), 3),
+                         "s": {"key": key, "ms": round(seconds * 1000, 1), "r": result}})
+            self.skyeng_recorded += 1
+        except Exception as e:
+            logger.error(f"Не удалось записать ответ Skyeng: {e}")
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+            logger.info(f"Журнал апдейтов закрыт: {self.recorded} апдейтов, "
+                        f"{self.skyeng_recorded} ответов Skyeng")
@@ -0,0 +1,188 @@
+import asyncio
+import logging
+import re
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from aiogram import Bot
+
+from .database import Database
+from .sender import Pacer, Priority, deliver, send_priority
+
+logger = logging.getLogger(__name__)
+
+DAY = 24 * 60 * 60
+# Наступивших напоминаний за одну выборку из БД
+BATCH_SIZE = 500
+CONCURRENCY = 8
+# Доля глобального лимита лимитера: как у рассылки, остальное — интерактиву
+RATE_SHARE = 0.6
+# Дольше этого не спим, даже если очередь пуста: напоминания, включённые
+# в других процессах (воркерах), планировщик замечает не позже
+MAX_SLEEP = 60
+# Опоздавшие больше чем на столько (бот был выключен) не шлём — переносим
+# на следующий день, чтобы не напоминать среди ночи
+MISSED_GRACE = 3 * 60 * 60
+
+# Функция текста напоминания: (строка due_reminders) -> (текст, доп. параметры
+# send_message) или None — не напоминать (например, словарь пуст)
+Renderer = Callable[[Dict], Optional[Tuple[str, Dict]]]
+
+
+_TIME = re.compile(r"^(\d{1,2})[:.](\d{2})$")
+_OFFSET = re.compile(r"^(?:utc|gmt)?([+-])(\d{1,2})(?::(\d{2}))?$")
+
+
+def parse_reminder_time(args: str, default_offset: int) -> Tuple[int, int]:
+    """
+    «19:30» или «19:30 +5» (также UTC+5:30, GMT-3) -> (минута суток,
+    смещение от UTC в минутах); ValueError — не разобрали
+    """
+    parts = args.lower().split()
+    if not parts or len(parts) > 2:
+        raise ValueError(args)
+    time_match = _TIME.match(parts[0])
+    if not time_match:
+        raise ValueError(args)
+    hours, minutes = int(time_match.group(1)), int(time_match.group(2))
+    if hours > 23 or minutes > 59:
+        raise ValueError(args)
+    offset = default_offset
+    if len(parts) == 2:
+        offset_match = _OFFSET.match(parts[1])
+        if not offset_match:
+            raise ValueError(args)
+        sign, offset_hours, offset_minutes = offset_match.groups()
+        offset = int(offset_hours) * 60 + int(offset_minutes or 0)
+        if offset > 14 * 60:
+            raise ValueError(args)
+        if sign == "-":
+            offset = -offset
+    return hours * 60 + minutes, offset
+
+
+def next_fire(local_minute: int, utc_offset: int, now: float) -> int:
+    """Ближайший после now момент (unix-время), когда у пользователя local_minute местного времени"""
+    offset = utc_offset * 60
+    local_day = int((now + offset) // DAY) * DAY
+    fire = local_day + local_minute * 60 - offset
+    while fire <= now:
+        fire += DAY
+    return fire
+
+
+class ReminderScheduler:
+    """
+    Планировщик ежедневных напоминаний. Очередь — таблица reminders
+    с индексом по next_at (куча в SQLite): в памяти нет ни задачи, ни
+    записи на пользователя, в простое — один запрос MIN(next_at) перед сном
+    до ближайшего срабатывания. Наступившие напоминания читаются порциями
+    вместе со счётчиками слов, отправляются через лимитер с приоритетом
+    BULK в собственном темпе rate и переносятся на следующий день одной
+    транзакцией на порцию.
+    """
+
+    def __init__(self, db: Database, render: Renderer, rate: float,
+                 batch_size: int = BATCH_SIZE, concurrency: int = CONCURRENCY):
+        self.db = db
+        self.render = render
+        self.rate = rate
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self._task: Optional[asyncio.Task] = None
+        self._wake = asyncio.Event()
+        self.sent = 0
+        self.skipped = 0
+        self.failed = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self, bot: Bot):
+        if not self.running:
+            self._task = asyncio.create_task(self._run(bot))
+
+    async def stop(self):
+        if self.running:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    def wake(self):
+        """Расписание изменилось в этом процессе: пересчитать время сна"""
+        self._wake.set()
+
+    async def _sleep(self, seconds: float):
+        try:
+            await asyncio.wait_for(self._wake.wait(), seconds)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _run(self, bot: Bot):
+        pacer = Pacer(self.rate)
+        with send_priority(Priority.BULK):
+            while True:
+                self._wake.clear()
+                try:
+                    now = time.time()
+                    next_at = await self.db.next_reminder_at()
+                    if next_at is None or next_at > now:
+                        delay = MAX_SLEEP if next_at is None else min(next_at - now, MAX_SLEEP)
+                        await self._sleep(delay)
+                        continue
+                    await self.fire_due(bot, pacer, now)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.error(f"Ошибка планировщика напоминаний: {e}")
+                    await self._sleep(MAX_SLEEP)
+
+    async def fire_due(self, bot: Bot, pacer: Pacer, now: float) -> int:
+        """Отправить одну порцию наступивших напоминаний; возвращает её размер"""
+        rows = await self.db.due_reminders(int(now), self.batch_size)
+        slots = asyncio.Semaphore(self.concurrency)
+        blocked: List[int] = []
+
+        async def send(row: Dict, text: str, kwargs: Dict):
+            try:
+                outcome = await deliver(bot, row["telegram_id"], text, **kwargs)
+            finally:
+                slots.release()
+            if outcome == "sent":
+                self.sent += 1
+            elif outcome == "blocked":
+                blocked.append(row["telegram_id"])
+            else:
+                self.failed += 1
+
+        tasks = []
+        handled: List[Dict] = []
+        try:
+            for row in rows:
+                message = None
+                if row["blocked_at"] is None and now - row["next_at"] <= MISSED_GRACE:
+                    message = self.render(row)
+                if message is None:
+                    self.skipped += 1
+                else:
+                    await slots.acquire()
+                    await pacer.tick()
+                    tasks.append(asyncio.create_task(send(row, *message)))
+                handled.append(row)
+        finally:
+            # При остановке начатые отправки дожидаемся и переносим только их:
+            # остальные останутся наступившими и уйдут после перезапуска
+            if tasks:
+                await asyncio.shield(asyncio.gather(*tasks, return_exceptions=True))
+            updates = [(next_fire(row["local_minute"], row["utc_offset"], now), row["user_id"])
+                       for row in handled]
+            await asyncio.shield(self.db.reschedule_reminders(updates, blocked))
+        logger.debug("Напоминания: порция %d, отправлено %d", len(rows), len(tasks))
+        return len(rows)
+
+    def stats(self) -> Dict:
+        return {"running": self.running, "sent": self.sent,
+                "skipped": self.skipped, "failed": self.failed}
@@ -0,0 +1,307 @@
+import asyncio
+import contextlib
+import contextvars
+import logging
+import time
+from collections import deque
+from enum import IntEnum
+from typing import Deque, Dict, List, Optional
+
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware
+from aiogram import Bot
+from aiogram.exceptions import (
+    TelegramBadRequest, TelegramForbiddenError, TelegramRetryAfter
+)
+from aiogram.methods import AnswerCallbackQuery
+
+logger = logging.getLogger(__name__)
+
+# Глобальный лимит Telegram ~30 сообщений/с; оставляем запас
+GLOBAL_RATE = 25.0
+GLOBAL_BURST = 25
+# Личные чаты: ~1 сообщение/с с небольшим всплеском; группы: 20 в минуту
+PRIVATE_CHAT_RATE = 1.0
+GROUP_CHAT_RATE = 20 / 60
+CHAT_BURST = 3
+# Сколько раз повторяем запрос после 429 и сколько максимум готовы ждать
+MAX_RETRIES = 3
+MAX_RETRY_AFTER = 60
+# Сколько ожидающих в очереди одного приоритета просматриваем за проход
+SCAN_LIMIT = 64
+MAX_TRACKED_CHATS = 10_000
+LATENCY_WINDOW = 1024
+
+
+class Priority(IntEnum):
+    """Меньше — важнее"""
+    CALLBACK = 0
+    INTERACTIVE = 1
+    BULK = 2
+
+
+_priority: contextvars.ContextVar[Optional[Priority]] = contextvars.ContextVar(
+    "send_priority", default=None
+)
+
+
+@contextlib.contextmanager
+def send_priority(priority: Priority):
+    """Задать приоритет всем отправкам внутри блока (например, BULK для рассылок)"""
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+class Pacer:
+    """Равномерный темп фоновых отправок: не больше rate вызовов tick() в секунду"""
+
+    def __init__(self, rate: float):
+        self.interval = 1 / rate
+        self._next = 0.0
+
+    async def tick(self):
+        now = time.monotonic()
+        if self._next > now:
+            await asyncio.sleep(self._next - now)
+        self._next = max(self._next, now) + self.interval
+
+
+async def deliver(bot: Bot, chat_id: int, text: str, **kwargs) -> str:
+    """
+    Фоновая отправка (рассылка, напоминание) без исключений: "sent",
+    "blocked" — пользователь заблокировал бота или аккаунта больше нет,
+    "failed" — прочие ошибки
+    """
+    try:
+        await bot.send_message(chat_id, text, **kwargs)
+        return "sent"
+    except TelegramForbiddenError:
+        return "blocked"
+    except TelegramBadRequest as e:
+        if "chat not found" in str(e).lower():
+            return "blocked"
+        logger.warning(f"Не доставлено {chat_id}: {e}")
+        return "failed"
+    except Exception as e:
+        logger.warning(f"Не доставлено {chat_id}: {e}")
+        return "failed"
+
+
+class ChatPace:
+    """Токен-бакет одного чата плюс пауза после 429"""
+
+    __slots__ = ("tokens", "updated", "blocked_until")
+
+    def __init__(self, now: float):
+        self.tokens = float(CHAT_BURST)
+        self.updated = now
+        self.blocked_until = 0.0
+
+
+class Waiter:
+    __slots__ = ("chat_id", "future", "enqueued")
+
+    def __init__(self, chat_id: Optional[int], future: asyncio.Future, enqueued: float):
+        self.chat_id = chat_id
+        self.future = future
+        self.enqueued = enqueued
+
+
+class OutboundLimiter(BaseRequestMiddleware):
+    """
+    Middleware сессии бота: все исходящие отправки проходят через общий
+    токен-бакет и потактовую выдачу по чатам. Ответы на кнопки идут первыми,
+    затем интерактивные ответы, затем массовые рассылки.
+    На 429 (TelegramRetryAfter) чат ставится на паузу retry_after,
+    и запрос повторяется автоматически.
+    """
+
+    def __init__(self, global_rate: float = GLOBAL_RATE, global_burst: int = GLOBAL_BURST,
+                 max_retries: int = MAX_RETRIES):
+        self.global_rate = global_rate
+        self.global_burst = global_burst
+        self.max_retries = max_retries
+        self._tokens = float(global_burst)
+        self._updated = 0.0
+        self._paused_until = 0.0
+        self._chats: Dict[int, ChatPace] = {}
+        self._queues: List[Deque[Waiter]] = [deque() for _ in Priority]
+        self._wakeup: Optional[asyncio.Event] = None
+        self._scheduler: Optional[asyncio.Task] = None
+        self._latency: List[Deque[float]] = [deque(maxlen=LATENCY_WINDOW) for _ in Priority]
+        self.sent = [0] * len(Priority)
+        self.retries = 0
+
+    async def __call__(self, make_request, bot, method):
+        chat_id = getattr(method, "chat_id", None)
+        if isinstance(method, AnswerCallbackQuery):
+            priority = Priority.CALLBACK
+        elif chat_id is not None:
+            priority = _priority.get()
+            if priority is None:  # не `or`: Priority.CALLBACK == 0
+                priority = Priority.INTERACTIVE
+        else:
+            # getUpdates, setWebhook и прочие служебные методы не тормозим
+            return await make_request(bot, method)
+        if not isinstance(chat_id, int):
+            chat_id = None  # @username каналов и т.п. — только глобальный лимит
+
+        attempt = 0
+        while True:
+            await self.acquire(priority, chat_id)
+            try:
+                return await make_request(bot, method)
+            except TelegramRetryAfter as e:
+                self.retries += 1
+                if attempt >= self.max_retries or e.retry_after > MAX_RETRY_AFTER:
+                    raise
+                attempt += 1
+                logger.warning(f"Telegram 429 для чата {chat_id}: ждём {e.retry_after} с "
+                               f"(попытка {attempt})")
+                if chat_id is None:
+                    # Ответ на callback или канал по @username: повторяем только
+                    # этот вызов, а не останавливаем весь исходящий трафик
+                    await asyncio.sleep(e.retry_after)
+                else:
+                    self.pause(chat_id, e.retry_after)
+
+    def pause(self, chat_id: Optional[int], seconds: float):
+        """Не отправлять в чат (или никуда, если chat_id=None) ближайшие seconds"""
+        until = asyncio.get_running_loop().time() + seconds
+        if chat_id is None:
+            self._paused_until = max(self._paused_until, until)
+        else:
+            pace = self._chat(chat_id, until - seconds)
+            pace.blocked_until = max(pace.blocked_until, until)
+        if self._wakeup:
+            self._wakeup.set()
+
+    async def acquire(self, priority: Priority, chat_id: Optional[int]):
+        """Дождаться очереди на отправку"""
+        loop = asyncio.get_running_loop()
+        if self._scheduler is None or self._scheduler.done():
+            self._wakeup = asyncio.Event()
+            self._scheduler = asyncio.create_task(self._schedule())
+        waiter = Waiter(chat_id, loop.create_future(), loop.time())
+        self._queues[priority].append(waiter)
+        self._wakeup.set()
+        await waiter.future
+        wait = loop.time() - waiter.enqueued
+        self._latency[priority].append(wait)
+        self.sent[priority] += 1
+
+    def _chat(self, chat_id: int, now: float) -> ChatPace:
+        pace = self._chats.get(chat_id)
+        if pace is None:
+            if len(self._chats) >= MAX_TRACKED_CHATS:
+                self._forget_idle_chats(now)
+            pace = ChatPace(now)
+            self._chats[chat_id] = pace
+        return pace
+
+    def _forget_idle_chats(self, now: float):
+        """Чаты с полным бакетом и без паузы ничем не отличаются от новых"""
+        idle = [
+            chat_id for chat_id, pace in self._chats.items()
+            if pace.blocked_until <= now
+            and pace.tokens + (now - pace.updated) * self._chat_rate(chat_id) >= CHAT_BURST
+        ]
+        for chat_id in idle:
+            del self._chats[chat_id]
+
+    @staticmethod
+    def _chat_rate(chat_id: int) -> float:
+        return PRIVATE_CHAT_RATE if chat_id > 0 else GROUP_CHAT_RATE
+
+    def _chat_ready_at(self, chat_id: Optional[int], now: float) -> float:
+        """Когда в чат можно отправить следующее сообщение (<= now — уже можно)"""
+        if chat_id is None:
+            return now
+        pace = self._chat(chat_id, now)
+        rate = self._chat_rate(chat_id)
+        pace.tokens = min(CHAT_BURST, pace.tokens + (now - pace.updated) * rate)
+        pace.updated = now
+        ready = now if pace.tokens >= 1 else now + (1 - pace.tokens) / rate
+        return max(ready, pace.blocked_until)
+
+    def _take(self, queue: Deque[Waiter], now: float):
+        """Первый ожидающий, чей чат готов; иначе — время ближайшей готовности"""
+        earliest = None
+        index = 0
+        while index < min(len(queue), SCAN_LIMIT):
+            waiter = queue[index]
+            if waiter.future.done():  # отменён
+                del queue[index]
+                continue
+            ready_at = self._chat_ready_at(waiter.chat_id, now)
+            if ready_at <= now:
+                del queue[index]
+                return waiter, None
+            earliest = ready_at if earliest is None else min(earliest, ready_at)
+            index += 1
+        return None, earliest
+
+    async def _schedule(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            now = loop.time()
+            self._tokens = min(self.global_burst,
+                               self._tokens + (now - self._updated) * self.global_rate)
+            self._updated = now
+
+            wake_at = None
+            if now < self._paused_until:
+                wake_at = self._paused_until
+            elif self._tokens < 1:
+                wake_at = now + (1 - self._tokens) / self.global_rate
+            else:
+                granted = False
+                for queue in self._queues:
+                    waiter, ready_at = self._take(queue, now)
+                    if waiter:
+                        self._tokens -= 1
+                        if waiter.chat_id is not None:
+                            self._chats[waiter.chat_id].tokens -= 1
+                        waiter.future.set_result(None)
+                        granted = True
+                        break
+                    if ready_at is not None:
+                        wake_at = ready_at if wake_at is None else min(wake_at, ready_at)
+                if granted:
+                    continue
+                if wake_at is None and not any(self._queues):
+                    self._wakeup.clear()
+                    await self._wakeup.wait()
+                    continue
+
+            self._wakeup.clear()
+            timeout = max(0.0, wake_at - loop.time()) if wake_at is not None else None
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def depth(self) -> int:
+        """Сколько отправок сейчас ждут очереди"""
+        return sum(len(queue) for queue in self._queues)
+
+    def depths(self) -> Dict[str, int]:
+        """Глубина очереди каждого приоритета"""
+        return {priority.name.lower(): len(self._queues[priority]) for priority in Priority}
+
+    def stats(self) -> Dict:
+        """Глубина очередей, задержка постановки в очередь и повторы после 429"""
+        result = {"retries": self.retries, "tracked_chats": len(self._chats)}
+        for priority in Priority:
+            waits = sorted(self._latency[priority])
+            name = priority.name.lower()
+            result[name] = {
+                "queued": len(self._queues[priority]),
+                "sent": self.sent[priority],
+                "wait_p50_ms": round(waits[len(waits) // 2] * 1000, 1) if waits else 0.0,
+                "wait_p95_ms": round(waits[int(len(waits) * 0.95)] * 1000, 1) if waits else 0.0,
+                "wait_max_ms": round(waits[-1] * 1000, 1) if waits else 0.0,
+            }
+        return result
@@ -0,0 +1,360 @@
+import asyncio
+import importlib
+import logging
+import multiprocessing as mp
+import os
+import signal
+import queue as queues
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from .logger import setup_logging, stop_logging
+from .metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+# Воркер обновляет heartbeat раз в HEARTBEAT_INTERVAL;
+# если отметки нет дольше HEARTBEAT_TIMEOUT — воркер считается зависшим
+HEARTBEAT_INTERVAL = 1.0
+HEARTBEAT_TIMEOUT = 15.0
+SUPERVISE_INTERVAL = 2.0
+# Воркер отправляет фронту снимок своих метрик раз в METRICS_INTERVAL
+METRICS_INTERVAL = 5.0
+# Сколько апдейтов разных пользователей воркер обрабатывает одновременно
+WORKER_MAX_CONCURRENCY = 64
+# Сколько апдейтов воркер держит в памяти (выполняются или ждут предыдущий
+# апдейт своего пользователя); остальные ждут в очереди процесса
+WORKER_MAX_BACKLOG = 1024
+STOP_TIMEOUT = 30.0
+
+DEFAULT_HANDLER = "app.sharding:dispatcher_handler"
+
+# Фабрика обработчика: возвращает (handle(update), close())
+HandlerFactory = Callable[[], Awaitable[Tuple[Callable[[Dict], Awaitable[Any]],
+                                              Callable[[], Awaitable[None]]]]]
+
+
+def shard_key(update: Dict) -> int:
+    """Ключ шардирования: id автора апдейта, иначе чат, иначе update_id"""
+    for kind, event in update.items():
+        if not isinstance(event, dict):
+            continue
+        user = event.get("from") or event.get("user")
+        if user and "id" in user:
+            return user["id"]
+        chat = event.get("chat")
+        if chat and "id" in chat:
+            return chat["id"]
+    return update.get("update_id", 0)
+
+
+async def dispatcher_handler():
+    """Обработчик по умолчанию: апдейт идёт в dp из app.main (импорт — уже внутри воркера)"""
+    from .main import (
+        broadcaster, build_spell_index, create_bot, db, dp, leaderboard, popularity,
+        prewarm_popular, recorder, skyeng
+    )
+    from .lifecycle import stop_task
+    from .startup import start_background
+
+    bot = create_bot()
+    flusher = asyncio.create_task(db.run_flusher())
+    popularity_flusher = asyncio.create_task(popularity.run_flusher(db.add_word_searches))
+    # Рейтинг воркера видит свои сбросы сразу, чужие — после сверки с БД
+    leaderboard_checker = asyncio.create_task(leaderboard.run_checker(db))
+    start_background([("spelling_index", build_spell_index, False),
+                      ("skyeng_prewarm", prewarm_popular, False),
+                      ("leaderboard", lambda: leaderboard.rebuild(db), False)], {})
+
+    async def handle(update: Dict):
+        await dp.feed_raw_update(bot, update)
+
+    async def close():
+        # Рассылка сохраняет контрольную точку, пока БД и сессия ещё открыты
+        await broadcaster.stop()
+        # Фоновые сбросы дожидаемся до финальных (popularity.flush, db.close)
+        await stop_task(flusher)
+        await stop_task(popularity_flusher)
+        leaderboard_checker.cancel()
+        # Счёт популярности воркера дописывается к общему в word_popularity
+        try:
+            await popularity.flush(db.add_word_searches)
+        except Exception:
+            pass  # уже залогировано
+        await db.close()
+        await skyeng.aclose()
+        await bot.session.close()
+        if recorder:
+            recorder.close()
+
+    return handle, close
+
+
+def _load_factory(path: str) -> HandlerFactory:
+    module, _, attr = path.partition(":")
+    return getattr(importlib.import_module(module), attr)
+
+
+def worker_main(index: int, workers: int, queue, heartbeat, processed, metrics,
+                handler_path: str):
+    """Точка входа процесса-воркера"""
+    # Остановкой управляет фронт (через None в очереди), Ctrl+C воркеры игнорируют
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    # Доля глобального лимита Telegram считается из WORKERS при импорте app.main;
+    # после перебалансировки число воркеров уже не то, что было в окружении
+    os.environ["WORKERS"] = str(workers)
+    setup_logging(filename=f"worker{index}.log")
+    try:
+        asyncio.run(_worker_loop(index, queue, heartbeat, processed, metrics, handler_path))
+    finally:
+        stop_logging()
+
+
+async def _worker_loop(index: int, queue, heartbeat, processed, metrics, handler_path: str):
+    handle, close = await _load_factory(handler_path)()
+    loop = asyncio.get_running_loop()
+    slots = asyncio.Semaphore(WORKER_MAX_CONCURRENCY)
+    backlog = asyncio.Semaphore(WORKER_MAX_BACKLOG)
+    # Последняя задача каждого пользователя: следующая ждёт её, так сохраняется порядок
+    tails: Dict[int, asyncio.Task] = {}
+
+    async def beat():
+        pushed = 0.0
+        while True:
+            now = time.time()
+            heartbeat.value = now
+            if now - pushed >= METRICS_INTERVAL:
+                pushed = now
+                metrics.put(REGISTRY.snapshot())
+            await asyncio.sleep(HEARTBEAT_INTERVAL)
+
+    async def run(key: int, update: Dict, previous: Optional[asyncio.Task]):
+        try:
+            if previous is not None:
+                await asyncio.wait([previous])
+            # Слот занимаем только когда очередь пользователя дошла до апдейта:
+            # ждущие своей очереди апдейты одного пользователя не отнимают
+            # слоты у остальных
+            async with slots:
+                await handle(update)
+        except Exception as e:
+            logger.error(f"Воркер {index}: ошибка обработки апдейта: {e}")
+        finally:
+            backlog.release()
+            with processed.get_lock():
+                processed.value += 1
+            if tails.get(key) is asyncio.current_task():
+                del tails[key]
+
+    beat_task = asyncio.create_task(beat())
+    logger.info(f"Воркер {index} запущен")
+    with ThreadPoolExecutor(max_workers=1) as reader:
+        while True:
+            item = await loop.run_in_executor(reader, queue.get)
+            if item is None:
+                break
+            key, update = item
+            await backlog.acquire()
+            tails[key] = asyncio.create_task(run(key, update, tails.get(key)))
+
+    # Доделываем начатое и выходим
+    if tails:
+        await asyncio.wait(list(tails.values()))
+    beat_task.cancel()
+    await close()
+    logger.info(f"Воркер {index} остановлен")
+
+
+class Worker:
+    """Процесс-воркер и его общие с фронтом объекты"""
+
+    def __init__(self, ctx, index: int):
+        self.index = index
+        self.ctx = ctx
+        self.queue = ctx.Queue()
+        # Снимки метрик воркера для /metrics фронта
+        self.metrics = ctx.Queue()
+        self.heartbeat = ctx.Value("d", time.time())
+        self.processed = ctx.Value("q", 0)
+        self.restarts = 0
+        self.process = None
+
+
+class ShardedRuntime:
+    """
+    Фронт многопроцессного режима: раскладывает апдейты по N воркерам
+    по id пользователя (все апдейты одного пользователя — в один воркер,
+    по порядку), следит за воркерами и перезапускает упавшие/зависшие.
+    Апдейты, которые упавший воркер обрабатывал или не успел забрать из
+    очереди, теряются (как и при обычном перезапуске бота); новые апдейты
+    его пользователей идут в перезапущенный процесс.
+    """
+
+    def __init__(self, workers: int, handler: str = DEFAULT_HANDLER):
+        self.handler = handler
+        self._ctx = mp.get_context("spawn")
+        self._workers: List[Worker] = [Worker(self._ctx, i) for i in range(workers)]
+        self._paused = False
+        self._pending: List[Tuple[int, Dict]] = []
+
+    @property
+    def size(self) -> int:
+        return len(self._workers)
+
+    @property
+    def resizing(self) -> bool:
+        return self._paused
+
+    def _spawn(self, worker: Worker):
+        worker.heartbeat.value = time.time()
+        worker.process = self._ctx.Process(
+            target=worker_main,
+            args=(worker.index, self.size, worker.queue, worker.heartbeat, worker.processed,
+                  worker.metrics, self.handler),
+            name=f"wordy-worker-{worker.index}",
+            daemon=True,
+        )
+        worker.process.start()
+
+    def start(self):
+        for worker in self._workers:
+            self._spawn(worker)
+        logger.info(f"Запущено воркеров: {self.size}")
+
+    def route(self, update: Dict):
+        """Отправить апдейт в воркер его пользователя"""
+        key = shard_key(update)
+        if self._paused:
+            self._pending.append((key, update))
+            return
+        self._workers[key % self.size].queue.put((key, update))
+
+    async def check_workers(self) -> int:
+        """Перезапустить мёртвые и зависшие воркеры; возвращает число перезапусков"""
+        loop = asyncio.get_running_loop()
+        restarted = 0
+        now = time.time()
+        for worker in self._workers:
+            process = worker.process
+            if process is None:
+                continue
+            if process.is_alive() and now - worker.heartbeat.value < HEARTBEAT_TIMEOUT:
+                continue
+            if process.is_alive():
+                logger.error(f"Воркер {worker.index} завис, перезапускаем")
+                process.kill()
+                # Ждём в потоке: фронт тем временем принимает вебхуки и getUpdates
+                await loop.run_in_executor(None, process.join, 5)
+                if self._paused or worker.process is not process:
+                    return restarted  # пока ждали, началась перебалансировка — набор соберёт она
+            else:
+                logger.error(f"Воркер {worker.index} упал (код {process.exitcode}), перезапускаем")
+            # Убитый процесс мог остаться владельцем блокировки чтения очереди,
+            # поэтому новый воркер получает новую очередь
+            lost = worker.queue.qsize()
+            if lost:
+                logger.error(f"Воркер {worker.index}: потеряно апдейтов в очереди: {lost}")
+            worker.queue = worker.ctx.Queue()
+            worker.metrics = worker.ctx.Queue()
+            worker.restarts += 1
+            self._spawn(worker)
+            restarted += 1
+        return restarted
+
+    def collect_metrics(self):
+        """Забрать последние снимки метрик воркеров в REGISTRY фронта"""
+        for worker in self._workers:
+            snapshot = None
+            while True:
+                try:
+                    snapshot = worker.metrics.get_nowait()
+                except queues.Empty:
+                    break
+            if snapshot is not None:
+                REGISTRY.set_remote(f"worker{worker.index}", snapshot)
+
+    async def supervise(self):
+        """Фоновая задача наблюдения за воркерами и сбора их метрик"""
+        while True:
+            await asyncio.sleep(SUPERVISE_INTERVAL)
+            if not self._paused:
+                self.collect_metrics()
+                await self.check_workers()
+
+    async def _stop_workers(self, timeout: float) -> Dict:
+        for worker in self._workers:
+            worker.queue.put(None)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        report = {"stopped": 0, "killed": 0}
+        for worker in self._workers:
+            if worker.process is None:
+                continue
+            left = max(0.0, deadline - loop.time())
+            await loop.run_in_executor(None, worker.process.join, left)
+            if worker.process.is_alive():
+                logger.error(f"Воркер {worker.index} не остановился за {timeout} с")
+                worker.process.kill()
+                report["killed"] += 1
+            else:
+                report["stopped"] += 1
+            worker.process = None
+        return report
+
+    async def resize(self, workers: int, timeout: float = STOP_TIMEOUT):
+        """
+        Изменить число воркеров. Смена N меняет раскладку пользователей,
+        поэтому сначала воркеры дорабатывают свои очереди (новые апдейты
+        копятся во фронте), и только потом запускается новый набор.
+        """
+        self._paused = True
+        try:
+            await self._stop_workers(timeout)
+            # Снимки старого набора: при уменьшении N лишние воркеры исчезают
+            REGISTRY.clear_remote()
+            self._workers = [Worker(self._ctx, i) for i in range(workers)]
+            self.start()
+        finally:
+            self._paused = False
+            pending, self._pending = self._pending, []
+            for key, update in pending:
+                self._workers[key % self.size].queue.put((key, update))
+        logger.info(f"Перебалансировка завершена: {workers} воркеров")
+
+    async def stop(self, timeout: float = STOP_TIMEOUT) -> Dict:
+        """Остановить воркеры: каждый дорабатывает свою очередь и сбрасывает буферы"""
+        return await self._stop_workers(timeout)
+
+    def stats(self) -> List[Dict]:
+        now = time.time()
+        return [
+            {
+                "worker": worker.index,
+                "alive": bool(worker.process and worker.process.is_alive()),
+                "processed": worker.processed.value,
+                "restarts": worker.restarts,
+                "queue": worker.queue.qsize(),
+                "heartbeat_age": round(now - worker.heartbeat.value, 1),
+            }
+            for worker in self._workers
+        ]
+
+    async def run_polling(self, bot, allowed_updates: Optional[List[str]] = None,
+                          timeout: int = 30):
+        """Long polling во фронте: getUpdates и раскладка апдейтов по воркерам.
+        Работает до отмены задачи."""
+        offset = None
+        while True:
+            try:
+                updates = await bot.get_updates(
+                    offset=offset, timeout=timeout, allowed_updates=allowed_updates,
+                    request_timeout=timeout + 10,
+                )
+            except Exception as e:
+                logger.error(f"Ошибка getUpdates: {e}")
+                await asyncio.sleep(1)
+                continue
+            for update in updates:
+                offset = update.update_id + 1
+                self.route(update.model_dump(mode="json", by_alias=True, exclude_unset=True))
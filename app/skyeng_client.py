@@ -1,33 +1,219 @@
+import asyncio
 import httpx
+import json
 import logging
-from typing import List, Dict
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
-BASE = "https://dictionary.skyeng.ru/api/public/v1"
+BASE = os.getenv("SKYENG_BASE_URL", "https://dictionary.skyeng.ru/api/public/v1")
+
+# Кеш ответов Skyeng: словарные статьи меняются редко
+CACHE_SIZE = 5000
+CACHE_TTL = 24 * 3600
+# Предохранитель: после стольких ошибок подряд перестаём ходить в API
+# на BREAKER_RESET секунд, затем пропускаем один пробный запрос
+BREAKER_FAILURES = 5
+BREAKER_RESET = 30.0
+
+
+def _write_cache(path: str, entries: Dict[str, Any]):
+    """Записать снимок кеша атомарно (через временный файл); вызывается в потоке"""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(entries, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def _read_cache(path: str) -> Dict[str, Any]:
+    """Прочитать снимок кеша с диска; вызывается в потоке"""
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+class SkyengUnavailable(Exception):
+    """Предохранитель разомкнут: API недавно не отвечал, запрос не отправлялся"""
+
+
+class CircuitBreaker:
+    """Предохранитель: closed → (failures ошибок подряд) → open →
+    (через reset_timeout) → half_open → пробный запрос решает, куда дальше"""
+
+    def __init__(self, failures: int = BREAKER_FAILURES, reset_timeout: float = BREAKER_RESET):
+        self.max_failures = failures
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trips = 0
+        self._probing = False
+
+    def check(self):
+        """Можно ли отправить запрос; иначе SkyengUnavailable"""
+        if self.state == "open":
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                raise SkyengUnavailable("Skyeng API временно недоступен")
+            self.state = "half_open"
+        if self.state == "half_open":
+            if self._probing:
+                raise SkyengUnavailable("Skyeng API проверяется пробным запросом")
+            self._probing = True
+
+    def success(self):
+        if self.state != "closed":
+            logger.info("Skyeng API снова отвечает, предохранитель замкнут")
+        self.state = "closed"
+        self.failures = 0
+        self._probing = False
+
+    def failure(self):
+        self.failures += 1
+        self._probing = False
+        if self.state == "half_open" or self.failures >= self.max_failures:
+            if self.state != "open":
+                self.trips += 1
+                logger.error(f"Skyeng API: {self.failures} ошибок подряд, "
+                             f"не обращаемся {self.reset_timeout:.0f} с")
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+    def release(self):
+        """Запрос не дошёл до ответа (отменён) — пробный слот свободен"""
+        self._probing = False
+
+    def stats(self) -> Dict:
+        return {"state": self.state, "failures": self.failures, "trips": self.trips}
+
+
+def _is_outage(error: Exception) -> bool:
+    """Сбой API, а не ошибка запроса: сеть, таймаут, 5xx"""
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code >= 500
+    return isinstance(error, (httpx.TransportError, ValueError))
 
 
 class SkyengClient:
-    def __init__(self, timeout: float = 10.0):
+    def __init__(self, timeout: float = 10.0, base_url: str = BASE,
+                 cache_size: int = CACHE_SIZE, cache_ttl: float = CACHE_TTL):
         self._client = httpx.AsyncClient(timeout=timeout, follow_redirects=True)
+        self.base_url = base_url
+        self.cache_size = cache_size
+        self.cache_ttl = cache_ttl
+        # ключ -> (истекает в, по time.time(); ответ API)
+        self._cache: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        # Одинаковые запросы, уже ушедшие в API, ждут один общий ответ
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.breaker = CircuitBreaker()
+        # Подписчики на запросы к API: callback(endpoint, секунды, ошибка или None)
+        self._request_listeners: List[Callable[[str, float, Optional[Exception]], None]] = []
+        # Подписчики на ответы API: callback(ключ кеша, секунды, ответ)
+        self._response_listeners: List[Callable[[str, float, Any], None]] = []
+
+    def add_request_listener(self, callback: Callable[[str, float, Optional[Exception]], None]):
+        """Подписаться на завершение запросов к API (не из кеша)"""
+        self._request_listeners.append(callback)
+
+    def add_response_listener(self, callback: Callable[[str, float, Any], None]):
+        """Подписаться на успешные ответы API (запись трафика для воспроизведения)"""
+        self._response_listeners.append(callback)
+
+    def _notify_request(self, endpoint: str, seconds: float, error: Optional[Exception]):
+        for callback in self._request_listeners:
+            try:
+                callback(endpoint, seconds, error)
+            except Exception as e:
+                logger.error(f"Ошибка в подписчике на запросы Skyeng: {e}")
+
+    def _notify_response(self, key: str, seconds: float, result: Any):
+        for callback in self._response_listeners:
+            try:
+                callback(key, seconds, result)
+            except Exception as e:
+                logger.error(f"Ошибка в подписчике на ответы Skyeng: {e}")
+
+    async def _cached(self, key: str, endpoint: str,
+                      fetch: Callable[[], Awaitable[Any]]) -> Any:
+        entry = self._cache.get(key)
+        if entry is not None:
+            if entry[0] > time.time():
+                self._cache.move_to_end(key)
+                self.cache_hits += 1
+                return entry[1]
+            del self._cache[key]
+
+        pending = self._inflight.get(key)
+        if pending is not None:
+            self.cache_hits += 1
+            return await asyncio.shield(pending)
+
+        self.cache_misses += 1
+        self.breaker.check()
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        started = time.perf_counter()
+        try:
+            result = await fetch()
+        except Exception as e:
+            self._notify_request(endpoint, time.perf_counter() - started, e)
+            if _is_outage(e):
+                self.breaker.failure()
+            else:
+                self.breaker.success()
+            future.set_exception(e)
+            future.exception()  # помечаем как полученное, если никто не ждал
+            raise
+        else:
+            seconds = time.perf_counter() - started
+            self._notify_request(endpoint, seconds, None)
+            self._notify_response(key, seconds, result)
+            self.breaker.success()
+            future.set_result(result)
+            self._store(key, result)
+            return result
+        finally:
+            del self._inflight[key]
+            if not future.done():
+                # Запрос отменён: ждущие того же ответа получат CancelledError
+                self.breaker.release()
+                future.cancel()
+
+    def _store(self, key: str, value: Any, expires: float = None):
+        self._cache[key] = (expires or time.time() + self.cache_ttl, value)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
 
     async def search_words(self, query: str) -> List[Dict]:
         """
         Возвращает список словарных статей. Каждая содержит meaningId-ы.
         GET /words/search?q=...
         """
-        try:
-            url = f"{BASE}/words/search"
+        query = query.strip()
+
+        async def fetch():
+            url = f"{self.base_url}/words/search"
             params = {"search": query, "q": query}
-            logger.info(f"Запрос к Skyeng API: {url} с параметрами {params}")
-            
+            logger.debug("Запрос к Skyeng API: %s %s", url, params)
+
             r = await self._client.get(url, params=params)
             r.raise_for_status()
-            
+
             result = r.json() or []
-            logger.info(f"Получен ответ от Skyeng API: {len(result)} слов")
+            logger.debug("Ответ Skyeng API: %d слов", len(result))
             return result
-            
+
+        try:
+            return await self._cached(f"search:{query.lower()}", "search", fetch)
+        except SkyengUnavailable:
+            raise
         except Exception as e:
             logger.error(f"Ошибка при поиске слов '{query}': {e}")
             raise
@@ -39,22 +225,76 @@ class SkyengClient:
         """
         if not meaning_ids:
             return []
-            
-        try:
-            url = f"{BASE}/meanings"
-            params = {"ids": ",".join(map(str, meaning_ids))}
-            logger.info(f"Запрос деталей: {url} с параметрами {params}")
-            
+        ids = ",".join(map(str, meaning_ids))
+
+        async def fetch():
+            url = f"{self.base_url}/meanings"
+            params = {"ids": ids}
+            logger.debug("Запрос деталей: %s %s", url, params)
+
             r = await self._client.get(url, params=params)
             r.raise_for_status()
-            
+
             result = r.json() or []
-            logger.info(f"Получены детали для {len(result)} значений")
+            logger.debug("Получены детали для %d значений", len(result))
             return result
-            
+
+        try:
+            return await self._cached(f"meanings:{ids}", "meanings", fetch)
+        except SkyengUnavailable:
+            raise
         except Exception as e:
             logger.error(f"Ошибка при получении деталей для {meaning_ids}: {e}")
             raise
 
+    async def warm_up(self):
+        """Открыть соединение с API заранее (DNS, TLS), чтобы первый пользователь не ждал"""
+        r = await self._client.get(f"{self.base_url}/words/search",
+                                   params={"search": "hello", "q": "hello"})
+        r.raise_for_status()
+        self._store("search:hello", r.json() or [])
+
+    async def save_cache(self, path: str) -> int:
+        """Сохранить непросроченный кеш на диск; возвращает число записей"""
+        # Снимок — на цикле событий: запросы и фоновые фазы могут менять кеш,
+        # пока поток пишет файл
+        now = time.time()
+        entries = {key: entry for key, entry in self._cache.items() if entry[0] > now}
+        await asyncio.to_thread(_write_cache, path, entries)
+        logger.info(f"Кеш Skyeng сохранён: {len(entries)} записей")
+        return len(entries)
+
+    async def load_cache(self, path: str) -> int:
+        """Загрузить кеш с диска (просроченные записи пропускаются)"""
+        # Файл читается и разбирается в потоке, а в кеш записи кладутся
+        # на цикле событий — там же, где его меняют запросы
+        entries = await asyncio.to_thread(_read_cache, path)
+        now = time.time()
+        loaded = 0
+        for key, (expires, value) in entries.items():
+            if expires > now and key not in self._cache:
+                self._store(key, value, expires)
+                loaded += 1
+        logger.info(f"Кеш Skyeng загружен: {loaded} записей")
+        return loaded
+
+    def is_cached(self, query: str) -> bool:
+        """Есть ли непросроченный ответ на поиск query в кеше"""
+        entry = self._cache.get(f"search:{query.strip().lower()}")
+        return entry is not None and entry[0] > time.time()
+
+    def known_queries(self) -> List[str]:
+        """Поисковые запросы из кеша, на которые API что-то нашёл"""
+        return [key[len("search:"):] for key, (_, result) in list(self._cache.items())
+                if key.startswith("search:") and result]
+
+    def cache_stats(self) -> Dict:
+        return {
+            "size": len(self._cache),
+            "hits": self.cache_hits,
+            "misses": self.cache_misses,
+            "inflight": len(self._inflight),
+        }
+
     async def aclose(self):
         await self._client.aclose()
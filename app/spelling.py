@@ -0,0 +1,236 @@
+import logging
+import re
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+# Ограничения индекса. Память и время сборки — в README (bench.spelling):
+# 30k слов ≈ 0.33M ключей удалений, ~35 МБ и ~0.7 с сборки на 1 CPU
+MAX_WORDS = 30_000
+# Слова для индекса берём из стольких последних строк words
+SCAN_ROWS = 500_000
+MAX_DISTANCE = 2
+# Удаления считаем только в первых PREFIX_LENGTH буквах (как в SymSpell):
+# число ключей на слово не растёт с длиной слова
+PREFIX_LENGTH = 6
+# Пока слов меньше, индекс слишком беден: непохожие на известные запросы
+# — чаще новые слова, чем опечатки, и до запроса к API их не проверяем
+MIN_WORDS = 5_000
+# До запроса к API проверяем слова с такой длины: у более коротких почти
+# всегда есть известный сосед на одну правку (bench.spelling: new_word_flagged)
+MIN_QUERY_LENGTH = 5
+# До запроса к API допускаем одну правку, две — только с такой длины:
+# на двух правках почти у любого слова из 4–7 букв есть известный сосед,
+# и правильные новые слова принимались бы за опечатки
+SUSPICIOUS_LONG_QUERY = 8
+# ...и предлагаем только слова из стольких самых частых: опечатки чаще всего
+# делают в частых словах, а редкий сосед — скорее просто другое слово.
+# build() добавляет слова по убыванию частоты, так что это первые id
+SUSPICIOUS_TOP_WORDS = 1000
+MAX_WORD_LENGTH = 30
+
+# Одно слово: латиница или кириллица, допускаются дефис и апостроф внутри
+_WORD = re.compile(r"^[a-zа-я]+(?:['-][a-zа-я]+)*$")
+# Бит на букву: латиница, кириллица, общий бит для дефиса и апострофа
+_LETTER_BITS = {letter: 1 << i for i, letter in enumerate(
+    "abcdefghijklmnopqrstuvwxyzабвгдежзийклмнопрстуфхцчшщъыьэюя")}
+
+
+def letter_mask(word: str) -> int:
+    mask = 0
+    for letter in word:
+        mask |= _LETTER_BITS.get(letter, 1 << 63)
+    return mask
+
+
+def normalize(word: str) -> str:
+    return word.strip().lower().replace("ё", "е")
+
+
+def _deletes(word: str, distance: int) -> set:
+    """Все строки, получаемые из word удалением до distance букв (включая само слово)"""
+    result = {word}
+    frontier = {word}
+    for _ in range(distance):
+        frontier = {variant[:i] + variant[i + 1:]
+                    for variant in frontier if len(variant) > 1
+                    for i in range(len(variant))}
+        result |= frontier
+    return result
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """Дамерау–Левенштейн (с перестановкой соседних букв); > limit — значит limit + 1"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    # Общие начало и конец правок не требуют: у опечатки в одном месте
+    # таблица сжимается до пары букв
+    start = 0
+    while start < len(a) and start < len(b) and a[start] == b[start]:
+        start += 1
+    end = 0
+    while end < len(a) - start and end < len(b) - start and a[-1 - end] == b[-1 - end]:
+        end += 1
+    a, b = a[start:len(a) - end], b[start:len(b) - end]
+    if not a or not b:
+        return len(a) + len(b)
+    # Полоса |i - j| <= limit: клетки дальше от диагонали заведомо > limit
+    big = limit + 1
+    len_b = len(b)
+    previous2: List[int] = []
+    previous = [j if j <= limit else big for j in range(len_b + 1)]
+    for i in range(1, len(a) + 1):
+        char = a[i - 1]
+        current = [big] * (len_b + 1)
+        if i <= limit:
+            current[0] = i
+        row_min = big
+        for j in range(max(1, i - limit), min(len_b, i + limit) + 1):
+            value = previous[j - 1] + (char != b[j - 1])
+            if previous[j] + 1 < value:
+                value = previous[j] + 1
+            if current[j - 1] + 1 < value:
+                value = current[j - 1] + 1
+            if (i > 1 and j > 1 and char == b[j - 2] and a[i - 2] == b[j - 1]
+                    and previous2[j - 2] + 1 < value):
+                value = previous2[j - 2] + 1
+            current[j] = value
+            if value < row_min:
+                row_min = value
+        if row_min > limit:
+            return big
+        previous2, previous = previous, current
+    return min(previous[-1], big)
+
+
+class SpellIndex:
+    """
+    Индекс исправления опечаток по схеме SymSpell (симметричные удаления):
+    для каждого слова заранее сохраняются варианты с удалёнными буквами,
+    при поиске — то же для запроса; кандидаты — слова с общим вариантом,
+    их проверяет точное расстояние. Поиск — десятки микросекунд без сети.
+    Слова — из сохранённых в words и из удачных запросов к Skyeng.
+    Больше max_words слов индекс не принимает.
+    """
+
+    def __init__(self, max_words: int = MAX_WORDS, max_distance: int = MAX_DISTANCE,
+                 prefix_length: int = PREFIX_LENGTH):
+        self.max_words = max_words
+        self.max_distance = max_distance
+        self.prefix_length = prefix_length
+        self._ids: Dict[str, int] = {}
+        self._words: List[str] = []
+        self._counts: List[int] = []
+        # Какие буквы есть в слове: дешёвая нижняя оценка расстояния
+        self._masks: List[int] = []
+        # hash(вариант с удалениями) -> id слова или список id (у большинства
+        # ключей одно слово). Хеш вместо строки вдвое экономит память; при
+        # совпадении хешей лишний кандидат отсеется проверкой расстояния
+        self._deletes: Dict[int, Union[int, List[int]]] = {}
+        self.ready = False
+
+    def __len__(self) -> int:
+        return len(self._words)
+
+    def __contains__(self, word: str) -> bool:
+        return normalize(word) in self._ids
+
+    def add(self, word: str, count: int = 1) -> bool:
+        """Добавить слово (или увеличить его частоту); False — не слово или индекс полон"""
+        word = normalize(word)
+        word_id = self._ids.get(word)
+        if word_id is not None:
+            self._counts[word_id] += count
+            return True
+        if (len(self._words) >= self.max_words or len(word) > MAX_WORD_LENGTH
+                or not _WORD.match(word)):
+            return False
+        word_id = len(self._words)
+        self._ids[word] = word_id
+        self._words.append(word)
+        self._counts.append(count)
+        self._masks.append(letter_mask(word))
+        for variant in _deletes(word[:self.prefix_length], self.max_distance):
+            key = hash(variant)
+            ids = self._deletes.get(key)
+            if ids is None:
+                self._deletes[key] = word_id
+            elif isinstance(ids, int):
+                self._deletes[key] = [ids, word_id]
+            else:
+                ids.append(word_id)
+        return True
+
+    def build(self, words: Iterable[Tuple[str, int]]) -> int:
+        """Наполнить индекс (слово, частота), самые частые — первыми; возвращает число слов"""
+        for word, count in words:
+            self.add(word, count)
+        self.ready = True
+        logger.info(f"Индекс опечаток: {len(self._words)} слов, {len(self._deletes)} ключей")
+        return len(self._words)
+
+    def lookup(self, query: str, limit: int = 3,
+               max_distance: Optional[int] = None) -> List[str]:
+        """
+        Похожие известные слова (до max_distance правок, по умолчанию — как
+        у индекса), ближайшие и частые — первыми. Для известного слова
+        и не-слова — пустой список.
+        Сначала ищем на расстоянии 1 (таких опечаток большинство, и проверка
+        кандидата дешевле), дальше — только если ничего не нашлось.
+        """
+        query = normalize(query)
+        if query in self._ids or not _WORD.match(query):
+            return []
+        if max_distance is None:
+            max_distance = self.max_distance
+        found: List[Tuple[int, int, str]] = []
+        for distance in range(1, min(max_distance, self.max_distance) + 1):
+            found = self._candidates(query, distance)
+            if found:
+                break
+        found.sort()
+        return [word for _, _, word in found[:limit]]
+
+    def _candidates(self, query: str, limit: int) -> List[Tuple[int, int, str]]:
+        mask = letter_mask(query)
+        # Правка меняет набор букв слова не больше чем на две
+        max_mask_diff = 2 * limit
+        seen = set()
+        found: List[Tuple[int, int, str]] = []
+        for variant in _deletes(query[:self.prefix_length], limit):
+            ids = self._deletes.get(hash(variant))
+            if ids is None:
+                continue
+            for word_id in ((ids,) if isinstance(ids, int) else ids):
+                if word_id in seen:
+                    continue
+                seen.add(word_id)
+                if bin(mask ^ self._masks[word_id]).count("1") > max_mask_diff:
+                    continue
+                word = self._words[word_id]
+                distance = edit_distance(query, word, limit)
+                if distance <= limit:
+                    found.append((distance, -self._counts[word_id], word))
+        return found
+
+    def suspicious(self, query: str) -> Optional[List[str]]:
+        """
+        Проверка до запроса к API: для незнакомого слова, похожего на
+        известные, — варианты исправления; None — запрос отправлять как есть.
+        Строже lookup: правильное новое слово не должно ждать лишний ответ,
+        поэтому две правки — только для слов от SUSPICIOUS_LONG_QUERY букв,
+        а варианты — только из SUSPICIOUS_TOP_WORDS самых частых слов.
+        Пропущенную опечатку поймает lookup, когда API ничего не найдёт.
+        """
+        if not self.ready or len(self._words) < MIN_WORDS:
+            return None
+        query = normalize(query)
+        if len(query) < MIN_QUERY_LENGTH or query in self._ids:
+            return None
+        max_distance = MAX_DISTANCE if len(query) >= SUSPICIOUS_LONG_QUERY else 1
+        suggestions = [word for word in self.lookup(query, max_distance=max_distance)
+                       if self._ids[word] < SUSPICIOUS_TOP_WORDS]
+        return suggestions or None
+
+    def stats(self) -> Dict:
+        return {"words": len(self._words), "keys": len(self._deletes), "ready": self.ready}
@@ -0,0 +1,64 @@
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Сколько ждём необязательный прогрев (сеть, кеши), прежде чем начать
+# принимать апдейты без него
+WARMUP_TIMEOUT = 5.0
+
+# (имя, функция без аргументов, обязательна ли фаза)
+Phase = Tuple[str, Callable[[], Awaitable[Any]], bool]
+
+
+async def run_startup(chains: List[List[Phase]],
+                      warmup_timeout: float = WARMUP_TIMEOUT) -> Dict[str, float]:
+    """
+    Фазы запуска. Цепочки идут параллельно, фазы внутри цепочки — по порядку
+    (например, прогрев БД — только после создания схемы).
+    Ошибка обязательной фазы прерывает запуск; необязательная фаза
+    при ошибке или дольше warmup_timeout пропускается с предупреждением.
+    Возвращает длительность каждой фазы в миллисекундах.
+    """
+    timings: Dict[str, float] = {}
+
+    async def run_chain(chain: List[Phase]):
+        for phase in chain:
+            await _run_phase(phase, timings, warmup_timeout)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(run_chain(chain) for chain in chains))
+    timings["total"] = round((time.perf_counter() - started) * 1000, 1)
+    logger.info(f"Запуск: фазы, мс: {timings}")
+    return timings
+
+
+def start_background(phases: List[Phase], timings: Dict[str, float]) -> List[asyncio.Task]:
+    """
+    Прогрев, которого апдейты не ждут (нужен не первому же запросу):
+    фазы запускаются задачами после run_startup и не отнимают CPU
+    у обязательных; длительность дописывается в timings по завершении.
+    """
+    return [
+        asyncio.create_task(_run_phase((name, phase, False), timings, timeout=None))
+        for name, phase, _ in phases
+    ]
+
+
+async def _run_phase(phase: Phase, timings: Dict[str, float], timeout: Optional[float]):
+    name, func, required = phase
+    started = time.perf_counter()
+    try:
+        if required:
+            await func()
+        else:
+            await asyncio.wait_for(func(), timeout)
+    except Exception as e:
+        if required:
+            logger.error(f"Запуск: фаза '{name}' завершилась ошибкой: {e}")
+            raise
+        logger.warning(f"Запуск: фаза '{name}' пропущена: {e!r}")
+    finally:
+        timings[name] = round((time.perf_counter() - started) * 1000, 1)
@@ -0,0 +1,152 @@
+import heapq
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List
+
+from aiogram import BaseMiddleware
+from aiogram.types import CallbackQuery, Message, TelegramObject
+
+logger = logging.getLogger(__name__)
+
+# Бюджеты по умолчанию: скорость пополнения (в секунду) и размер всплеска
+MESSAGE_RATE = 1.0
+MESSAGE_BURST = 5
+CALLBACK_RATE = 2.0
+CALLBACK_BURST = 6
+
+# Ограничение памяти: сколько пользователей помним и когда забываем молчащих
+MAX_USERS = 100_000
+IDLE_TTL = 600.0
+# Как часто напоминаем о лимите в ответ на сообщения (на кнопки отвечаем всегда)
+WARN_INTERVAL = 10.0
+
+THROTTLED_CALLBACK_TEXT = "⏳ Не так быстро! Подожди пару секунд."
+THROTTLED_MESSAGE_TEXT = "⏳ Слишком много сообщений. Подожди немного!"
+
+
+class UserBudget:
+    """Два токен-бакета пользователя (сообщения и кнопки) и его счётчики"""
+
+    __slots__ = ("message_tokens", "callback_tokens", "updated", "allowed",
+                 "throttled", "warned_at")
+
+    def __init__(self, now: float, message_burst: int, callback_burst: int):
+        self.message_tokens = float(message_burst)
+        self.callback_tokens = float(callback_burst)
+        self.updated = now
+        self.allowed = 0
+        self.throttled = 0
+        self.warned_at = 0.0
+
+
+class ThrottlingMiddleware(BaseMiddleware):
+    """
+    Outer-middleware с токен-бакетом на пользователя.
+    Апдейты сверх лимита не доходят до хендлера: на кнопку отвечаем
+    коротким c.answer, сообщение молча отбрасываем (изредка предупреждаем).
+    Состояние — LRU с вытеснением молчащих дольше IDLE_TTL.
+    """
+
+    def __init__(self, message_rate: float = MESSAGE_RATE, message_burst: int = MESSAGE_BURST,
+                 callback_rate: float = CALLBACK_RATE, callback_burst: int = CALLBACK_BURST,
+                 max_users: int = MAX_USERS, idle_ttl: float = IDLE_TTL):
+        self.message_rate = message_rate
+        self.message_burst = message_burst
+        self.callback_rate = callback_rate
+        self.callback_burst = callback_burst
+        self.max_users = max_users
+        self.idle_ttl = idle_ttl
+        self._users: "OrderedDict[int, UserBudget]" = OrderedDict()
+        self.total_allowed = 0
+        self.total_throttled = 0
+
+    def _budget(self, user_id: int, now: float) -> UserBudget:
+        budget = self._users.get(user_id)
+        if budget is None:
+            budget = UserBudget(now, self.message_burst, self.callback_burst)
+            self._users[user_id] = budget
+        else:
+            self._users.move_to_end(user_id)
+
+        # Самые давние записи — в начале: забываем молчащих и лишних
+        while self._users:
+            oldest_id, oldest = next(iter(self._users.items()))
+            if len(self._users) <= self.max_users and now - oldest.updated < self.idle_ttl:
+                break
+            if oldest_id == user_id:
+                break
+            self._users.popitem(last=False)
+        return budget
+
+    def allow(self, user_id: int, is_callback: bool, now: float = None) -> bool:
+        """Списать токен; False — лимит исчерпан"""
+        now = time.monotonic() if now is None else now
+        budget = self._budget(user_id, now)
+        elapsed = now - budget.updated
+        budget.updated = now
+        budget.message_tokens = min(self.message_burst,
+                                    budget.message_tokens + elapsed * self.message_rate)
+        budget.callback_tokens = min(self.callback_burst,
+                                     budget.callback_tokens + elapsed * self.callback_rate)
+
+        if is_callback:
+            allowed = budget.callback_tokens >= 1
+            if allowed:
+                budget.callback_tokens -= 1
+        else:
+            allowed = budget.message_tokens >= 1
+            if allowed:
+                budget.message_tokens -= 1
+
+        if allowed:
+            budget.allowed += 1
+            self.total_allowed += 1
+        else:
+            budget.throttled += 1
+            self.total_throttled += 1
+        return allowed
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        user = data.get("event_from_user")
+        if user is None:
+            return await handler(event, data)
+
+        is_callback = isinstance(event, CallbackQuery)
+        if self.allow(user.id, is_callback):
+            return await handler(event, data)
+
+        try:
+            if is_callback:
+                await event.answer(THROTTLED_CALLBACK_TEXT)
+            elif isinstance(event, Message):
+                budget = self._users[user.id]
+                now = time.monotonic()
+                if now - budget.warned_at >= WARN_INTERVAL:
+                    budget.warned_at = now
+                    await event.answer(THROTTLED_MESSAGE_TEXT)
+        except Exception as e:
+            logger.warning(f"Не удалось ответить на апдейт сверх лимита: {e}")
+        return None
+
+    def stats(self, top: int = 10) -> Dict:
+        """Счётчики для мониторинга: итоги и самые частые нарушители"""
+        offenders: List[Dict] = heapq.nlargest(
+            top,
+            (
+                {"user_id": user_id, "throttled": budget.throttled, "allowed": budget.allowed}
+                for user_id, budget in self._users.items() if budget.throttled
+            ),
+            key=lambda item: item["throttled"],
+        )
+        return {
+            "tracked_users": len(self._users),
+            "allowed": self.total_allowed,
+            "throttled": self.total_throttled,
+            "top_offenders": offenders,
+        }
@@ -0,0 +1,196 @@
+import contextlib
+import contextvars
+import functools
+import inspect
+import logging
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+from aiogram import BaseMiddleware
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware
+from aiogram.types import TelegramObject
+
+logger = logging.getLogger(__name__)
+
+# Апдейты дольше этого порога попадают в лог медленных трасс
+SLOW_TRACE_MS = 1000.0
+# Сколько спанов храним в одной трассе (остальные только считаем)
+MAX_SPANS = 200
+
+# (имя, начало от старта трассы в с, длительность в с, глубина вложенности)
+Span = Tuple[str, float, float, int]
+
+
+class Trace:
+    """Трасса одного апдейта: id и плоский список спанов с глубиной"""
+
+    __slots__ = ("trace_id", "name", "handler", "user_id", "started", "spans", "dropped")
+
+    def __init__(self, name: str, user_id: Optional[int] = None):
+        self.trace_id = os.urandom(8).hex()
+        self.name = name
+        self.handler: Optional[str] = None
+        self.user_id = user_id
+        self.started = time.perf_counter()
+        self.spans: List[Span] = []
+        self.dropped = 0
+
+    def add(self, name: str, started: float, duration: float, depth: int):
+        if len(self.spans) < MAX_SPANS:
+            self.spans.append((name, started - self.started, duration, depth))
+        else:
+            self.dropped += 1
+
+    def compact(self) -> str:
+        """'>' по глубине, имя@начало+длительность в мс: db.get_user@0.4+1.2"""
+        return " ".join(
+            f"{'>' * depth}{name}@{offset * 1000:.1f}+{duration * 1000:.1f}"
+            for name, offset, duration, depth in sorted(self.spans, key=lambda s: s[1])
+        )
+
+
+_trace: contextvars.ContextVar[Optional[Trace]] = contextvars.ContextVar("trace", default=None)
+_depth: contextvars.ContextVar[int] = contextvars.ContextVar("trace_depth", default=0)
+
+
+@contextlib.contextmanager
+def span(name: str):
+    """Спан внутри текущей трассы; без трассы ничего не делает"""
+    trace = _trace.get()
+    if trace is None:
+        yield
+        return
+    depth = _depth.get()
+    token = _depth.set(depth + 1)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        _depth.reset(token)
+        trace.add(name, started, time.perf_counter() - started, depth)
+
+
+def record_span(name: str, seconds: float):
+    """Спан задним числом: закончился только что и длился seconds"""
+    trace = _trace.get()
+    if trace is not None:
+        now = time.perf_counter()
+        trace.add(name, now - seconds, seconds, _depth.get())
+
+
+def trace_methods(obj: Any, prefix: str, exclude: Iterable[str] = ()) -> List[str]:
+    """
+    Оборачивает публичные async-методы объекта в спаны '<prefix>.<метод>'
+    (на экземпляре, как metrics.instrument). Возвращает имена обёрнутых.
+    """
+    wrapped = []
+    skip = set(exclude)
+    for name, _ in inspect.getmembers(type(obj), inspect.iscoroutinefunction):
+        if name.startswith("_") or name in skip:
+            continue
+        setattr(obj, name, _traced(getattr(obj, name), f"{prefix}.{name}"))
+        wrapped.append(name)
+    return wrapped
+
+
+def _traced(func: Callable[..., Awaitable[Any]], name: str) -> Callable[..., Awaitable[Any]]:
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        if _trace.get() is None:
+            return await func(*args, **kwargs)
+        with span(name):
+            return await func(*args, **kwargs)
+
+    return wrapper
+
+
+class TracingMiddleware(BaseMiddleware):
+    """
+    Outer-middleware на dp.update: открывает трассу на апдейт.
+    Если апдейт обрабатывался дольше slow_ms, трасса одной строкой
+    уходит в лог медленных трасс (логгер app.tracing).
+    """
+
+    def __init__(self, slow_ms: float = SLOW_TRACE_MS):
+        self.slow_ms = slow_ms
+        self.traced = 0
+        self.slow = 0
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        user = data.get("event_from_user")
+        trace = Trace(getattr(event, "event_type", type(event).__name__),
+                      user.id if user else None)
+        token = _trace.set(trace)
+        try:
+            return await handler(event, data)
+        finally:
+            _trace.reset(token)
+            self.traced += 1
+            total_ms = (time.perf_counter() - trace.started) * 1000
+            if total_ms >= self.slow_ms:
+                self.slow += 1
+                logger.warning(
+                    "Медленный апдейт",
+                    extra={
+                        "trace_id": trace.trace_id,
+                        "update": trace.name,
+                        "handler": trace.handler,
+                        "user_id": trace.user_id,
+                        "total_ms": round(total_ms, 1),
+                        "spans": trace.compact(),
+                        "spans_dropped": trace.dropped,
+                    },
+                )
+
+
+class HandlerSpans(BaseMiddleware):
+    """Inner-middleware (dp.message, dp.callback_query): имя хендлера в трассе
+    и спан 'handler.<имя>' вокруг него"""
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        trace = _trace.get()
+        if trace is None:
+            return await handler(event, data)
+        handler_object = data.get("handler")
+        trace.handler = getattr(getattr(handler_object, "callback", None), "__name__", "unknown")
+        with span(f"handler.{trace.handler}"):
+            return await handler(event, data)
+
+
+class TelegramSpans(BaseRequestMiddleware):
+    """Middleware сессии бота: спан 'tg.<метод>' на каждый запрос к Bot API
+    (вместе с ожиданием очереди лимитера, если он подключён после)"""
+
+    async def __call__(self, make_request, bot, method):
+        if _trace.get() is None:
+            return await make_request(bot, method)
+        with span(f"tg.{type(method).__name__}"):
+            return await make_request(bot, method)
+
+
+def install_log_trace_id():
+    """Записи логов, сделанные внутри трассы, получают поле trace_id"""
+    factory = logging.getLogRecordFactory()
+    if getattr(factory, "adds_trace_id", False):
+        return
+
+    def record_factory(*args, **kwargs):
+        record = factory(*args, **kwargs)
+        trace = _trace.get()
+        if trace is not None:
+            record.trace_id = trace.trace_id
+        return record
+
+    record_factory.adds_trace_id = True
+    logging.setLogRecordFactory(record_factory)
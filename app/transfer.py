@@ -0,0 +1,194 @@
+import csv
+import hashlib
+import io
+import json
+import logging
+import time
+from typing import Awaitable, Callable, Dict, Iterator, List, Optional, Set
+
+from .database import Database
+
+logger = logging.getLogger(__name__)
+
+# Слов за одну транзакцию при импорте и за один fetchmany при экспорте
+IMPORT_CHUNK = 500
+EXPORT_BATCH = 1000
+# Telegram отдаёт ботам файлы до 20 МБ
+MAX_IMPORT_BYTES = 20 * 1024 * 1024
+# Как часто обновляем сообщение с прогрессом
+PROGRESS_INTERVAL = 3.0
+
+FIELDS = ("word", "translation", "transcription", "part_of_speech")
+FORMATS = ("csv", "jsonl", "anki")
+EXTENSIONS = {"csv": "csv", "jsonl": "jsonl", "anki": "txt"}
+
+# Заголовок текстового импорта Anki (2.1.55+): колонки Front/Back типа Basic
+ANKI_HEADER = ("#separator:tab\n#html:false\n#notetype:Basic\n"
+               "#deck:Wordy Dasha\n#columns:Front\tBack\n")
+
+
+class Progress:
+    """Вызывает report(обработано) не чаще раза в interval секунд"""
+
+    def __init__(self, report: Callable[[int], Awaitable[None]],
+                 interval: float = PROGRESS_INTERVAL):
+        self.report = report
+        self.interval = interval
+        self._last = time.monotonic()
+
+    async def update(self, done: int):
+        now = time.monotonic()
+        if now - self._last < self.interval:
+            return
+        self._last = now
+        try:
+            await self.report(done)
+        except Exception as e:
+            # Прогресс — не повод прерывать импорт или экспорт
+            logger.warning(f"Не удалось обновить прогресс: {e}")
+
+
+def detect_format(filename: str) -> Optional[str]:
+    extension = filename.rsplit(".", 1)[-1].lower() if "." in filename else ""
+    if extension == "csv":
+        return "csv"
+    if extension in ("jsonl", "json", "ndjson"):
+        return "jsonl"
+    if extension in ("txt", "tsv"):
+        return "anki"
+    return None
+
+
+def _word_key(word: str, translation: str) -> int:
+    """Ключ дедупликации: 8 байт вместо пары строк — 100k слов занимают несколько МБ"""
+    digest = hashlib.blake2b(f"{word.lower()}\t{translation.lower()}".encode(), digest_size=8)
+    return int.from_bytes(digest.digest(), "big")
+
+
+def _format_row(fmt: str, row: Dict) -> str:
+    if fmt == "jsonl":
+        return json.dumps({field: row[field] for field in FIELDS}, ensure_ascii=False) + "\n"
+    if fmt == "anki":
+        back = row["translation"]
+        if row["transcription"]:
+            back += f" [{row['transcription']}]"
+        return f"{_tsv(row['word'])}\t{_tsv(back)}\n"
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow([row[field] or "" for field in FIELDS])
+    return buffer.getvalue()
+
+
+def _tsv(value: str) -> str:
+    return value.replace("\t", " ").replace("\n", " ")
+
+
+async def export_words(db: Database, user_id: int, fmt: str, path: str,
+                       progress: Optional[Progress] = None) -> int:
+    """
+    Пишет словарь пользователя в файл порциями по EXPORT_BATCH строк прямо
+    из курсора SQLite; в памяти не больше одной порции. Возвращает число слов.
+    """
+    exported = 0
+    with open(path, "w", encoding="utf-8-sig" if fmt == "csv" else "utf-8", newline="") as f:
+        if fmt == "csv":
+            csv.writer(f).writerow(FIELDS)
+        elif fmt == "anki":
+            f.write(ANKI_HEADER)
+        async for batch in db.iter_user_words(user_id, EXPORT_BATCH):
+            f.write("".join(_format_row(fmt, row) for row in batch))
+            exported += len(batch)
+            if progress:
+                await progress.update(exported)
+    logger.info(f"Экспорт словаря ({fmt}): {exported} слов", extra={"user_id": user_id})
+    return exported
+
+
+def _parse_csv(lines: Iterator[str]) -> Iterator[Dict]:
+    reader = csv.reader(lines)
+    header = next(reader, None)
+    if header is None:
+        return
+    columns = [name.strip().lower() for name in header]
+    if "word" in columns:
+        index = {field: columns.index(field) for field in FIELDS if field in columns}
+    else:
+        # Без заголовка: слово, перевод, транскрипция, часть речи
+        index = {field: i for i, field in enumerate(FIELDS)}
+        reader = _chain_row(header, reader)
+    for values in reader:
+        yield {field: values[i] if i < len(values) else "" for field, i in index.items()}
+
+
+def _chain_row(first: List[str], rest: Iterator[List[str]]) -> Iterator[List[str]]:
+    yield first
+    yield from rest
+
+
+def _parse_jsonl(lines: Iterator[str]) -> Iterator[Dict]:
+    for line in lines:
+        line = line.strip()
+        if line:
+            try:
+                item = json.loads(line)
+            except ValueError:
+                item = None
+            # Не объект — пустая запись, она посчитается как invalid
+            yield item if isinstance(item, dict) else {}
+
+
+def _parse_anki(lines: Iterator[str]) -> Iterator[Dict]:
+    for line in lines:
+        if line.startswith("#") or not line.strip():
+            continue
+        columns = line.rstrip("\n").split("\t")
+        back = columns[1] if len(columns) > 1 else ""
+        transcription = ""
+        if back.endswith("]") and " [" in back:
+            back, transcription = back[:-1].rsplit(" [", 1)
+        yield {"word": columns[0], "translation": back, "transcription": transcription}
+
+
+PARSERS = {"csv": _parse_csv, "jsonl": _parse_jsonl, "anki": _parse_anki}
+
+
+async def import_words(db: Database, user_id: int, fmt: str, path: str,
+                       progress: Optional[Progress] = None) -> Dict[str, int]:
+    """
+    Читает файл построчно и добавляет слова порциями по IMPORT_CHUNK через
+    Database.add_words_to_user (одна транзакция на порцию). Пары
+    слово+перевод, которые уже есть в словаре или встречались в файле
+    раньше, пропускаются: для этого держим множество 8-байтных ключей.
+    """
+    known: Set[int] = set()
+    async for batch in db.iter_user_words(user_id, EXPORT_BATCH):
+        known.update(_word_key(row["word"], row["translation"] or "") for row in batch)
+
+    stats = {"added": 0, "duplicates": 0, "invalid": 0}
+    chunk: List[Dict] = []
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        for item in PARSERS[fmt](f):
+            word = " ".join(str(item.get("word") or "").split())
+            translation = " ".join(str(item.get("translation") or "").split())
+            if not word or not translation:
+                stats["invalid"] += 1
+                continue
+            key = _word_key(word, translation)
+            if key in known:
+                stats["duplicates"] += 1
+                continue
+            known.add(key)
+            chunk.append({
+                "word": word,
+                "translation": {"text": translation},
+                "transcription": str(item.get("transcription") or ""),
+                "partOfSpeechCode": item.get("part_of_speech") or None,
+            })
+            if len(chunk) >= IMPORT_CHUNK:
+                stats["added"] += await db.add_words_to_user(user_id, chunk)
+                chunk = []
+                if progress:
+                    await progress.update(stats["added"])
+        if chunk:
+            stats["added"] += await db.add_words_to_user(user_id, chunk)
+    logger.info(f"Импорт словаря ({fmt}): {stats}", extra={"user_id": user_id})
+    return stats
@@ -1,19 +1,141 @@
+from typing import List, Optional
+
+from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 
 
-def kb_search_card():
+class FrozenButton(InlineKeyboardButton):
+    """Кнопка, которую нельзя изменить: экземпляр общий для всех сообщений"""
+
+    model_config = {"frozen": True}
+
+
+class FrozenMarkup(InlineKeyboardMarkup):
+    model_config = {"frozen": True}
+
+
+def _freeze(builder: InlineKeyboardBuilder) -> FrozenMarkup:
+    """Статическая клавиатура собирается один раз при импорте"""
+    return FrozenMarkup(inline_keyboard=[
+        [FrozenButton(**button.model_dump(exclude_none=True)) for button in row]
+        for row in builder.export()
+    ])
+
+
+def _search_card() -> InlineKeyboardBuilder:
     kb = InlineKeyboardBuilder()
     kb.button(text="🔊 Произнести", callback_data="speak")
     kb.button(text="📚 Примеры", callback_data="examples")
     kb.button(text="🎯 Квиз", callback_data="quiz")
     kb.adjust(2, 1)
-    return kb.as_markup()
+    return kb
 
 
-def kb_quiz():
+def _quiz() -> InlineKeyboardBuilder:
     kb = InlineKeyboardBuilder()
     kb.button(text="✅ Правильно", callback_data="quiz_correct")
     kb.button(text="❌ Неправильно", callback_data="quiz_incorrect")
     kb.button(text="🔄 Другое слово", callback_data="quiz_next")
     kb.adjust(2, 1)
+    return kb
+
+
+def _single(text: str, callback_data: str) -> InlineKeyboardBuilder:
+    kb = InlineKeyboardBuilder()
+    kb.button(text=text, callback_data=callback_data)
+    return kb
+
+
+SEARCH_CARD = _freeze(_search_card())
+QUIZ = _freeze(_quiz())
+QUIZ_NEXT = _freeze(_single("🔄 Следующий раунд", "quiz_next"))
+SPEAK_RANDOM = _freeze(_single("🔊 Произнести случайное слово", "speak_random"))
+REMINDER = _freeze(_single("🎯 Начать квиз", "quiz"))
+
+
+def kb_search_card():
+    return SEARCH_CARD
+
+
+def kb_quiz():
+    return QUIZ
+
+
+def kb_quiz_next():
+    return QUIZ_NEXT
+
+
+def kb_reminder():
+    return REMINDER
+
+
+def kb_speak_random():
+    return SPEAK_RANDOM
+
+
+# Начала callback_data вариантов квиза: quiz_answer_<вариант>_<верный>_<id записи>
+_ANSWER_PREFIXES = [f"quiz_answer_{i}_" for i in range(10)]
+
+
+def kb_quiz_answers(options: List[str], correct: int, user_word_id: int) -> InlineKeyboardMarkup:
+    """
+    Варианты ответа квиза, по одному в ряд. Собирается из готовых
+    кусков без InlineKeyboardBuilder и без повторной валидации полей:
+    тексты — строки переводов, callback_data — из заготовленных префиксов.
+    """
+    suffix = f"{correct}_{user_word_id}"
+    return InlineKeyboardMarkup.model_construct(inline_keyboard=[
+        [InlineKeyboardButton.model_construct(text=option,
+                                              callback_data=_ANSWER_PREFIXES[i] + suffix)]
+        for i, option in enumerate(options)
+    ])
+
+
+def kb_bulk_pages(bulk_id: int, page: int, pages: int) -> Optional[InlineKeyboardMarkup]:
+    """Листание итога списка слов: ◀️ 2/5 ▶️; для одной страницы клавиатуры нет"""
+    if pages <= 1:
+        return None
+    kb = InlineKeyboardBuilder()
+    if page > 0:
+        kb.button(text="◀️", callback_data=f"bulk_page_{bulk_id}_{page - 1}")
+    kb.button(text=f"{page + 1}/{pages}", callback_data="noop")
+    if page < pages - 1:
+        kb.button(text="▶️", callback_data=f"bulk_page_{bulk_id}_{page + 1}")
+    return kb.as_markup()
+
+
+def kb_find_pages(query: str, page: int, has_next: bool) -> Optional[InlineKeyboardMarkup]:
+    """Листание /find; запрос едет в callback_data, поэтому страницы переживают перезапуск"""
+    if page == 0 and not has_next:
+        return None
+    kb = InlineKeyboardBuilder()
+    if page > 0:
+        kb.button(text="◀️", callback_data=f"find_{page - 1}_{query}")
+    kb.button(text=f"стр. {page + 1}", callback_data="noop")
+    if has_next:
+        kb.button(text="▶️", callback_data=f"find_{page + 1}_{query}")
+    return kb.as_markup()
+
+
+# callback_data не длиннее 64 байт: длинные варианты не показываем
+_CALLBACK_LIMIT = 64
+
+
+def kb_spelling(suggestions: List[str], query: Optional[str] = None) -> InlineKeyboardMarkup:
+    """Варианты исправления опечатки и (если передан) поиск запроса как есть"""
+    kb = InlineKeyboardBuilder()
+    for word in suggestions:
+        if len(f"spell_{word}".encode()) <= _CALLBACK_LIMIT:
+            kb.button(text=f"🔍 {word}", callback_data=f"spell_{word}")
+    if query and len(f"spell_{query}".encode()) <= _CALLBACK_LIMIT:
+        kb.button(text=f"Искать «{query}» как есть", callback_data=f"spell_{query}")
+    kb.adjust(1)
+    return kb.as_markup()
+
+
+def kb_broadcast_confirm(broadcast_id: int) -> InlineKeyboardMarkup:
+    """Подтверждение рассылки после предпросмотра"""
+    kb = InlineKeyboardBuilder()
+    kb.button(text="📣 Отправить всем", callback_data=f"broadcast_go_{broadcast_id}")
+    kb.button(text="✖️ Отмена", callback_data=f"broadcast_cancel_{broadcast_id}")
     return kb.as_markup()
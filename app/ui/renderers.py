@@ -1,5 +1,59 @@
+import functools
+import logging
+from collections import OrderedDict
 from html import escape
-from typing import Dict, List
+from typing import Dict, Hashable, List, Optional, Tuple
+
+from ..activity import month_name
+
+logger = logging.getLogger(__name__)
+
+# Сколько отрендеренных карточек и блоков примеров держим в памяти
+RENDER_CACHE_SIZE = 4096
+
+
+class RenderCache:
+    """LRU готовых текстов: популярные слова рендерятся один раз, а не на каждый запрос"""
+
+    def __init__(self, size: int = RENDER_CACHE_SIZE):
+        self.size = size
+        self._items: "OrderedDict[Hashable, str]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[str]:
+        text = self._items.get(key)
+        if text is None:
+            self.misses += 1
+            return None
+        self._items.move_to_end(key)
+        self.hits += 1
+        return text
+
+    def put(self, key: Hashable, text: str):
+        self._items[key] = text
+        self._items.move_to_end(key)
+        if len(self._items) > self.size:
+            self._items.popitem(last=False)
+
+    def clear(self):
+        self._items.clear()
+
+    def stats(self) -> Dict:
+        return {"size": len(self._items), "hits": self.hits, "misses": self.misses}
+
+
+_cards = RenderCache()
+_examples = RenderCache()
+
+
+def render_cache_stats() -> Dict[str, Dict]:
+    return {"cards": _cards.stats(), "examples": _examples.stats()}
+
+
+# Переводы в вариантах квиза повторяются: экранируем каждый один раз
+_escaped = functools.lru_cache(maxsize=RENDER_CACHE_SIZE)(escape)
+_OPTION_NUMBERS = [f"{i + 1}. " for i in range(10)]
 
 
 def _safe(v, default="—"):
@@ -10,7 +64,19 @@ def render_word_card(meaning: Dict) -> str:
     """
     meaning — элемент из /meanings
     ожидаемые поля: text/word, transcription, translation.text, partOfSpeechCode, imageUrl
+    Значения Skyeng неизменны, поэтому карточка кешируется по (id значения, слово).
     """
+    if meaning.get("id") is None:
+        return _render_word_card(meaning)
+    key = (meaning["id"], meaning.get("text") or meaning.get("word"))
+    card = _cards.get(key)
+    if card is None:
+        card = _render_word_card(meaning)
+        _cards.put(key, card)
+    return card
+
+
+def _render_word_card(meaning: Dict) -> str:
     word = meaning.get("text") or meaning.get("word") or ""
     transcription = meaning.get("transcription")
     pos = meaning.get("partOfSpeechCode")
@@ -42,14 +108,22 @@ def render_word_card(meaning: Dict) -> str:
 
 
 def render_examples(meaning: Dict) -> str:
+    """Блок примеров; кешируется по id значения"""
+    if meaning.get("id") is None:
+        return _render_examples(meaning)
+    text = _examples.get(meaning["id"])
+    if text is None:
+        text = _render_examples(meaning)
+        _examples.put(meaning["id"], text)
+    return text
+
+
+def _render_examples(meaning: Dict) -> str:
     examples = meaning.get("examples") or []
     if not examples:
         return "😔 Примеры не найдены для этого слова."
     
-    # Логируем структуру примера для отладки
-    import logging
-    logger = logging.getLogger(__name__)
-    logger.info(f"Структура примера: {examples[0] if examples else 'Нет примеров'}")
+    logger.debug("Структура примера: %s", examples[0])
     
     lines = []
     for i, ex in enumerate(examples[:5]):
@@ -73,8 +147,7 @@ def render_examples(meaning: Dict) -> str:
         if not ru:
             ru = ex.get("translation_text") or ex.get("translationText") or ""
         
-        # Логируем, что мы нашли для отладки
-        logger.info(f"Пример: '{en}' -> Перевод: '{ru}'")
+        logger.debug("Пример: %r -> перевод: %r", en, ru)
         
         # Показываем только английский текст (переводы примеров недоступны в API)
         lines.append(f"<b>{i+1}.</b> {escape(en)}")
@@ -83,13 +156,11 @@ def render_examples(meaning: Dict) -> str:
 
 
 def render_quiz_question(word: str, options: List[str], correct: int) -> str:
-    """Рендерит вопрос для квиза"""
-    question = f"🎯 Как переводится слово «{word}»?\n\n"
-    
+    """Рендерит вопрос для квиза из заранее экранированных кусков"""
+    parts = [f"🎯 Как переводится слово «{_escaped(word)}»?\n\n"]
     for i, option in enumerate(options):
-        question += f"{i+1}. {escape(option)}\n"
-    
-    return question
+        parts.append(f"{_OPTION_NUMBERS[i]}{_escaped(option)}\n")
+    return "".join(parts)
 
 def render_quiz_result(word: str, options: List[str], correct: int, user_answer: int) -> str:
     """Рендерит результат квиза"""
@@ -110,3 +181,157 @@ def render_quiz_result(word: str, options: List[str], correct: int, user_answer:
         result += f"\n😔 Неправильно! Правильный ответ: {escape(options[correct])}"
     
     return result
+
+
+def render_bulk_page(rows: List[Tuple[str, Optional[str]]], page: int, page_size: int) -> str:
+    """Итог поиска списка слов: сводка и одна страница (слово — перевод)"""
+    added = sum(1 for _, translation in rows if translation is not None)
+    parts = [f"📥 <b>Добавлено в словарь:</b> {added} из {len(rows)}\n\n"]
+    start = page * page_size
+    for i, (word, translation) in enumerate(rows[start:start + page_size], start + 1):
+        if translation is None:
+            parts.append(f"{i}. {_escaped(word)} — 😔 не найдено\n")
+        else:
+            parts.append(f"{i}. <b>{_escaped(word)}</b> — {_escaped(translation)}\n")
+    return "".join(parts)
+
+
+def render_find_results(query: str, rows: List[Dict], page: int, page_size: int) -> str:
+    """Страница результатов /find"""
+    if not rows:
+        if page == 0:
+            return f"🔎 В твоём словаре нет слов по запросу «{_escaped(query)}»"
+        return f"🔎 Больше слов по запросу «{_escaped(query)}» нет"
+    parts = [f"🔎 <b>Найдено в словаре</b> по запросу «{_escaped(query)}»:\n\n"]
+    for i, row in enumerate(rows, page * page_size + 1):
+        line = f"{i}. <b>{_escaped(row['word'])}</b>"
+        if row.get("transcription"):
+            line += f" [{_escaped(row['transcription'])}]"
+        parts.append(f"{line} — {_escaped(row['translation'])}\n")
+    return "".join(parts)
+
+
+def render_broadcast_report(broadcast: Dict) -> str:
+    """Итог или ход рассылки для администратора"""
+    titles = {"running": "📣 Рассылка идёт", "done": "✅ Рассылка завершена",
+              "cancelled": "⏹ Рассылка остановлена", "draft": "📝 Черновик рассылки"}
+    return (f"{titles.get(broadcast['status'], broadcast['status'])} (#{broadcast['id']})\n\n"
+            f"Доставлено: {broadcast['sent']}\n"
+            f"Заблокировали бота: {broadcast['blocked']}\n"
+            f"Ошибок: {broadcast['failed']}")
+
+
+def render_reminder(words: int, weak: int) -> str:
+    """Ежедневное напоминание о повторении"""
+    if weak:
+        return (f"⏰ Пора повторить слова! Слов в словаре: {words}, "
+                f"с ошибками: {weak} — начнём с них?")
+    return f"⏰ Пора повторить слова! Слов в словаре: {words} — пройди короткий квиз."
+
+
+def _utc_offset(minutes: int) -> str:
+    hours, rest = divmod(abs(minutes), 60)
+    return f"UTC{'+' if minutes >= 0 else '-'}{hours}" + (f":{rest:02d}" if rest else "")
+
+
+def render_reminder_settings(reminder: Optional[Dict], default_offset: int) -> str:
+    """Ответ /remind без аргументов: текущее время напоминания и подсказка"""
+    if reminder:
+        hours, minutes = divmod(reminder["local_minute"], 60)
+        status = (f"⏰ Напоминаю каждый день в {hours:02d}:{minutes:02d} "
+                  f"({_utc_offset(reminder['utc_offset'])}).")
+    else:
+        status = "⏰ Напоминания выключены."
+    return (f"{status}\n\n"
+            f"/remind 19:30 — напоминать в 19:30 ({_utc_offset(default_offset)})\n"
+            f"/remind 19:30 +5 — то же по часовому поясу UTC+5\n"
+            f"/remind off — выключить")
+
+
+def render_top_words(all_time: List[Tuple[str, int]], window: List[Tuple[str, int]],
+                     window_total: int, cached: int, prewarm: int) -> str:
+    """Отчёт /top: популярные слова за всё время и за текущее окно подсчёта"""
+    parts = ["📈 <b>Популярные слова</b>\n\n"]
+    if all_time:
+        for i, (word, searches) in enumerate(all_time, 1):
+            parts.append(f"{i}. {_escaped(word)} — {searches}\n")
+    else:
+        parts.append("Пока пусто: счёт сохраняется раз в 5 минут\n")
+    if window:
+        parts.append(f"\n<b>Сейчас</b> (поисков в окне: {window_total}, оценки):\n")
+        parts.append(", ".join(f"{_escaped(word)} ~{count}" for word, count in window))
+        parts.append("\n")
+    if prewarm:
+        parts.append(f"\n💾 В кеше Skyeng {cached} из топ-{prewarm}")
+    return "".join(parts)
+
+
+def render_top_learners(top: List[Dict], user_id: int, rank: Optional[int], total: int,
+                        correct: int) -> str:
+    """Рейтинг /top_learners: лучшие и место пользователя"""
+    parts = ["🏆 <b>Лучшие ученики</b> (правильных ответов в квизах)\n\n"]
+    if not top:
+        parts.append("Пока никого — стань первым: /quiz\n")
+    place, previous = 0, None
+    for i, row in enumerate(top, 1):
+        # Одинаковые очки делят место, как и в Leaderboard.rank
+        if row["correct_answers"] != previous:
+            place, previous = i, row["correct_answers"]
+        answers = row["correct_answers"] + row["wrong_answers"]
+        accuracy = row["correct_answers"] / answers * 100 if answers else 0
+        name = _escaped(row["first_name"] or "Без имени")
+        line = f"{place}. {name} — {row['correct_answers']} ({accuracy:.0f}%)"
+        if row["user_id"] == user_id:
+            line = f"<b>{line}</b> ← ты"
+        parts.append(line + "\n")
+    if correct <= 0:
+        parts.append("\nОтветь в квизе правильно хотя бы раз, чтобы попасть в рейтинг")
+    elif rank is None:
+        parts.append("\n⏳ Рейтинг ещё считается, загляни чуть позже")
+    else:
+        parts.append(f"\nТвоё место: <b>#{rank}</b> из {total} ({correct} правильных)")
+    return "".join(parts)
+
+
+_SPARK = "▁▂▃▄▅▆▇█"
+
+
+def _plural(count: int, one: str, few: str, many: str) -> str:
+    """«1 ответ», «3 ответа», «5 ответов»"""
+    if count % 10 == 1 and count % 100 != 11:
+        return f"{count} {one}"
+    if 2 <= count % 10 <= 4 and not 12 <= count % 100 <= 14:
+        return f"{count} {few}"
+    return f"{count} {many}"
+
+
+def render_stats(stats: Dict, trend: Optional[Dict]) -> str:
+    """Ответ /stats: итоги за всё время и, если есть история, динамика по неделям и месяцам"""
+    parts = [f"""📊 <b>Твоя статистика:</b>
+
+📚 Слов в словаре: {stats['total_words']}
+✅ Изучено: {stats['mastered_words']}
+🎯 Правильных ответов: {stats['correct_answers']}
+❌ Ошибок: {stats['wrong_answers']}
+📈 Точность: {stats['accuracy']:.1f}%"""]
+    # Без активности за показанные недели и месяцы динамику не показываем
+    if trend and any(any(totals) for _, totals in trend["weeks"] + trend["months"]):
+        (_, this_week), (_, last_week) = trend["weeks"][-1], trend["weeks"][-2]
+        lines = []
+        for title, (correct, wrong, words) in (("Эта неделя", this_week), ("Прошлая", last_week)):
+            lines.append(f"{title}: {_plural(correct + wrong, 'ответ', 'ответа', 'ответов')} "
+                         f"(✅ {correct}), +{_plural(words, 'слово', 'слова', 'слов')}")
+        this_total, last_total = sum(this_week[:2]), sum(last_week[:2])
+        if last_total:
+            change = round((this_total - last_total) / last_total * 100)
+            lines[0] += f" — {'↑' if change >= 0 else '↓'} {abs(change)}%"
+        parts.append("\n\n📅 " + "\n      ".join(lines))
+        weekly = [correct + wrong for _, (correct, wrong, _) in trend["weeks"]]
+        peak = max(weekly)
+        if peak:
+            spark = "".join(_SPARK[count * (len(_SPARK) - 1) // peak] for count in weekly)
+            parts.append(f"\n📈 Ответы за {len(weekly)} недель: {spark}")
+        months = [f"{month_name(start)} {correct + wrong}"
+                  for start, (correct, wrong, _) in trend["months"]]
+        parts.append("\n🗓 По месяцам: " + " · ".join(months))
+    return "".join(parts)
@@ -0,0 +1,157 @@
+import hmac
+import ipaddress
+import logging
+from typing import Any, Callable, Dict, Optional
+
+from aiohttp import web
+from aiogram import Bot, Dispatcher
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler
+
+logger = logging.getLogger(__name__)
+
+
+def _require_secret(secret: str):
+    # Без секрета вебхук принял бы поддельные апдейты от любого, кто видит порт
+    if not secret:
+        raise ValueError("Вебхук без секретного токена не принимаем")
+
+
+class WebServer:
+    """
+    Встроенный HTTP-сервер бота.
+    Всегда отдаёт /health и /ready; в режиме webhook дополнительно
+    принимает апдейты Telegram на webhook_path. Служебные эндпоинты
+    (add_json_route, add_text_route) отвечают только с admin_token
+    в заголовке Authorization: Bearer, а без токена — только с localhost.
+    """
+
+    def __init__(self, dp: Dispatcher, bot: Bot, host: str = "0.0.0.0", port: int = 8080,
+                 admin_token: str = ""):
+        self.dp = dp
+        self.bot = bot
+        self.host = host
+        self.port = port
+        self.admin_token = admin_token
+        self.ready = False
+        self.accepting = True
+        self.mode = "starting"
+        self._update_paths = set()
+        # Отчёт о состоянии процесса (HealthMonitor.report): dict с ключом ready
+        self.health: Optional[Callable[[], Dict]] = None
+        self.app = web.Application(middlewares=[self._reject_when_stopping])
+        self.app.router.add_get("/health", self.on_health)
+        self.app.router.add_get("/ready", self.on_ready)
+        self._runner: Optional[web.AppRunner] = None
+
+    def enable_webhook(self, path: str, secret: str):
+        """
+        Зарегистрировать приём апдейтов. Telegram получает ответ сразу,
+        обработка идёт фоновой задачей; запросы без верного
+        X-Telegram-Bot-Api-Secret-Token отклоняются с 401.
+        Вызывать до start().
+        """
+        _require_secret(secret)
+        SimpleRequestHandler(
+            dispatcher=self.dp,
+            bot=self.bot,
+            handle_in_background=True,
+            secret_token=secret,
+        ).register(self.app, path=path)
+        self._update_paths.add(path)
+
+    def enable_webhook_router(self, path: str, secret: str,
+                              route: Callable[[Dict], None]):
+        """
+        Приём апдейтов в многопроцессном режиме: апдейт не обрабатывается
+        здесь, а передаётся в route (раскладка по воркерам). Запросы без
+        верного X-Telegram-Bot-Api-Secret-Token отклоняются с 401.
+        """
+        _require_secret(secret)
+
+        async def on_update(request: web.Request) -> web.Response:
+            token = request.headers.get("X-Telegram-Bot-Api-Secret-Token", "")
+            if not hmac.compare_digest(token.encode(), secret.encode()):
+                return web.Response(body="Unauthorized", status=401)
+            try:
+                update = await request.json()
+            except ValueError:
+                update = None
+            # Битое тело — ошибка клиента, а не трейсбек с 500
+            if not isinstance(update, dict):
+                return web.Response(body="Bad Request", status=400)
+            route(update)
+            return web.json_response({})
+
+        self.app.router.add_post(path, on_update)
+        self._update_paths.add(path)
+
+    @web.middleware
+    async def _reject_when_stopping(self, request: web.Request, handler):
+        """Во время остановки отвечаем на апдейты 503 — Telegram повторит их позже"""
+        if not self.accepting and request.path in self._update_paths:
+            return web.Response(body="Shutting down", status=503)
+        return await handler(request)
+
+    def stop_accepting(self):
+        """Перестать принимать апдейты; /health продолжает отвечать"""
+        self.accepting = False
+        self.ready = False
+
+    def _is_admin(self, request: web.Request) -> bool:
+        if self.admin_token:
+            expected = f"Bearer {self.admin_token}".encode()
+            return hmac.compare_digest(request.headers.get("Authorization", "").encode(), expected)
+        try:
+            return ipaddress.ip_address(request.remote or "").is_loopback
+        except ValueError:
+            return False
+
+    def add_json_route(self, path: str, provider: Callable[[], Any]):
+        """Служебный GET-эндпоинт, отдающий provider() в JSON (счётчики, статистика)"""
+        async def on_get(request: web.Request) -> web.Response:
+            if not self._is_admin(request):
+                return web.Response(body="Unauthorized", status=401)
+            return web.json_response(provider())
+
+        self.app.router.add_get(path, on_get)
+
+    def add_text_route(self, path: str, provider: Callable[[], str],
+                       content_type: str = "text/plain; charset=utf-8"):
+        """Служебный GET-эндпоинт с текстом provider() (например, метрики Prometheus)"""
+        async def on_get(request: web.Request) -> web.Response:
+            if not self._is_admin(request):
+                return web.Response(body="Unauthorized", status=401)
+            return web.Response(text=provider(), headers={"Content-Type": content_type})
+
+        self.app.router.add_get(path, on_get)
+
+    async def on_health(self, request: web.Request) -> web.Response:
+        """Живость: процесс запущен и event loop отвечает; плюс сводка состояния"""
+        body = {"status": "ok", "mode": self.mode}
+        if self.health:
+            body.update(self.health())
+        return web.json_response(body)
+
+    async def on_ready(self, request: web.Request) -> web.Response:
+        """Готовность: бот получает апдейты и не перегружен"""
+        body = {"ready": self.ready, "mode": self.mode}
+        if self.health:
+            report = self.health()
+            body["ready"] = self.ready and report["ready"]
+            body["reasons"] = report["reasons"]
+        status = 200 if body["ready"] else 503
+        return web.json_response(body, status=status)
+
+    async def start(self):
+        self._runner = web.AppRunner(self.app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        logger.info(f"HTTP-сервер запущен на {self.host}:{self.port}")
+
+    async def stop(self):
+        self.ready = False
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+            logger.info("HTTP-сервер остановлен")
@@ -0,0 +1,4 @@
+"""
+Бенчмарки и проверочные скрипты Wordy Dasha.
+Запускаются как модули: python -m bench.<имя>
+"""
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+История активности (app.activity): запись, сжатие и чтение динамики /stats.
+
+База — только activity_daily: --users пользователей, у каждого год истории,
+активен в доле --active дней. Замеры:
+- сброс ответов квиза вместе с дневной активностью (flush_pending)
+  для 1000 пользователей;
+- чтение динамики /stats (activity_rows + build_trend) и число прочитанных
+  строк — до и после сжатия;
+- сжатие всей истории старше DAILY_KEEP_DAYS (compact), повторный проход
+  по уже сжатой истории (обычный запуск по расписанию) и размер таблиц.
+--out пишет JSON для сравнения между коммитами.
+
+Запуск: python -m bench.activity [--users 20000] [--days 365] [--out activity.json]
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+from app.activity import build_trend, compact, day_number, trend_since
+from app.database import Database
+from bench.report import percentiles, save_json
+
+
+def generate(db_path: str, users: int, days: int, active: float, today: int, seed: int) -> int:
+    asyncio.run(Database(db_path).init())
+    rng = random.Random(seed)
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA synchronous=OFF")
+    rows = 0
+    for user_id in range(1, users + 1):
+        batch = [(user_id, today - offset, rng.randrange(30), rng.randrange(10), rng.randrange(3))
+                 for offset in range(days, 0, -1) if rng.random() < active]
+        conn.executemany("INSERT INTO activity_daily VALUES (?, ?, ?, ?, ?)", batch)
+        rows += len(batch)
+    conn.commit()
+    conn.execute("ANALYZE")
+    conn.close()
+    return rows
+
+
+def table_sizes(db_path: str) -> dict:
+    conn = sqlite3.connect(db_path)
+    sizes = {table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+             for table in ("activity_daily", "activity_rollups")}
+    conn.close()
+    return sizes
+
+
+async def trend(db: Database, users: int, today: int, rng: random.Random) -> dict:
+    samples, rows_read = [], []
+    for _ in range(300):
+        user_id = rng.randrange(1, users + 1)
+        started = time.perf_counter()
+        rows = await db.activity_rows(user_id, *trend_since(today))
+        build_trend(rows, today)
+        samples.append(time.perf_counter() - started)
+        rows_read.append(len(rows))
+    return {**percentiles(samples), "rows_max": max(rows_read),
+            "rows_mean": round(sum(rows_read) / len(rows_read), 1)}
+
+
+async def bench(db_path: str, args, today: int) -> dict:
+    db = Database(db_path)
+    rng = random.Random(args.seed)
+    results = {}
+
+    flushes = []
+    for _ in range(20):
+        for user_id in rng.sample(range(1, args.users + 1), 1000):
+            db.queue_answer(user_id, None, rng.random() < 0.7)
+        started = time.perf_counter()
+        await db.flush_pending()
+        flushes.append(time.perf_counter() - started)
+    results["flush_1000_users"] = percentiles(flushes)
+
+    results["trend_before"] = await trend(db, args.users, today, rng)
+    results["tables_before"] = table_sizes(db_path)
+    started = time.perf_counter()
+    rows = await compact(db, today)
+    elapsed = time.perf_counter() - started
+    results["compact"] = {"rows": rows, "seconds": round(elapsed, 2),
+                          "rows_per_second": round(rows / elapsed)}
+    started = time.perf_counter()
+    await compact(db, today)
+    results["compact"]["steady_seconds"] = round(time.perf_counter() - started, 2)
+    results["tables_after"] = table_sizes(db_path)
+    results["trend_after"] = await trend(db, args.users, today, rng)
+    return results
+
+
+def main(args):
+    today = day_number(time.time(), 0)
+    with tempfile.TemporaryDirectory() as directory:
+        db_path = os.path.join(directory, "bench.db")
+        print(f"🗄 генерирую {args.users} пользователей × {args.days} дней...")
+        rows = generate(db_path, args.users, args.days, args.active, today, args.seed)
+        print(f"   дневных строк: {rows}")
+        results = asyncio.run(bench(db_path, args, today))
+        size_mb = round(os.path.getsize(db_path) / 2 ** 20, 1)
+
+    for name in ("flush_1000_users", "trend_before", "trend_after"):
+        stats = results[name]
+        rows_read = f", строк до {stats['rows_max']}" if "rows_max" in stats else ""
+        print(f"  {name:<18}p50 {stats['p50_ms']:>7} p99 {stats['p99_ms']:>7} мс{rows_read}")
+    compacted = results["compact"]
+    print(f"  сжатие: {compacted['rows']} строк за {compacted['seconds']} с "
+          f"({compacted['rows_per_second']}/с), повторный проход {compacted['steady_seconds']} с")
+    print(f"  строк: {results['tables_before']} -> {results['tables_after']}, файл {size_mb} МБ")
+    if args.out:
+        save_json({"config": vars(args), "rows": rows, **results}, args.out)
+        print(f"\nРезультат сохранён в {args.out}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=20_000)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--active", type=float, default=0.3, help="доля дней с активностью")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--out", help="сохранить JSON-результат в файл")
+    main(parser.parse_args())
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+Методы Database на объёме боевой базы.
+
+Генерирует синтетическую базу во временном файле SQLite (по умолчанию
+1M пользователей и ~50M записей user_words): размер словаря пользователя
+по Парето со средним --words-per-user, популярность слов по Ципфу, как и
+активность пользователей в замерах. Слова пишутся так же, как их пишет
+add_word_to_user — своя строка words на каждую запись словаря.
+
+Для каждого метода — задержка (p50/p95/p99) и операций в секунду
+по одному вызову за раз и под конкурентной нагрузкой (--concurrency задач).
+--scale уменьшает базу пропорционально (0.01 — 10k пользователей,
+~500k записей); --db сохраняет базу и переиспользует её в следующих
+прогонах. --out пишет JSON для сравнения между коммитами.
+
+Запуск: python -m bench.db [--scale 0.01] [--ops 2000] [--concurrency 32]
+                           [--db data/bench.db] [--out db.json]
+"""
+
+import argparse
+import asyncio
+import bisect
+import itertools
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from typing import Callable, Dict, List
+
+from app.database import Database
+from bench.report import percentiles, save_json
+
+USERS = 1_000_000
+WORDS_PER_USER = 50
+MAX_WORDS_PER_USER = 5000
+VOCABULARY = 100_000
+ZIPF_EXPONENT = 1.1
+# telegram_id = TELEGRAM_ID_BASE + users.id
+TELEGRAM_ID_BASE = 1_000_000_000
+BATCH = 50_000
+# Доля get_or_create_user для новых пользователей
+NEW_USER_RATE = 0.1
+
+METHODS = ("get_or_create_user", "add_word_to_user", "get_user_words",
+           "get_user_stats", "get_user_words_count", "update_user_stats")
+
+
+def zipf(n: int, exponent: float = ZIPF_EXPONENT) -> Callable[[random.Random], int]:
+    """Ранг 0..n-1 с вероятностью ~ 1/(ранг+1)^exponent"""
+    cumulative = list(itertools.accumulate(1 / (rank ** exponent) for rank in range(1, n + 1)))
+    total = cumulative[-1]
+    return lambda rng: bisect.bisect_left(cumulative, rng.random() * total)
+
+
+def dictionary_sizes(users: int, mean: int, rng: random.Random) -> List[int]:
+    """Размеры словарей: Парето с alpha=1.5 (среднее 3), отмасштабированное до mean"""
+    return [min(MAX_WORDS_PER_USER, max(1, int(rng.paretovariate(1.5) * mean / 3)))
+            for _ in range(users)]
+
+
+def generate(db_path: str, users: int, words_per_user: int, seed: int) -> Dict:
+    """Наполняет пустую базу со схемой приложения; возвращает число строк по таблицам"""
+    asyncio.run(Database(db_path).init())
+    rng = random.Random(seed)
+    popular = zipf(VOCABULARY)
+    sizes = dictionary_sizes(users, words_per_user, rng)
+
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.execute("PRAGMA cache_size=-262144")
+    conn.executemany(
+        "INSERT INTO users (id, telegram_id, username, first_name) VALUES (?, ?, ?, ?)",
+        ((i, TELEGRAM_ID_BASE + i, f"user{i}", f"User {i}") for i in range(1, users + 1)),
+    )
+    conn.executemany(
+        "INSERT INTO user_stats (user_id, correct_answers, wrong_answers) VALUES (?, ?, ?)",
+        ((i, rng.randrange(200), rng.randrange(100)) for i in range(1, users + 1)),
+    )
+    conn.commit()
+
+    word_id = 0
+    words: List[tuple] = []
+    user_words: List[tuple] = []
+
+    def flush():
+        conn.executemany(
+            "INSERT INTO words (id, word, translation, transcription, examples, part_of_speech) "
+            "VALUES (?, ?, ?, ?, '[]', ?)", words)
+        conn.executemany(
+            "INSERT INTO user_words (user_id, word_id, mastered, seq, wrong_count) "
+            "VALUES (?, ?, ?, ?, ?)", user_words)
+        conn.commit()
+        words.clear()
+        user_words.clear()
+
+    for user_id, size in enumerate(sizes, 1):
+        for seq in range(1, size + 1):
+            word_id += 1
+            rank = popular(rng)
+            words.append((word_id, f"word{rank}", f"слово{rank}", f"wɜːd{rank}",
+                          ("n", "v", "j", "r")[rank % 4]))
+            wrong = rng.randrange(1, 4) if rng.random() < 0.1 else 0
+            user_words.append((user_id, word_id, rng.random() < 0.2, seq, wrong))
+        if len(user_words) >= BATCH:
+            flush()
+    flush()
+    conn.execute("ANALYZE")
+    conn.close()
+    return {"users": users, "user_words": word_id, "words": word_id}
+
+
+def count_rows(db_path: str) -> Dict:
+    conn = sqlite3.connect(db_path)
+    rows = {table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            for table in ("users", "user_words", "words")}
+    conn.close()
+    return rows
+
+
+class Workload:
+    """Аргументы вызовов: активность пользователей по Ципфу, как в боевом трафике"""
+
+    def __init__(self, db: Database, users: int, seed: int):
+        self.db = db
+        self.users = users
+        self.rng = random.Random(seed)
+        self.active = zipf(users)
+        # Горячие пользователи разбросаны по id, а не собраны в начале таблицы
+        self.shuffle = random.Random(seed + 1).randrange(1, users)
+        self.new_users = itertools.count(TELEGRAM_ID_BASE + users + 1)
+
+    def user_id(self) -> int:
+        return (self.active(self.rng) * 7919 + self.shuffle) % self.users + 1
+
+    def call(self, method: str):
+        user_id = self.user_id()
+        telegram_id = TELEGRAM_ID_BASE + user_id
+        if method == "get_or_create_user":
+            if self.rng.random() < NEW_USER_RATE:
+                telegram_id = next(self.new_users)
+            return self.db.get_or_create_user(telegram_id, f"user{telegram_id}", "User")
+        if method == "add_word_to_user":
+            rank = self.rng.randrange(VOCABULARY)
+            return self.db.add_word_to_user(user_id, {
+                "word": f"word{rank}", "translation": {"text": f"слово{rank}"},
+                "transcription": f"wɜːd{rank}", "partOfSpeechCode": "n",
+            })
+        if method == "get_user_words":
+            return self.db.get_user_words(telegram_id, limit=20)
+        if method == "get_user_stats":
+            return self.db.get_user_stats(user_id)
+        if method == "get_user_words_count":
+            return self.db.get_user_words_count(telegram_id)
+        if method == "update_user_stats":
+            correct = self.rng.random() < 0.7
+            return self.db.update_user_stats(user_id, int(correct), int(not correct))
+        raise ValueError(f"Неизвестный метод: {method}")
+
+
+async def measure(workload: Workload, method: str, ops: int, concurrency: int) -> Dict:
+    samples: List[float] = []
+
+    async def worker(count: int):
+        for _ in range(count):
+            started = time.perf_counter()
+            await workload.call(method)
+            samples.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    share, extra = divmod(ops, concurrency)
+    await asyncio.gather(*(worker(share + (i < extra)) for i in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    result = percentiles(samples)
+    result["ops_per_second"] = round(ops / elapsed, 1)
+    return result
+
+
+async def bench(db_path: str, users: int, args) -> Dict:
+    db = Database(db_path)
+    workload = Workload(db, users, args.seed)
+    await db.warm_up()
+    results = {}
+    for method in args.methods:
+        await measure(workload, method, min(50, args.ops), 1)  # прогрев страниц и соединений
+        results[method] = {
+            "alone": await measure(workload, method, args.ops, 1),
+            "concurrent": await measure(workload, method, args.ops, args.concurrency),
+        }
+        alone, concurrent = results[method]["alone"], results[method]["concurrent"]
+        print(f"  {method:<22}"
+              f"один: p50 {alone['p50_ms']:>7} p99 {alone['p99_ms']:>7} мс "
+              f"{alone['ops_per_second']:>8}/с   "
+              f"×{args.concurrency}: p50 {concurrent['p50_ms']:>7} p99 {concurrent['p99_ms']:>8} мс "
+              f"{concurrent['ops_per_second']:>8}/с")
+    return results
+
+
+def main(args):
+    users = max(1, int(USERS * args.scale)) if args.users is None else args.users
+    with tempfile.TemporaryDirectory() as directory:
+        db_path = args.db or os.path.join(directory, "bench.db")
+        generated = None
+        if os.path.exists(db_path):
+            rows = count_rows(db_path)
+            users = rows["users"]
+            print(f"🗄 база {db_path}: {rows}")
+        else:
+            print(f"🗄 генерирую {users} пользователей × ~{args.words_per_user} слов...")
+            started = time.perf_counter()
+            rows = generate(db_path, users, args.words_per_user, args.seed)
+            generated = round(time.perf_counter() - started, 1)
+            print(f"   готово за {generated} с: {rows}")
+
+        results = {
+            "config": {"ops": args.ops, "concurrency": args.concurrency, "seed": args.seed},
+            "rows": rows,
+            "db_size_mb": round(os.path.getsize(db_path) / 2 ** 20, 1),
+            "generate_seconds": generated,
+            "methods": asyncio.run(bench(db_path, users, args)),
+        }
+    if args.out:
+        save_json(results, args.out)
+        print(f"\nРезультат сохранён в {args.out}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", type=float, default=1.0,
+                        help="доля от 1M пользователей (0.01 — 10k)")
+    parser.add_argument("--users", type=int, help="число пользователей (вместо --scale)")
+    parser.add_argument("--words-per-user", type=int, default=WORDS_PER_USER)
+    parser.add_argument("--ops", type=int, default=2000, help="вызовов на метод и режим")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--methods", nargs="+", default=list(METHODS), choices=METHODS)
+    parser.add_argument("--db", help="файл базы: создаётся, если нет, иначе переиспользуется")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--out", help="сохранить JSON-результат в файл")
+    main(parser.parse_args())
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Замер подбора «трудных» вариантов квиза (app.distractors).
+
+Строит матрицу пользователя на N синтетических переводов и меряет
+время одного подбора и объём памяти матрицы, а также самую долгую
+остановку цикла событий, пока DistractorIndex загружает такую матрицу
+(первый квиз пользователя и каждый после вытеснения из LRU).
+
+Запуск: python -m bench.distractors [--words 10000] [--rounds 2000]
+"""
+
+import argparse
+import asyncio
+import random
+import time
+
+from app.distractors import POS_CODES, DistractorIndex, UserMatrix, vectorize
+
+SYLLABLES = ["ба", "ве", "го", "ду", "же", "зи", "ка", "ло", "ми", "но",
+             "пу", "ра", "се", "ти", "фу", "ха", "це", "ча", "ши", "ю"]
+
+
+def fake_translation(rng: random.Random) -> str:
+    return "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 5)))
+
+
+class FakeDatabase:
+    """Переводы пользователя без БД: меряется только построение матрицы"""
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    def add_word_listener(self, callback):
+        pass
+
+    async def get_user_translations(self, user_id, limit):
+        return self.rows[:limit]
+
+
+async def loop_stall(rows, max_rows: int) -> float:
+    """Самый долгий промежуток между тиками цикла во время загрузки матрицы, с"""
+    index = DistractorIndex(FakeDatabase(rows), max_rows=max_rows)
+    load = asyncio.create_task(index.pick(1, rows[0]['translation'], None))
+    worst, last = 0.0, time.perf_counter()
+    while not load.done():
+        await asyncio.sleep(0)
+        now = time.perf_counter()
+        worst, last = max(worst, now - last), now
+    await load
+    return worst
+
+
+def main(args):
+    rng = random.Random(42)
+    translations = [fake_translation(rng) for _ in range(args.words)]
+
+    start = time.perf_counter()
+    matrix = UserMatrix(max_rows=args.words)
+    for translation in translations:
+        matrix.add(translation, rng.choice(POS_CODES))
+    build = time.perf_counter() - start
+    print(f"📦 {matrix.size} слов: построение {build * 1000:.0f} мс, "
+          f"память {matrix.nbytes / 1024 / 1024:.1f} МБ")
+
+    rows = [{"translation": translation, "part_of_speech": rng.choice(POS_CODES)}
+            for translation in translations]
+    stall = asyncio.run(loop_stall(rows, args.words))
+    print(f"🔄 загрузка матрицы в DistractorIndex: цикл событий стоит до {stall * 1000:.0f} мс")
+
+    queries = [(rng.choice(translations), rng.choice(POS_CODES)) for _ in range(args.rounds)]
+    timings = []
+    for translation, pos in queries:
+        begin = time.perf_counter()
+        matrix.nearest(vectorize(translation, pos), 6, exclude=[translation])
+        timings.append(time.perf_counter() - begin)
+    timings.sort()
+    print(f"⏱ подбор: среднее {sum(timings) / len(timings) * 1e6:.0f} мкс, "
+          f"p50 {timings[len(timings) // 2] * 1e6:.0f} мкс, "
+          f"p99 {timings[int(len(timings) * 0.99)] * 1e6:.0f} мкс")
+
+    sample = queries[0][0]
+    print(f"🎯 пример: «{sample}» → {matrix.nearest(vectorize(sample, None), 3, [sample])}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--words", type=int, default=10000)
+    parser.add_argument("--rounds", type=int, default=2000)
+    main(parser.parse_args())
@@ -0,0 +1,239 @@
+"""
+Локальные заменители внешних сервисов для нагрузочных прогонов.
+
+- FakeTelegramSession — сессия aiogram без сети: отвечает на методы
+  Bot API так, как ответил бы Telegram (ответ проходит обычную
+  валидацию aiogram), и запоминает последние сообщения в каждом чате,
+  чтобы виртуальные пользователи могли нажимать кнопки;
+- SkyengStandIn — HTTP-сервер с API словаря Skyeng (/words/search,
+  /meanings) с настраиваемой задержкой, долей ошибок и размером ответов.
+"""
+
+import asyncio
+import html
+import itertools
+import json
+import random
+import re
+import time
+from collections import Counter, defaultdict, deque
+from typing import Any, AsyncGenerator, Callable, Deque, Dict, Optional, Tuple
+
+from aiogram import Bot
+from aiogram.client.session.base import BaseSession
+from aiogram.methods import (
+    GetMe, SendDocument, SendMessage, SendPhoto, SendVoice, TelegramMethod
+)
+from aiohttp import web
+
+BOT_USER = {"id": 42, "is_bot": True, "first_name": "Lingua", "username": "lingua_bench_bot"}
+# Сколько последних сообщений бота храним на чат
+CHAT_HISTORY = 8
+
+_TAG = re.compile(r"<[^>]+>")
+
+
+def strip_html(text: Optional[str]) -> Optional[str]:
+    """Telegram возвращает текст без разметки (она уходит в entities)"""
+    return html.unescape(_TAG.sub("", text)) if text else text
+
+
+class FakeTelegramSession(BaseSession):
+    """
+    Сессия Bot API без сети. latency — задержка ответа в с,
+    flood_rate — доля ответов 429 (retry_after=1), как при превышении лимитов.
+    """
+
+    def __init__(self, latency: float = 0.0, flood_rate: float = 0.0, seed: int = 0):
+        super().__init__()
+        self.latency = latency
+        self.flood_rate = flood_rate
+        self.calls: Counter = Counter()
+        self.floods = 0
+        # chat_id -> последние отправленные сообщения (как их вернул бы Telegram)
+        self.chats: Dict[int, Deque[Dict]] = defaultdict(lambda: deque(maxlen=CHAT_HISTORY))
+        self._message_ids = itertools.count(1)
+        self._random = random.Random(seed)
+
+    async def make_request(self, bot: Bot, method: TelegramMethod, timeout: Optional[int] = None):
+        self.calls[type(method).__name__] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.flood_rate and self._random.random() < self.flood_rate:
+            self.floods += 1
+            content = {"ok": False, "error_code": 429, "description": "Too Many Requests",
+                       "parameters": {"retry_after": 1}}
+            return self.check_response(bot, method, 429, json.dumps(content)).result
+        result = self._result(method)
+        response = self.check_response(bot, method, 200, json.dumps({"ok": True, "result": result}))
+        return response.result
+
+    def _result(self, method: TelegramMethod) -> Any:
+        if isinstance(method, GetMe):
+            return BOT_USER
+        if isinstance(method, (SendMessage, SendPhoto, SendVoice, SendDocument)):
+            message = self._message(method)
+            self.chats[message["chat"]["id"]].append(message)
+            return message
+        return True
+
+    def _message(self, method: TelegramMethod) -> Dict:
+        message = {
+            "message_id": next(self._message_ids),
+            "date": int(time.time()),
+            "chat": {"id": method.chat_id, "type": "private"},
+            "from": BOT_USER,
+        }
+        if isinstance(method, SendMessage):
+            message["text"] = strip_html(method.text)
+        else:
+            caption = getattr(method, "caption", None)
+            if caption:
+                message["caption"] = strip_html(caption)
+            file = {"file_id": "bench", "file_unique_id": "bench"}
+            if isinstance(method, SendPhoto):
+                message["photo"] = [dict(file, width=320, height=240)]
+            elif isinstance(method, SendVoice):
+                message["voice"] = dict(file, duration=1)
+            else:
+                message["document"] = file
+        markup = getattr(method, "reply_markup", None)
+        if markup is not None:
+            message["reply_markup"] = markup.model_dump(mode="json", exclude_none=True)
+        return message
+
+    def last_message(self, chat_id: int) -> Optional[Dict]:
+        history = self.chats.get(chat_id)
+        return history[-1] if history else None
+
+    async def stream_content(self, url: str, headers: Optional[Dict[str, Any]] = None,
+                             timeout: int = 30, chunk_size: int = 65536,
+                             raise_for_status: bool = True) -> AsyncGenerator[bytes, None]:
+        yield b""
+
+    async def close(self):
+        pass
+
+
+def make_entry(index: int, meanings: int) -> Dict:
+    """Словарная статья в формате /words/search: слово word<index> и его значения"""
+    word = f"word{index}"
+    return {
+        "id": index,
+        "text": word,
+        "meanings": [
+            {
+                "id": index * 100 + k,
+                "partOfSpeechCode": ("n", "v", "j", "r")[(index + k) % 4],
+                "translation": {"text": f"слово{index}-{k}", "note": None},
+                "previewUrl": f"//cdn.example/{word}.jpg",
+                "imageUrl": f"//cdn.example/{word}.jpg" if index % 10 == 0 else None,
+                "transcription": f"wɜːd{index}",
+                "soundUrl": f"//cdn.example/{word}.mp3",
+            }
+            for k in range(meanings)
+        ],
+    }
+
+
+def make_meaning(meaning_id: int, examples: int) -> Dict:
+    """Подробное значение в формате /meanings"""
+    index, k = divmod(meaning_id, 100)
+    return {
+        "id": meaning_id,
+        "wordId": index,
+        "text": f"word{index}",
+        "partOfSpeechCode": ("n", "v", "j", "r")[(index + k) % 4],
+        "translation": {"text": f"слово{index}-{k}", "note": None},
+        "transcription": f"wɜːd{index}",
+        "soundUrl": f"//cdn.example/word{index}.mp3",
+        "examples": [{"text": f"Example {i} with word{index}.",
+                      "soundUrl": f"//cdn.example/ex{meaning_id}-{i}.mp3"}
+                     for i in range(examples)],
+        "meaningsWithSimilarTranslation": [
+            {"meaningId": meaning_id + 1, "translation": {"text": f"слово{index}-{k + 1}"}}
+        ],
+    }
+
+
+class SkyengStandIn:
+    """
+    Заменитель Skyeng API. Знает слова word0..word<vocabulary-1>
+    (остальное — пустой ответ, как для неизвестного слова).
+    latency ± jitter — задержка ответа в с, error_rate — доля ответов 503.
+    recorded — записанные ответы {ключ кеша SkyengClient: (задержка в с, ответ)}:
+    их сервер отдаёт вместо синтетических (воспроизведение журнала);
+    при latency=None — с записанной задержкой.
+    """
+
+    def __init__(self, latency: Optional[float] = 0.02, jitter: float = 0.01,
+                 error_rate: float = 0.0, vocabulary: int = 5000, meanings: int = 3,
+                 examples: int = 3, seed: int = 0,
+                 recorded: Optional[Dict[str, Tuple[float, Any]]] = None):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.vocabulary = vocabulary
+        self.meanings = meanings
+        self.examples = examples
+        self.recorded = recorded or {}
+        self.requests: Counter = Counter()
+        self.replayed = 0
+        self.errors = 0
+        self._random = random.Random(seed)
+        self._runner: Optional[web.AppRunner] = None
+        self.app = web.Application()
+        self.app.router.add_get("/words/search", self.on_search)
+        self.app.router.add_get("/meanings", self.on_meanings)
+
+    async def _respond(self, endpoint: str, key: str, synthetic: Callable[[], Any]) -> web.Response:
+        self.requests[endpoint] += 1
+        recorded = self.recorded.get(key)
+        if recorded is not None:
+            self.replayed += 1
+            payload = recorded[1]
+        else:
+            payload = synthetic()
+        if self.latency is None:
+            delay = recorded[0] if recorded is not None else 0.0
+        else:
+            delay = self.latency + self._random.uniform(-self.jitter, self.jitter)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if self.error_rate and self._random.random() < self.error_rate:
+            self.errors += 1
+            return web.json_response({"error": "unavailable"}, status=503)
+        return web.json_response(payload)
+
+    async def on_search(self, request: web.Request) -> web.Response:
+        query = request.query.get("search", "").strip().lower()
+
+        def synthetic():
+            match = re.fullmatch(r"word(\d+)", query)
+            if match and int(match.group(1)) < self.vocabulary:
+                return [make_entry(int(match.group(1)), self.meanings)]
+            return []
+
+        return await self._respond("search", f"search:{query}", synthetic)
+
+    async def on_meanings(self, request: web.Request) -> web.Response:
+        raw = request.query.get("ids", "")
+        ids = [int(i) for i in raw.split(",") if i.isdigit()]
+        return await self._respond("meanings", f"meanings:{raw}",
+                                   lambda: [make_meaning(i, self.examples) for i in ids])
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """Запустить сервер; возвращает базовый URL (порт 0 — любой свободный)"""
+        self._runner = web.AppRunner(self.app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        return f"http://{host}:{port}"
+
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
+
+    def stats(self) -> Dict:
+        return {"requests": dict(self.requests), "replayed": self.replayed, "errors": self.errors}
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Рейтинг /top_learners (app.leaderboard) на большой таблице user_stats.
+
+База — только users и user_stats (по умолчанию 1M пользователей); число
+правильных ответов распределено с тяжёлым хвостом: у большинства десятки,
+у единиц — тысячи. Замеры:
+- сборка при запуске: чтение гистограммы по индексу и построение дерева;
+- место пользователя: Leaderboard.rank против запроса
+  COUNT(*) WHERE correct_answers > ? к той же базе;
+- применение порции изменений, как при сбросе ответов квиза;
+- периодическая сверка с БД и топ-10 для /top_learners.
+--out пишет JSON для сравнения между коммитами.
+
+Запуск: python -m bench.leaderboard [--users 1000000] [--out leaderboard.json]
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+import aiosqlite
+
+from app.database import Database
+from app.leaderboard import Leaderboard
+from bench.report import percentiles, save_json
+
+
+def generate(db_path: str, users: int, seed: int):
+    asyncio.run(Database(db_path).init())
+    rng = random.Random(seed)
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.executemany(
+        "INSERT INTO users (id, telegram_id, first_name) VALUES (?, ?, ?)",
+        ((i, 10 ** 9 + i, f"User {i}") for i in range(1, users + 1)),
+    )
+    conn.executemany(
+        "INSERT INTO user_stats (user_id, correct_answers, wrong_answers) VALUES (?, ?, ?)",
+        ((i, int(rng.paretovariate(1.2)) - 1, rng.randrange(50)) for i in range(1, users + 1)),
+    )
+    conn.commit()
+    conn.execute("ANALYZE")
+    conn.close()
+
+
+async def timed(call, repeat: int):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await call()
+        samples.append(time.perf_counter() - started)
+    return percentiles(samples)
+
+
+async def bench(db_path: str, args) -> dict:
+    db = Database(db_path)
+    board = Leaderboard()
+    rng = random.Random(args.seed)
+
+    started = time.perf_counter()
+    histogram = await db.score_histogram()
+    read = time.perf_counter() - started
+    started = time.perf_counter()
+    board.build(histogram)
+    built = time.perf_counter() - started
+
+    # Места спрашивают обычные пользователи: очки — с весом числа набравших
+    scores = [score for score, _ in histogram]
+    weights = [users for _, users in histogram]
+    samples = rng.choices(scores, weights, k=args.ranks)
+    started = time.perf_counter()
+    for score in samples:
+        board.rank(score)
+    rank_us = (time.perf_counter() - started) / len(samples) * 1e6
+
+    async with aiosqlite.connect(db_path) as conn:
+        async def sql_rank():
+            cursor = await conn.execute(
+                "SELECT COUNT(*) FROM user_stats WHERE correct_answers > ?",
+                (rng.choice(samples),))
+            await cursor.fetchone()
+        sql = await timed(sql_rank, 50)
+
+    changes = [(i, score, score + 1) for i, score in enumerate(samples[: args.batch])]
+    started = time.perf_counter()
+    board.apply(changes)
+    apply_ms = (time.perf_counter() - started) * 1000
+    board.build(histogram)
+
+    return {
+        "users": board.total,
+        "distinct_scores": len(histogram),
+        "max_score": max(scores, default=0),
+        "histogram_read_ms": round(read * 1000, 1),
+        "build_ms": round(built * 1000, 1),
+        "rank_us": round(rank_us, 2),
+        "sql_rank": sql,
+        f"apply_{args.batch}_ms": round(apply_ms, 2),
+        "check": await timed(lambda: board.check(db), 5),
+        "top_learners": await timed(lambda: db.top_learners(10), 50),
+    }
+
+
+def main(args):
+    with tempfile.TemporaryDirectory() as directory:
+        db_path = os.path.join(directory, "bench.db")
+        print(f"🗄 генерирую {args.users} пользователей...")
+        generate(db_path, args.users, args.seed)
+        results = asyncio.run(bench(db_path, args))
+
+    for name, value in results.items():
+        if isinstance(value, dict):
+            print(f"  {name:<22}p50 {value['p50_ms']:>8} p99 {value['p99_ms']:>8} мс")
+        else:
+            print(f"  {name:<22}{value:>10}")
+    if args.out:
+        save_json({"config": vars(args), **results}, args.out)
+        print(f"\nРезультат сохранён в {args.out}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=1_000_000)
+    parser.add_argument("--ranks", type=int, default=100_000, help="запросов места")
+    parser.add_argument("--batch", type=int, default=1000, help="изменений в порции сброса")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--out", help="сохранить JSON-результат в файл")
+    main(parser.parse_args())
@@ -0,0 +1,349 @@
+#!/usr/bin/env python3
+"""
+Нагрузочный прогон бота целиком.
+
+Настоящий dp из app.main со всеми middleware (антифлуд, трассировка,
+метрики, учёт апдейтов) работает против фейкового Telegram Bot API
+(bench.fakes.FakeTelegramSession) и локального заменителя Skyeng
+(bench.fakes.SkyengStandIn) на временной базе. Апдейты проходят тот же
+путь, что при вебхуке: сырой JSON → валидация aiogram → хендлеры.
+
+Виртуальные пользователи выполняют сценарии:
+- search — пишут слово (популярность слов по Ципфу), иногда открывают
+  примеры и озвучку на карточке;
+- quiz — квиз с карточки или /quiz, несколько раундов с ответами;
+- browse — /stats, /dictionary, озвучка случайного слова.
+Между шагами — пауза на раздумье (экспоненциальная, --think-ms).
+
+Результат — пропускная способность и p50/p95/p99 по хендлерам и шагам
+сценариев; --out сохраняет JSON с отсортированными ключами для сравнения
+между коммитами. Лимитер исходящих Telegram по умолчанию отключён
+(иначе всё упирается в 25 сообщений/с), включается --telegram-limits.
+
+Запуск: python -m bench.load [--users 500] [--actions 5] [--think-ms 500]
+                             [--skyeng-latency-ms 30] [--skyeng-error-rate 0]
+                             [--tg-latency-ms 5] [--out results.json]
+"""
+
+import argparse
+import asyncio
+import bisect
+import itertools
+import json
+import logging
+import os
+import random
+import tempfile
+import time
+from collections import defaultdict
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from aiogram import BaseMiddleware
+
+from bench.fakes import FakeTelegramSession, SkyengStandIn
+from bench.report import percentiles, save_json
+
+SCENARIOS = {"search": 0.6, "quiz": 0.3, "browse": 0.1}
+QUIZ_ROUNDS = 3
+CORRECT_ANSWER_RATE = 0.7
+ZIPF_EXPONENT = 1.1
+UNKNOWN_WORD_RATE = 0.05
+
+
+class HandlerTimer(BaseMiddleware):
+    """Inner-middleware прогона: точные длительности хендлеров (без корзин гистограммы)"""
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+
+    async def __call__(self, handler: Callable[[Any, Dict[str, Any]], Awaitable[Any]],
+                       event: Any, data: Dict[str, Any]) -> Any:
+        name = getattr(getattr(data.get("handler"), "callback", None), "__name__", "unknown")
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        finally:
+            self.samples[name].append(time.perf_counter() - started)
+
+
+class Harness:
+    """Общее для виртуальных пользователей: бот, фейковая сессия, учёт шагов"""
+
+    def __init__(self, bot, dp, session: FakeTelegramSession):
+        self.bot = bot
+        self.dp = dp
+        self.session = session
+        self.steps: Dict[str, List[float]] = defaultdict(list)
+        self.updates = 0
+        self.failures = 0
+        self._update_ids = itertools.count(1)
+        self._callback_ids = itertools.count(1)
+
+    @staticmethod
+    def user(user_id: int) -> Dict:
+        return {"id": user_id, "is_bot": False, "first_name": f"user{user_id}",
+                "username": f"user{user_id}", "language_code": "ru"}
+
+    async def feed(self, step: str, update: Dict):
+        update["update_id"] = next(self._update_ids)
+        self.updates += 1
+        started = time.perf_counter()
+        try:
+            await self.dp.feed_raw_update(self.bot, update)
+        except Exception:
+            self.failures += 1
+        self.steps[step].append(time.perf_counter() - started)
+
+    async def send_text(self, step: str, user_id: int, text: str) -> Optional[Dict]:
+        """Сообщение от пользователя; возвращает последнее сообщение бота в чате"""
+        await self.feed(step, {"message": {
+            "message_id": next(self._update_ids),
+            "date": int(time.time()),
+            "chat": {"id": user_id, "type": "private"},
+            "from": self.user(user_id),
+            "text": text,
+            **({"entities": [{"type": "bot_command", "offset": 0,
+                              "length": len(text.split()[0])}]}
+               if text.startswith("/") else {}),
+        }})
+        return self.session.last_message(user_id)
+
+    async def click(self, step: str, user_id: int, message: Dict, data: str) -> Optional[Dict]:
+        """Нажатие кнопки под сообщением бота"""
+        await self.feed(step, {"callback_query": {
+            "id": str(next(self._callback_ids)),
+            "from": self.user(user_id),
+            "chat_instance": str(user_id),
+            "message": message,
+            "data": data,
+        }})
+        return self.session.last_message(user_id)
+
+
+def buttons(message: Optional[Dict]) -> List[str]:
+    if not message:
+        return []
+    rows = (message.get("reply_markup") or {}).get("inline_keyboard", [])
+    return [button.get("callback_data") for row in rows for button in row]
+
+
+class VirtualUser:
+    def __init__(self, harness: Harness, user_id: int, rng: random.Random,
+                 words: Callable[[random.Random], str], think: float):
+        self.harness = harness
+        self.user_id = user_id
+        self.rng = rng
+        self.words = words
+        self.think = think
+        self.card: Optional[Dict] = None
+
+    async def pause(self):
+        if self.think:
+            await asyncio.sleep(self.rng.expovariate(1 / self.think))
+
+    async def run(self, actions: int, ramp: float):
+        await asyncio.sleep(self.rng.uniform(0, ramp))
+        await self.harness.send_text("start", self.user_id, "/start")
+        names, weights = zip(*SCENARIOS.items())
+        for _ in range(actions):
+            await self.pause()
+            await getattr(self, self.rng.choices(names, weights)[0])()
+
+    async def search(self):
+        reply = await self.harness.send_text("search", self.user_id, self.words(self.rng))
+        if "examples" not in buttons(reply):
+            return
+        self.card = reply
+        if self.rng.random() < 0.4:
+            await self.pause()
+            await self.harness.click("examples", self.user_id, reply, "examples")
+        if self.rng.random() < 0.2:
+            await self.pause()
+            await self.harness.click("speak", self.user_id, reply, "speak")
+
+    async def quiz(self):
+        if self.card is not None and self.rng.random() < 0.5:
+            question = await self.harness.click("quiz", self.user_id, self.card, "quiz")
+        else:
+            question = await self.harness.send_text("quiz", self.user_id, "/quiz")
+        for round_number in range(QUIZ_ROUNDS):
+            answers = [data for data in buttons(question) if data.startswith("quiz_answer_")]
+            if not answers:
+                return
+            await self.pause()
+            if self.rng.random() < CORRECT_ANSWER_RATE:
+                # quiz_answer_<вариант>_<верный>_<id>: верный — где номера совпадают
+                choice = next((d for d in answers if d.split("_")[2] == d.split("_")[3]),
+                              answers[0])
+            else:
+                choice = self.rng.choice(answers)
+            result = await self.harness.click("quiz_answer", self.user_id, question, choice)
+            if round_number == QUIZ_ROUNDS - 1 or "quiz_next" not in buttons(result):
+                return
+            await self.pause()
+            question = await self.harness.click("quiz_next", self.user_id, result, "quiz_next")
+
+    async def browse(self):
+        await self.harness.send_text("stats", self.user_id, "/stats")
+        await self.pause()
+        reply = await self.harness.send_text("dictionary", self.user_id, "/dictionary")
+        if "speak_random" in buttons(reply) and self.rng.random() < 0.5:
+            await self.pause()
+            await self.harness.click("speak_random", self.user_id, reply, "speak_random")
+
+
+def zipf_words(vocabulary: int, exponent: float = ZIPF_EXPONENT) -> Callable[[random.Random], str]:
+    """Выбор слова: word<ранг> с вероятностью ~ 1/ранг^exponent, изредка неизвестное"""
+    cumulative = list(itertools.accumulate(1 / (rank ** exponent)
+                                           for rank in range(1, vocabulary + 1)))
+    total = cumulative[-1]
+
+    def pick(rng: random.Random) -> str:
+        if rng.random() < UNKNOWN_WORD_RATE:
+            return f"unknown{rng.randrange(10 ** 6)}"
+        return f"word{bisect.bisect_left(cumulative, rng.random() * total)}"
+
+    return pick
+
+
+class BotUnderTest:
+    """
+    Бот из app.main против фейкового Telegram и заменителя Skyeng:
+    база и снимок кеша — по указанным путям, фазы запуска как в main(),
+    точные длительности хендлеров в timer.samples.
+    """
+
+    def __init__(self, standin: SkyengStandIn, session: FakeTelegramSession,
+                 telegram_limits: bool = False, throttling: bool = True):
+        self.standin = standin
+        self.session = session
+        self.telegram_limits = telegram_limits
+        self.throttling = throttling
+        self.timer = HandlerTimer()
+        self.timings: Dict[str, float] = {}
+        self._flusher: Optional[asyncio.Task] = None
+
+    async def start(self, db_path: str, cache_path: str):
+        # app.main читает BOT_TOKEN при импорте; токен фейковый — сеть не нужна
+        os.environ.setdefault("BOT_TOKEN", "123:bench")
+        from app import main as bot_app
+
+        self.app = bot_app
+        bot_app.skyeng.base_url = await self.standin.start()
+        bot_app.db.db_path = db_path
+        bot_app.SKYENG_CACHE_PATH = cache_path
+        self.bot = bot_app.create_bot(self.session)
+        if not self.telegram_limits:
+            self.bot.session.middleware.unregister(bot_app.outbound)
+        if not self.throttling:
+            bot_app.dp.message.outer_middleware.unregister(bot_app.throttling)
+            bot_app.dp.callback_query.outer_middleware.unregister(bot_app.throttling)
+        bot_app.dp.message.middleware(self.timer)
+        bot_app.dp.callback_query.middleware(self.timer)
+
+        self.timings = await bot_app.run_startup(bot_app.startup_phases())
+        await bot_app.distractors.warm_up()
+        self._flusher = asyncio.create_task(bot_app.db.run_flusher())
+
+    async def stop(self):
+        await self.app.db.flush_pending()
+        self._flusher.cancel()
+        await self.app.skyeng.aclose()
+        await self.app.db.close()
+        await self.standin.stop()
+
+    def handler_stats(self) -> Dict:
+        return {name: percentiles(samples) for name, samples in sorted(self.timer.samples.items())}
+
+
+async def run(args) -> Dict:
+    random.seed(args.seed)
+    standin = SkyengStandIn(
+        latency=args.skyeng_latency_ms / 1000, jitter=args.skyeng_latency_ms / 3000,
+        error_rate=args.skyeng_error_rate, vocabulary=args.vocabulary,
+        meanings=args.meanings, examples=args.examples, seed=args.seed,
+    )
+    session = FakeTelegramSession(latency=args.tg_latency_ms / 1000,
+                                  flood_rate=args.tg_flood_rate, seed=args.seed)
+    target = BotUnderTest(standin, session, args.telegram_limits)
+
+    with tempfile.TemporaryDirectory() as directory:
+        await target.start(os.path.join(directory, "bot.db"),
+                           os.path.join(directory, "skyeng_cache.json"))
+        harness = Harness(target.bot, target.app.dp, session)
+        words = zipf_words(args.vocabulary)
+        users = [VirtualUser(harness, 10_000 + i, random.Random(args.seed * 100_003 + i),
+                             words, args.think_ms / 1000)
+                 for i in range(args.users)]
+        started = time.perf_counter()
+        await asyncio.gather(*(user.run(args.actions, args.ramp) for user in users))
+        elapsed = time.perf_counter() - started
+        await target.stop()
+
+    return {
+        "config": {key: value for key, value in sorted(vars(args).items()) if key != "out"},
+        "startup_ms": target.timings["total"],
+        "seconds": round(elapsed, 2),
+        "updates": harness.updates,
+        "updates_per_second": round(harness.updates / elapsed, 1),
+        "failed_updates": harness.failures,
+        "throttled_updates": target.app.throttling.total_throttled,
+        "handlers": target.handler_stats(),
+        "steps": {name: percentiles(samples) for name, samples in sorted(harness.steps.items())},
+        "telegram_calls": dict(sorted(session.calls.items())),
+        "skyeng": standin.stats(),
+        "skyeng_cache": target.app.skyeng.cache_stats(),
+        "skyeng_breaker": target.app.skyeng.breaker.stats(),
+    }
+
+
+def print_table(title: str, rows: Dict[str, Dict]):
+    print(f"\n{title}")
+    print(f"  {'':<22}{'n':>7}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}  мс")
+    for name, row in rows.items():
+        if row["count"]:
+            print(f"  {name:<22}{row['count']:>7}{row['p50_ms']:>9}{row['p95_ms']:>9}"
+                  f"{row['p99_ms']:>9}{row['max_ms']:>9}")
+
+
+async def main(args):
+    logging.basicConfig(level=args.log_level)
+    print(f"👥 пользователей: {args.users}, сценариев на пользователя: {args.actions}, "
+          f"раздумье: {args.think_ms} мс, Skyeng: {args.skyeng_latency_ms} мс / "
+          f"ошибки {args.skyeng_error_rate:.0%}")
+    results = await run(args)
+    print(f"\nАпдейтов: {results['updates']} за {results['seconds']} с — "
+          f"{results['updates_per_second']} апдейтов/с; "
+          f"упало: {results['failed_updates']}, антифлуд: {results['throttled_updates']}")
+    print_table("Хендлеры", results["handlers"])
+    print_table("Шаги сценариев (апдейт целиком)", results["steps"])
+    print(f"\nSkyeng: {results['skyeng']}, кеш: {results['skyeng_cache']}")
+    print(f"Telegram: {results['telegram_calls']}")
+    if args.out:
+        save_json(results, args.out)
+        print(f"\nРезультат сохранён в {args.out}")
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, sort_keys=True))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--actions", type=int, default=5, help="сценариев на пользователя")
+    parser.add_argument("--think-ms", type=float, default=500, help="средняя пауза между шагами")
+    parser.add_argument("--ramp", type=float, default=2.0, help="разброс старта пользователей, с")
+    parser.add_argument("--vocabulary", type=int, default=5000)
+    parser.add_argument("--meanings", type=int, default=3, help="значений в статье Skyeng")
+    parser.add_argument("--examples", type=int, default=3, help="примеров в значении")
+    parser.add_argument("--skyeng-latency-ms", type=float, default=30)
+    parser.add_argument("--skyeng-error-rate", type=float, default=0.0)
+    parser.add_argument("--tg-latency-ms", type=float, default=5)
+    parser.add_argument("--tg-flood-rate", type=float, default=0.0, help="доля ответов 429")
+    parser.add_argument("--telegram-limits", action="store_true",
+                        help="оставить лимитер исходящих (25 сообщений/с)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--log-level", default="CRITICAL")
+    parser.add_argument("--out", help="сохранить JSON-результат в файл")
+    parser.add_argument("--json", action="store_true", help="вывести итог в JSON")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Накладные расходы инструментирования (app.metrics).
+
+Меряет:
+- Histogram.observe и Counter.inc сами по себе;
+- вызов корутины через timed() против прямого вызова;
+- апдейт через Dispatcher с HandlerMetrics и без него (пустой хендлер);
+- выдачу /metrics при заданном числе рядов.
+Результат — наносекунды на операцию; --json выводит итог одной строкой.
+
+Запуск: python -m bench.metrics [--ops 200000] [--updates 20000] [--series 50]
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+from aiogram import Bot, Dispatcher
+from aiogram.types import Update
+
+from app.metrics import HandlerMetrics, Registry, timed
+
+ROUNDS = 5
+
+
+def per_op_ns(started: float, ops: int) -> float:
+    return round((time.perf_counter() - started) / ops * 1e9, 1)
+
+
+def bench_primitives(ops: int) -> dict:
+    registry = Registry()
+    histogram = registry.histogram("h", "h", ("handler",))
+    counter = registry.counter("c", "c", ("handler",))
+
+    started = time.perf_counter()
+    for i in range(ops):
+        histogram.observe(0.003, "on_text")
+    observe = per_op_ns(started, ops)
+
+    started = time.perf_counter()
+    for i in range(ops):
+        counter.inc("on_text")
+    inc = per_op_ns(started, ops)
+
+    started = time.perf_counter()
+    for i in range(ops):
+        time.perf_counter()
+    clock = per_op_ns(started, ops)
+    return {"histogram_observe": observe, "counter_inc": inc, "perf_counter": clock}
+
+
+async def bench_timed(ops: int) -> dict:
+    histogram = Registry().histogram("db", "db", ("method",))
+
+    async def query():
+        return 1
+
+    wrapped = timed(query, "query", histogram)
+
+    started = time.perf_counter()
+    for _ in range(ops):
+        await query()
+    bare = per_op_ns(started, ops)
+
+    started = time.perf_counter()
+    for _ in range(ops):
+        await wrapped()
+    instrumented = per_op_ns(started, ops)
+    return {"coroutine_bare": bare, "coroutine_timed": instrumented,
+            "timed_overhead": round(instrumented - bare, 1)}
+
+
+async def bench_dispatcher(updates: int) -> dict:
+    bot = Bot("123:abc")
+    update = Update.model_validate({
+        "update_id": 1,
+        "message": {
+            "message_id": 1, "date": 0, "text": "hello",
+            "chat": {"id": 1, "type": "private"},
+            "from": {"id": 1, "is_bot": False, "first_name": "u"},
+        },
+    })
+
+    updates //= ROUNDS
+
+    async def feed(with_metrics: bool) -> float:
+        dp = Dispatcher()
+        if with_metrics:
+            dp.message.middleware(HandlerMetrics(Registry().histogram("h", "h", ("handler",)),
+                                                 Registry().counter("e", "e", ("handler",))))
+
+        @dp.message()
+        async def on_text(message):
+            return None
+
+        for _ in range(100):  # прогрев
+            await dp.feed_update(bot, update)
+        started = time.perf_counter()
+        for _ in range(updates):
+            await dp.feed_update(bot, update)
+        return per_op_ns(started, updates)
+
+    # Разница мала на фоне цены апдейта: чередуем прогоны и берём лучший
+    bare, instrumented = [], []
+    for _ in range(ROUNDS):
+        bare.append(await feed(False))
+        instrumented.append(await feed(True))
+    bare, instrumented = min(bare), min(instrumented)
+    await bot.session.close()
+    return {"update_bare": bare, "update_with_metrics": instrumented,
+            "middleware_overhead": round(instrumented - bare, 1)}
+
+
+def bench_render(series: int) -> dict:
+    registry = Registry()
+    histogram = registry.histogram("h", "h", ("handler",))
+    for i in range(series):
+        histogram.observe(0.01, f"handler_{i}")
+    rounds = 200
+    started = time.perf_counter()
+    for _ in range(rounds):
+        registry.render()
+    return {"render_us": round((time.perf_counter() - started) / rounds * 1e6, 1),
+            "render_bytes": len(registry.render())}
+
+
+async def main(args):
+    results = bench_primitives(args.ops)
+    results.update(await bench_timed(args.ops))
+    results.update(await bench_dispatcher(args.updates))
+    results.update(bench_render(args.series))
+    for key, value in results.items():
+        unit = "" if key.startswith("render") else " нс"
+        print(f"  {key}: {value}{unit}")
+    if args.json:
+        print(json.dumps(results))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--ops", type=int, default=200000)
+    parser.add_argument("--updates", type=int, default=20000)
+    parser.add_argument("--series", type=int, default=50)
+    parser.add_argument("--json", action="store_true", help="вывести итог в JSON")
+    asyncio.run(main(parser.parse_args()))
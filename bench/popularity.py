@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Подсчёт популярности слов (app.popularity): цена добавления и точность топа.
+
+Поток поисков — слова словаря --vocabulary с популярностью по Ципфу, как
+в bench.load. Для сравнения — точный подсчёт Counter по тому же потоку.
+Замеры: время WordPopularity.add на поиск, доля настоящего топа-N,
+попавшая в топ скетча, и завышение оценок топа относительно точных.
+--json выводит итог одной строкой.
+
+Запуск: python -m bench.popularity [--events 1000000] [--vocabulary 100000]
+"""
+
+import argparse
+import json
+import random
+import time
+from collections import Counter
+
+from app.popularity import TOP_K, WordPopularity
+from bench.db import zipf
+
+
+def main(args):
+    rng = random.Random(args.seed)
+    popular = zipf(args.vocabulary)
+    stream = [f"word{popular(rng)}" for _ in range(args.events)]
+
+    counter = WordPopularity()
+    started = time.perf_counter()
+    for word in stream:
+        counter.add(word)
+    elapsed = time.perf_counter() - started
+
+    exact = Counter(stream)
+    true_top = [word for word, _ in exact.most_common(args.top)]
+    found_top = {word for word, _ in counter.top(TOP_K)}
+    errors = [(counter.estimate(word) - exact[word]) / exact[word] for word in true_top]
+
+    results = {
+        "events": args.events,
+        "distinct_words": len(exact),
+        "add_us": round(elapsed / args.events * 1e6, 2),
+        f"top{args.top}_recall": round(sum(word in found_top for word in true_top) / args.top, 3),
+        f"top{args.top}_max_overestimate": round(max(errors), 4),
+        f"top{args.top}_mean_overestimate": round(sum(errors) / len(errors), 5),
+        "sketch_kb": counter.sketch.width * counter.sketch.depth * 4 // 1024,
+    }
+    if args.json:
+        print(json.dumps(results, sort_keys=True))
+        return
+    for name, value in results.items():
+        print(f"{name:<28}{value:>10}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=1_000_000)
+    parser.add_argument("--vocabulary", type=int, default=100_000)
+    parser.add_argument("--top", type=int, default=100, help="размер сравниваемого топа")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", action="store_true")
+    main(parser.parse_args())
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Планировщик напоминаний (app.reminders) на сотнях тысяч расписаний.
+
+База — как в bench.db (по умолчанию 200k пользователей × ~5 слов), у
+каждого пользователя включено напоминание. Время напоминаний: доля --peak
+приходится на одну минуту (все выбрали «20:00»), остальные разбросаны по
+суткам. Замеры:
+- простой — запрос ближайшего срабатывания, который планировщик делает
+  перед каждым сном;
+- выборка порции наступивших вместе со счётчиками слов и перенос порции;
+- разбор пика целиком через ReminderScheduler.fire_due с фейковым
+  Telegram без лимитов (темп лимитера не входит в замер) и память на это.
+--out пишет JSON для сравнения между коммитами.
+
+Запуск: python -m bench.reminders [--users 200000] [--words-per-user 5]
+                                  [--peak 0.3] [--out reminders.json]
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sqlite3
+import tempfile
+import time
+import tracemalloc
+
+from aiogram import Bot
+
+from app.database import Database
+from app.reminders import BATCH_SIZE, DAY, ReminderScheduler
+from app.sender import Pacer
+from bench.db import generate
+from bench.fakes import FakeTelegramSession
+from bench.report import percentiles, save_json
+
+PEAK_MINUTE = 20 * 60
+UTC_OFFSET = 180
+
+
+def schedule_all(db_path: str, users: int, peak: float, now: int, seed: int) -> int:
+    """Напоминание каждому; пиковая минута наступила, остальные — в ближайшие сутки"""
+    rng = random.Random(seed)
+    rows = []
+    due = 0
+    for user_id in range(1, users + 1):
+        if rng.random() < peak:
+            rows.append((user_id, PEAK_MINUTE, UTC_OFFSET, now))
+            due += 1
+        else:
+            rows.append((user_id, rng.randrange(24 * 60), UTC_OFFSET, now + rng.randrange(60, DAY)))
+    conn = sqlite3.connect(db_path)
+    conn.executemany("INSERT INTO reminders VALUES (?, ?, ?, ?)", rows)
+    conn.commit()
+    conn.close()
+    return due
+
+
+async def timed(call, repeat: int):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await call()
+        samples.append(time.perf_counter() - started)
+    return percentiles(samples)
+
+
+async def bench(db_path: str, now: int, due: int) -> dict:
+    db = Database(db_path)
+    results = {
+        "next_reminder_at": await timed(db.next_reminder_at, 200),
+        "due_reminders": await timed(lambda: db.due_reminders(now, BATCH_SIZE), 50),
+    }
+    rows = await db.due_reminders(now, BATCH_SIZE)
+    updates = [(row["next_at"], row["user_id"]) for row in rows]
+    results["reschedule_batch"] = await timed(lambda: db.reschedule_reminders(updates, []), 20)
+
+    session = FakeTelegramSession()
+    bot = Bot(token="123:bench", session=session)
+    scheduler = ReminderScheduler(
+        db, lambda row: ("⏰", {}) if row["words"] else None, rate=1e9
+    )
+    pacer = Pacer(1e9)
+    tracemalloc.start()
+    started = time.perf_counter()
+    batches = 0
+    while await scheduler.fire_due(bot, pacer, now):
+        batches += 1
+        # Фейковый Telegram хранит отправленное — в память планировщика не считаем
+        session.chats.clear()
+    elapsed = time.perf_counter() - started
+    peak_memory = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    await bot.session.close()
+
+    results["drain"] = {
+        "due": due,
+        "batches": batches,
+        "sent": scheduler.sent,
+        "seconds": round(elapsed, 2),
+        "per_second": round(scheduler.sent / elapsed),
+        "peak_memory_mb": round(peak_memory / 2 ** 20, 1),
+        "left_due": len(await db.due_reminders(now, BATCH_SIZE)),
+    }
+    return results
+
+
+def main(args):
+    with tempfile.TemporaryDirectory() as directory:
+        db_path = os.path.join(directory, "bench.db")
+        print(f"🗄 генерирую {args.users} пользователей × ~{args.words_per_user} слов...")
+        rows = generate(db_path, args.users, args.words_per_user, args.seed)
+        now = int(time.time())
+        due = schedule_all(db_path, args.users, args.peak, now, args.seed)
+        print(f"   {rows}, напоминаний: {args.users}, наступивших: {due}")
+        results = asyncio.run(bench(db_path, now, due))
+
+    for name in ("next_reminder_at", "due_reminders", "reschedule_batch"):
+        stats = results[name]
+        print(f"  {name:<20}p50 {stats['p50_ms']:>7} p99 {stats['p99_ms']:>7} мс")
+    drain = results["drain"]
+    print(f"  пик: {drain['sent']} напоминаний за {drain['seconds']} с "
+          f"({drain['per_second']}/с без лимитов Telegram), "
+          f"порций {drain['batches']}, память {drain['peak_memory_mb']} МБ, "
+          f"осталось {drain['left_due']}")
+    if args.out:
+        save_json({"config": vars(args), "rows": rows, **results}, args.out)
+        print(f"\nРезультат сохранён в {args.out}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=200_000)
+    parser.add_argument("--words-per-user", type=int, default=5)
+    parser.add_argument("--peak", type=float, default=0.3,
+                        help="доля напоминаний в одну и ту же минуту")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--out", help="сохранить JSON-результат в файл")
+    main(parser.parse_args())
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Рендер сообщений и клавиатур (app.ui).
+
+Меряет:
+- статические клавиатуры: сборка InlineKeyboardBuilder на каждый ответ
+  (как было) против готовых замороженных экземпляров;
+- варианты ответа квиза: InlineKeyboardBuilder против model_construct;
+- карточку и примеры: рендер на каждый запрос против кеша при
+  популярности значений по Ципфу (--meanings разных значений);
+- вопрос квиза.
+Результат — микросекунды на операцию и доля попаданий в кеш;
+--json выводит итог одной строкой.
+
+Запуск: python -m bench.render [--ops 50000] [--meanings 20000]
+"""
+
+import argparse
+import json
+import random
+import time
+
+from aiogram.utils.keyboard import InlineKeyboardBuilder
+
+from app.ui import keyboards, renderers
+from bench.db import zipf
+from bench.fakes import make_meaning
+
+OPTIONS = ["слово-1", "слово-2", "слово-3", "слово-4"]
+
+
+def per_op_us(started: float, ops: int) -> float:
+    return round((time.perf_counter() - started) / ops * 1e6, 2)
+
+
+def builder_search_card():
+    kb = InlineKeyboardBuilder()
+    kb.button(text="🔊 Произнести", callback_data="speak")
+    kb.button(text="📚 Примеры", callback_data="examples")
+    kb.button(text="🎯 Квиз", callback_data="quiz")
+    kb.adjust(2, 1)
+    return kb.as_markup()
+
+
+def builder_quiz_answers(options, correct, user_word_id):
+    kb = InlineKeyboardBuilder()
+    for i, option in enumerate(options):
+        kb.button(text=option, callback_data=f"quiz_answer_{i}_{correct}_{user_word_id}")
+    kb.adjust(1)
+    return kb.as_markup()
+
+
+def bench_keyboards(ops: int) -> dict:
+    started = time.perf_counter()
+    for _ in range(ops):
+        builder_search_card()
+    built = per_op_us(started, ops)
+
+    started = time.perf_counter()
+    for _ in range(ops):
+        keyboards.kb_search_card()
+    frozen = per_op_us(started, ops)
+
+    started = time.perf_counter()
+    for i in range(ops):
+        builder_quiz_answers(OPTIONS, i & 3, i)
+    answers_built = per_op_us(started, ops)
+
+    started = time.perf_counter()
+    for i in range(ops):
+        keyboards.kb_quiz_answers(OPTIONS, i & 3, i)
+    answers_constructed = per_op_us(started, ops)
+
+    # Оба варианта должны уходить в Telegram одинаковыми
+    assert (builder_quiz_answers(OPTIONS, 2, 7).model_dump(exclude_none=True)
+            == keyboards.kb_quiz_answers(OPTIONS, 2, 7).model_dump(exclude_none=True))
+    return {"search_card_builder_us": built, "search_card_frozen_us": frozen,
+            "quiz_answers_builder_us": answers_built,
+            "quiz_answers_construct_us": answers_constructed}
+
+
+def bench_cards(ops: int, meanings: int, seed: int) -> dict:
+    rng = random.Random(seed)
+    popular = zipf(meanings)
+    pool = {}
+    stream = []
+    for _ in range(ops):
+        meaning_id = popular(rng) * 100 + 1
+        if meaning_id not in pool:
+            pool[meaning_id] = make_meaning(meaning_id, examples=5)
+        stream.append(pool[meaning_id])
+
+    started = time.perf_counter()
+    for meaning in stream:
+        renderers._render_word_card(meaning)
+        renderers._render_examples(meaning)
+    uncached = per_op_us(started, ops)
+
+    renderers._cards.clear()
+    renderers._examples.clear()
+    before = renderers.render_cache_stats()["cards"]
+    started = time.perf_counter()
+    for meaning in stream:
+        renderers.render_word_card(meaning)
+        renderers.render_examples(meaning)
+    cached = per_op_us(started, ops)
+    after = renderers.render_cache_stats()["cards"]
+    hits = after["hits"] - before["hits"]
+    lookups = hits + after["misses"] - before["misses"]
+
+    started = time.perf_counter()
+    for i in range(ops):
+        renderers.render_quiz_question(stream[i]["text"], OPTIONS, i & 3)
+    question = per_op_us(started, ops)
+    return {"card_and_examples_uncached_us": uncached, "card_and_examples_cached_us": cached,
+            "card_cache_hit_rate": round(hits / lookups, 3) if lookups else 0.0,
+            "distinct_meanings": len(pool), "quiz_question_us": question}
+
+
+def main(args):
+    results = {**bench_keyboards(args.ops), **bench_cards(args.ops, args.meanings, args.seed)}
+    if args.json:
+        print(json.dumps(results, sort_keys=True))
+        return
+    for name, value in results.items():
+        print(f"{name:<32}{value:>10}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ops", type=int, default=50_000)
+    parser.add_argument("--meanings", type=int, default=20_000,
+                        help="разных значений в потоке запросов")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", action="store_true")
+    main(parser.parse_args())
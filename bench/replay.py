@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Воспроизведение записанного трафика (app.recorder) через диспетчер бота.
+
+Журнал пишет бот с RECORD_UPDATES_PATH: апдейты (id пользователей —
+хеши) и ответы Skyeng. Здесь апдейты идут в настоящий dp из app.main
+против фейкового Telegram Bot API, а заменитель Skyeng отдаёт
+записанные ответы (с записанной задержкой, если не задана
+--skyeng-latency-ms). Темп — исходный (--speed 1), ускоренный
+(--speed 10) или без пауз (--speed 0, не больше --concurrency апдейтов
+одновременно). При ускоренном темпе апдейты одного пользователя идут
+чаще, чем пропускает антифлуд, и отброшенные не доходят до хендлеров —
+поэтому антифлуд по умолчанию включён только при --speed 1
+(--throttling on/off — явно).
+
+Результат — задержки по хендлерам, пропускная способность и рост базы
+(строки по таблицам и размер файла); --out пишет JSON для сравнения
+двух сборок на одном журнале. --db — стартовая база (копируется,
+оригинал не меняется); без неё прогон идёт с пустой.
+
+Запуск: python -m bench.replay updates.jsonl [--speed 10] [--db data/bot_database.db]
+                               [--out replay.json]
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+from collections import Counter
+from typing import Any, Dict, List, Tuple
+
+from bench.fakes import BOT_USER, FakeTelegramSession, SkyengStandIn
+from bench.load import BotUnderTest, Harness, print_table
+from bench.report import save_json
+
+TABLES = ("users", "words", "user_words", "user_stats")
+
+
+def load_log(path: str) -> Tuple[List[Dict], Dict[str, Tuple[float, Any]]]:
+    """Апдейты в порядке записи и последние записанные ответы Skyeng по ключу"""
+    updates: List[Dict] = []
+    responses: Dict[str, Tuple[float, Any]] = {}
+    with open(path, encoding="utf-8") as f:
+        for number, line in enumerate(f, 1):
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # Недописанная последняя строка (бот остановлен посреди записи)
+                logging.warning(f"Строка {number} журнала повреждена, пропускаем")
+                continue
+            if "s" in record:
+                responses[record["s"]["key"]] = (record["s"]["ms"] / 1000, record["s"]["r"])
+            elif "m" in record or "c" in record:
+                updates.append(record)
+    updates.sort(key=lambda record: record["t"])
+    return updates, responses
+
+
+def db_growth(db_path: str) -> Dict:
+    if not os.path.exists(db_path):
+        return {"bytes": 0, **{table: 0 for table in TABLES}}
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    rows = {}
+    for table in TABLES:
+        try:
+            rows[table] = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+        except sqlite3.OperationalError:
+            rows[table] = 0
+    conn.close()
+    return {"bytes": os.path.getsize(db_path), **rows}
+
+
+class Replayer:
+    def __init__(self, harness: Harness):
+        self.harness = harness
+        self.kinds: Counter = Counter()
+        self.skipped = 0
+
+    async def feed(self, record: Dict):
+        if "m" in record:
+            message = record["m"]
+            if "text" not in message:
+                # Фото, стикеры и т.п.: в журнале только тип
+                self.skipped += 1
+                return
+            kind = "command" if message["text"].startswith("/") else "text"
+            self.kinds[kind] += 1
+            await self.harness.send_text(kind, message["u"], message["text"])
+        else:
+            callback = record["c"]
+            self.kinds["callback"] += 1
+            msg = callback.get("msg") or {}
+            message = {
+                "message_id": 1,
+                "date": int(record["t"]),
+                "chat": {"id": callback["u"], "type": "private"},
+                "from": BOT_USER,
+                "text": msg.get("text", ""),
+            }
+            if "markup" in msg:
+                message["reply_markup"] = msg["markup"]
+            await self.harness.click("callback", callback["u"], message, callback["data"] or "")
+
+    async def run(self, updates: List[Dict], speed: float, concurrency: int):
+        if not updates:
+            return
+        if speed <= 0:
+            # Без пауз, но апдейты одного пользователя — по порядку, как он их слал
+            slots = asyncio.Semaphore(concurrency)
+            tails: Dict[int, asyncio.Task] = {}
+
+            async def ordered(record, previous):
+                if previous is not None:
+                    await previous
+                async with slots:
+                    await self.feed(record)
+
+            tasks = []
+            for record in updates:
+                user_id = (record.get("m") or record.get("c"))["u"]
+                tasks.append(asyncio.create_task(ordered(record, tails.get(user_id))))
+                tails[user_id] = tasks[-1]
+            await asyncio.gather(*tasks)
+            return
+
+        # Исходный темп: апдейт уходит в момент (t - t0) / speed от начала
+        loop = asyncio.get_running_loop()
+        first, started = updates[0]["t"], loop.time()
+        tasks = []
+        for record in updates:
+            delay = started + (record["t"] - first) / speed - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(self.feed(record)))
+        await asyncio.gather(*tasks)
+
+
+async def run(args) -> Dict:
+    updates, responses = load_log(args.log)
+    latency = None if args.skyeng_latency_ms is None else args.skyeng_latency_ms / 1000
+    standin = SkyengStandIn(latency=latency, jitter=0.0, recorded=responses)
+    session = FakeTelegramSession(latency=args.tg_latency_ms / 1000)
+    throttling = args.speed == 1 if args.throttling == "auto" else args.throttling == "on"
+    target = BotUnderTest(standin, session, args.telegram_limits, throttling)
+
+    with tempfile.TemporaryDirectory() as directory:
+        db_path = os.path.join(directory, "bot.db")
+        if args.db:
+            shutil.copyfile(args.db, db_path)
+        before = db_growth(db_path)
+        await target.start(db_path, os.path.join(directory, "skyeng_cache.json"))
+        harness = Harness(target.bot, target.app.dp, session)
+        replayer = Replayer(harness)
+        print(f"▶️ апдейтов: {len(updates)}, ответов Skyeng: {len(responses)}, "
+              f"темп: {'без пауз' if args.speed <= 0 else f'×{args.speed}'}")
+        started = time.perf_counter()
+        await replayer.run(updates, args.speed, args.concurrency)
+        elapsed = time.perf_counter() - started
+        await target.stop()
+        after = db_growth(db_path)
+
+    return {
+        "config": {key: value for key, value in sorted(vars(args).items()) if key != "out"},
+        "seconds": round(elapsed, 2),
+        "updates": harness.updates,
+        "updates_per_second": round(harness.updates / elapsed, 1) if elapsed else 0.0,
+        "skipped_updates": replayer.skipped,
+        "failed_updates": harness.failures,
+        "throttled_updates": target.app.throttling.total_throttled,
+        "kinds": dict(sorted(replayer.kinds.items())),
+        "handlers": target.handler_stats(),
+        "db_growth": {key: after[key] - before[key] for key in after},
+        "db_after": after,
+        "skyeng": standin.stats(),
+        "skyeng_cache": target.app.skyeng.cache_stats(),
+        "telegram_calls": dict(sorted(session.calls.items())),
+    }
+
+
+async def main(args):
+    logging.basicConfig(level=args.log_level)
+    results = await run(args)
+    print(f"\nАпдейтов: {results['updates']} за {results['seconds']} с — "
+          f"{results['updates_per_second']} апдейтов/с; пропущено: {results['skipped_updates']}, "
+          f"упало: {results['failed_updates']}, антифлуд: {results['throttled_updates']}")
+    print_table("Хендлеры", results["handlers"])
+    print(f"\nРост базы: {results['db_growth']}")
+    print(f"Skyeng: {results['skyeng']}")
+    if args.out:
+        save_json(results, args.out)
+        print(f"\nРезультат сохранён в {args.out}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("log", help="журнал, записанный с RECORD_UPDATES_PATH")
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="ускорение относительно записи; 0 — без пауз")
+    parser.add_argument("--concurrency", type=int, default=64,
+                        help="апдейтов одновременно при --speed 0")
+    parser.add_argument("--db", help="стартовая база (копируется)")
+    parser.add_argument("--skyeng-latency-ms", type=float,
+                        help="задержка Skyeng вместо записанной")
+    parser.add_argument("--tg-latency-ms", type=float, default=5)
+    parser.add_argument("--telegram-limits", action="store_true",
+                        help="оставить лимитер исходящих (25 сообщений/с)")
+    parser.add_argument("--throttling", choices=("auto", "on", "off"), default="auto",
+                        help="антифлуд на пользователя; auto — только при --speed 1")
+    parser.add_argument("--log-level", default="CRITICAL")
+    parser.add_argument("--out", help="сохранить JSON-результат в файл")
+    asyncio.run(main(parser.parse_args()))
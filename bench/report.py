@@ -0,0 +1,30 @@
+"""Общее для отчётов бенчмарков: перцентили задержек и JSON для сравнения между коммитами"""
+
+import json
+from typing import Dict, List
+
+
+def percentiles(samples: List[float]) -> Dict:
+    """p50/p95/p99 (по рангу), среднее и максимум; samples в секундах, итог в мс"""
+    if not samples:
+        return {"count": 0}
+    ordered = sorted(samples)
+
+    def rank(q: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 2)
+
+    return {
+        "count": len(ordered),
+        "mean_ms": round(sum(ordered) / len(ordered) * 1000, 2),
+        "p50_ms": rank(0.50),
+        "p95_ms": rank(0.95),
+        "p99_ms": rank(0.99),
+        "max_ms": round(ordered[-1] * 1000, 2),
+    }
+
+
+def save_json(results: Dict, path: str):
+    """Отсортированные ключи и отступы: файлы удобно сравнивать diff-ом"""
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2, sort_keys=True)
+        f.write("\n")
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Проверка и замер выборки слов для квиза (Database.sample_user_words).
+
+- скорость выборки на словаре в 50k слов (id записей перемешаны между
+  пользователями, как в боевой базе);
+- статистическая проверка равномерности (критерий хи-квадрат);
+- проверка, что взвешенная выборка чаще даёт слова с ошибками.
+
+Запуск: python -m bench.sampling [--words 50000] [--draws 40000]
+"""
+
+import argparse
+import asyncio
+import math
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from collections import Counter
+
+from app.database import Database
+
+
+def chi2_critical(df: int, alpha_z: float = 3.09) -> float:
+    """Критическое значение хи-квадрат (приближение Уилсона–Хилферти), z=3.09 ≈ α=0.001"""
+    return df * (1 - 2 / (9 * df) + alpha_z * math.sqrt(2 / (9 * df))) ** 3
+
+
+def fill(db_path: str, user_id: int, n_words: int, noise_user_id: int):
+    """Заполняет словарь пользователя, перемежая записи с чужими"""
+    conn = sqlite3.connect(db_path)
+    conn.execute("INSERT OR IGNORE INTO users (id, telegram_id) VALUES (?, ?)",
+                 (user_id, user_id))
+    conn.execute("INSERT OR IGNORE INTO users (id, telegram_id) VALUES (?, ?)",
+                 (noise_user_id, noise_user_id))
+    seqs = {user_id: 0, noise_user_id: 0}
+    for i in range(n_words):
+        for owner in (user_id, noise_user_id):
+            cur = conn.execute(
+                "INSERT INTO words (word, translation) VALUES (?, ?)",
+                (f"word{owner}_{i}", f"перевод{owner}_{i}")
+            )
+            seqs[owner] += 1
+            conn.execute(
+                "INSERT INTO user_words (user_id, word_id, seq) VALUES (?, ?, ?)",
+                (owner, cur.lastrowid, seqs[owner])
+            )
+    conn.commit()
+    conn.close()
+
+
+async def bench_speed(db: Database, user_id: int, rounds: int = 1000):
+    timings = []
+    for weighted in (False, True):
+        timings.clear()
+        for _ in range(rounds):
+            start = time.perf_counter()
+            await db.sample_user_words(user_id, 4, weighted=weighted)
+            timings.append(time.perf_counter() - start)
+        timings.sort()
+        print(f"  weighted={weighted}: среднее {sum(timings) / len(timings) * 1000:.3f} мс, "
+              f"p99 {timings[int(len(timings) * 0.99)] * 1000:.3f} мс")
+
+
+async def check_uniform(db: Database, user_id: int, n_words: int, draws: int) -> bool:
+    ok = True
+    for k in (1, 3):
+        counts = Counter()
+        for _ in range(draws // k):
+            for row in await db.sample_user_words(user_id, k):
+                counts[row['seq']] += 1
+        total = sum(counts.values())
+        expected = total / n_words
+        chi2 = sum((counts.get(seq, 0) - expected) ** 2 / expected
+                   for seq in range(1, n_words + 1))
+        critical = chi2_critical(n_words - 1)
+        passed = chi2 < critical
+        ok = ok and passed
+        print(f"  k={k}: хи-квадрат {chi2:.1f} (критическое {critical:.1f}) "
+              f"{'✅' if passed else '❌'}")
+    return ok
+
+
+async def check_weighted(db_path: str, db: Database, user_id: int,
+                         n_words: int, draws: int) -> bool:
+    conn = sqlite3.connect(db_path)
+    conn.execute("UPDATE user_words SET wrong_count = 3 WHERE user_id = ? AND seq = 1",
+                  (user_id,))
+    conn.commit()
+    conn.close()
+
+    hits = 0
+    for _ in range(draws):
+        rows = await db.sample_user_words(user_id, 1, weighted=True)
+        hits += rows[0]['seq'] == 1
+    expected = 4 / (n_words + 3)
+    observed = hits / draws
+    sigma = math.sqrt(expected * (1 - expected) / draws)
+    passed = abs(observed - expected) < 4 * sigma
+    print(f"  слово с 3 ошибками: доля {observed:.4f}, ожидается {expected:.4f} "
+          f"{'✅' if passed else '❌'}")
+    return passed
+
+
+async def main(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        db = Database(db_path)
+        await db.init()
+
+        print(f"📦 Заполняем словарь на {args.words} слов...")
+        fill(db_path, 1, args.words, 2)
+        fill(db_path, 3, args.small, 4)
+
+        print("⏱ Скорость выборки 4 слов:")
+        await bench_speed(db, 1)
+
+        print(f"📊 Равномерность на словаре из {args.small} слов:")
+        ok = await check_uniform(db, 3, args.small, args.draws)
+
+        print("⚖️ Взвешенная выборка:")
+        ok = await check_weighted(db_path, db, 3, args.small, args.draws) and ok
+
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--words", type=int, default=50000)
+    parser.add_argument("--small", type=int, default=40)
+    parser.add_argument("--draws", type=int, default=20000)
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+/find (Database.search_user_words) на базе со многими пользователями.
+
+Индекс dictionary_fts общий на всех: терм «u<id>» отбирает слова владельца,
+а префиксный терм читает список совпадений по всей базе. Поэтому замер идёт
+на --users пользователях по --words-per-user слов (по умолчанию 10k × 100,
+1M записей): слова — псевдослова из bench.spelling с частотой по Ципфу,
+перевод — кириллическое псевдослово. Запросы — начала слов случайного
+пользователя длиной 1, 2, 3 буквы и слово целиком; задержка p50/p95/p99
+по одному запросу за раз. --db сохраняет базу для следующих прогонов.
+
+Запуск: python -m bench.search [--users 10000] [--words-per-user 100]
+                               [--queries 300] [--db data/search.db]
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+from app.database import Database
+from bench.db import BATCH, TELEGRAM_ID_BASE, zipf
+from bench.report import percentiles
+from bench.spelling import CYRILLIC, LATIN, pseudo_word
+
+VOCABULARY = 50_000
+PREFIXES = (1, 2, 3, None)  # None — слово целиком
+
+
+def generate(db_path: str, users: int, words_per_user: int, seed: int):
+    """Наполняет пустую базу со схемой приложения; индекс строят триггеры user_words"""
+    asyncio.run(Database(db_path).init())
+    rng = random.Random(seed)
+    vocabulary = [(pseudo_word(LATIN, rng), pseudo_word(CYRILLIC, rng)) for _ in range(VOCABULARY)]
+    popular = zipf(VOCABULARY)
+
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.execute("PRAGMA cache_size=-262144")
+    conn.executemany(
+        "INSERT INTO users (id, telegram_id, username, first_name) VALUES (?, ?, ?, ?)",
+        ((i, TELEGRAM_ID_BASE + i, f"user{i}", f"User {i}") for i in range(1, users + 1)),
+    )
+    word_id = 0
+    words, user_words = [], []
+    for user_id in range(1, users + 1):
+        for seq in range(1, words_per_user + 1):
+            word_id += 1
+            word, translation = vocabulary[popular(rng)]
+            words.append((word_id, word, translation))
+            user_words.append((user_id, word_id, seq))
+        if len(user_words) >= BATCH or user_id == users:
+            conn.executemany("INSERT INTO words (id, word, translation) VALUES (?, ?, ?)", words)
+            conn.executemany("INSERT INTO user_words (user_id, word_id, seq) VALUES (?, ?, ?)",
+                             user_words)
+            conn.commit()
+            words.clear()
+            user_words.clear()
+    conn.execute("ANALYZE")
+    conn.close()
+
+
+def sample_queries(db_path: str, users: int, count: int, rng: random.Random):
+    """(user_id, слово из его словаря) для count случайных пользователей"""
+    conn = sqlite3.connect(db_path)
+    queries = []
+    for _ in range(count):
+        user_id = rng.randint(1, users)
+        word, = conn.execute("""
+            SELECT w.word FROM user_words uw JOIN words w ON w.id = uw.word_id
+            WHERE uw.user_id = ? ORDER BY random() LIMIT 1
+        """, (user_id,)).fetchone()
+        queries.append((user_id, word))
+    conn.close()
+    return queries
+
+
+async def measure(db: Database, queries, prefix) -> dict:
+    latencies, found = [], 0
+    for user_id, word in queries:
+        text = word if prefix is None else word[:prefix]
+        start = time.perf_counter()
+        rows = await db.search_user_words(user_id, text, 11)
+        latencies.append(time.perf_counter() - start)
+        found += bool(rows)
+    return {"found": found / len(queries), **percentiles(latencies)}
+
+
+def main(args):
+    path = args.db or os.path.join(tempfile.mkdtemp(), "search.db")
+    if not os.path.exists(path):
+        started = time.perf_counter()
+        generate(path, args.users, args.words_per_user, args.seed)
+        print(f"база: {args.users} × {args.words_per_user} за {time.perf_counter() - started:.0f} с")
+    db = Database(path)
+    asyncio.run(db.init())
+    queries = sample_queries(path, args.users, args.queries, random.Random(args.seed))
+
+    print(f"{'запрос':>10} | {'найдено':>7} | {'p50':>8} | {'p95':>8} | {'p99':>8}")
+    for prefix in PREFIXES:
+        result = asyncio.run(measure(db, queries, prefix))
+        label = "слово" if prefix is None else f"{prefix} букв"
+        print(f"{label:>10} | {result['found']:>7.0%} | {result['p50_ms']:>6.1f}мс | "
+              f"{result['p95_ms']:>6.1f}мс | {result['p99_ms']:>6.1f}мс")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--words-per-user", type=int, default=100)
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--db")
+    main(parser.parse_args())
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Пропускная способность многопроцессного режима (app.sharding).
+
+Фронт раскладывает синтетические апдейты от множества пользователей
+по 1, 2, 4 и 8 воркерам; обработчик в воркере — рендер карточки слова
+плюс CPU-нагрузка (имитация парсинга апдейта и работы хендлера).
+Результат — апдейтов в секунду для каждого числа воркеров.
+Масштабирование упирается в число ядер машины (os.cpu_count()).
+
+Запуск: python -m bench.sharding [--updates 4000] [--users 500] [--work-ms 2]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+
+from app.sharding import ShardedRuntime
+
+# Читается в воркерах: фабрика обработчика импортируется по пути
+WORK_MS = float(os.getenv("BENCH_WORK_MS", "2"))
+
+
+async def cpu_handler():
+    """Обработчик для бенчмарка: только CPU, без сети и БД"""
+    from app.ui.renderers import render_word_card
+
+    async def handle(update):
+        deadline = time.perf_counter() + WORK_MS / 1000
+        message = update["message"]
+        while time.perf_counter() < deadline:
+            render_word_card({"word": message["text"], "translation": {"text": "перевод"}})
+
+    async def close():
+        pass
+
+    return handle, close
+
+
+def make_update(update_id: int, user_id: int) -> dict:
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": 0,
+            "chat": {"id": user_id, "type": "private"},
+            "from": {"id": user_id, "is_bot": False, "first_name": "u"},
+            "text": f"word{update_id % 97}",
+        },
+    }
+
+
+async def run(workers: int, updates: int, users: int) -> float:
+    runtime = ShardedRuntime(workers, handler="bench.sharding:cpu_handler")
+    runtime.start()
+    # Прогрев: ждём, пока все воркеры поднимутся и обработают по апдейту
+    for i in range(workers):
+        runtime.route(make_update(-1 - i, i))
+    while sum(s["processed"] for s in runtime.stats()) < workers:
+        await asyncio.sleep(0.05)
+
+    start = time.perf_counter()
+    for i in range(updates):
+        runtime.route(make_update(i, i % users))
+    while sum(s["processed"] for s in runtime.stats()) < updates + workers:
+        await asyncio.sleep(0.01)
+    elapsed = time.perf_counter() - start
+
+    await runtime.stop()
+    return updates / elapsed
+
+
+async def main(args):
+    os.environ["BENCH_WORK_MS"] = str(args.work_ms)
+    print(f"🖥 ядер: {os.cpu_count()}, апдейтов: {args.updates}, "
+          f"пользователей: {args.users}, работа на апдейт: {args.work_ms} мс")
+    results = {}
+    for workers in args.workers:
+        rate = await run(workers, args.updates, args.users)
+        results[workers] = round(rate, 1)
+        print(f"  воркеров {workers}: {rate:.0f} апд/с")
+    if args.json:
+        print(json.dumps({"updates_per_second": results}))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--updates", type=int, default=4000)
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--work-ms", type=float, default=2.0)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--json", action="store_true", help="вывести итог в JSON")
+    asyncio.run(main(parser.parse_args()))
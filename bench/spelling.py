@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Индекс опечаток (app.spelling): время сборки, память и скорость поиска.
+
+Слова — псевдослова из слогов «согласная + гласная (+ согласная)»
+(латиница и кириллица поровну) с частотой
+по Ципфу; запросы — известные слова с 1–2 случайными правками
+(удаление, вставка, замена, перестановка соседних букв).
+Память — по tracemalloc на отдельной сборке. new_word_flagged — доля
+новых правильных слов, которые проверка до запроса к API принимает за
+опечатки; выше MAX_NEW_WORD_FLAGGED — код выхода 1.
+--json выводит итог одной строкой.
+
+Запуск: python -m bench.spelling [--words 50000] [--queries 20000]
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+import tracemalloc
+
+from app.spelling import MAX_WORDS, SpellIndex
+from bench.db import zipf
+
+# Доля новых правильных слов, которые suspicious может принять за опечатку
+MAX_NEW_WORD_FLAGGED = 0.01
+
+# Буквы для слогов: согласная + гласная (+ согласная), как в настоящих словах
+LATIN = ("bcdfghklmnprstvw", "aeiou")
+CYRILLIC = ("бвгдзклмнпрстфхч", "аеиоуя")
+
+
+def pseudo_word(letters, rng: random.Random) -> str:
+    consonants, vowels = letters
+    syllables = []
+    for _ in range(rng.randint(1, 4)):
+        syllable = rng.choice(consonants) + rng.choice(vowels)
+        if rng.random() < 0.4:
+            syllable += rng.choice(consonants)
+        syllables.append(syllable)
+    return "".join(syllables)
+
+
+def vocabulary(size: int, rng: random.Random):
+    words = set()
+    while len(words) < size:
+        word = pseudo_word(LATIN if len(words) % 2 else CYRILLIC, rng)
+        if len(word) >= 3:
+            words.add(word)
+    return sorted(words)
+
+
+def typo(word: str, edits: int, rng: random.Random) -> str:
+    letters = "abcdefghijklmnopqrstuvwxyz" if word[0] < "а" else "абвгдежзиклмнопрстуфхцчшы"
+    for _ in range(edits):
+        i = rng.randrange(len(word))
+        kind = rng.randrange(4)
+        if kind == 0 and len(word) > 2:
+            word = word[:i] + word[i + 1:]
+        elif kind == 1:
+            word = word[:i] + rng.choice(letters) + word[i:]
+        elif kind == 2:
+            word = word[:i] + rng.choice(letters) + word[i + 1:]
+        elif i + 1 < len(word):
+            word = word[:i] + word[i + 1] + word[i] + word[i + 2:]
+    return word
+
+
+def main(args):
+    rng = random.Random(args.seed)
+    words = vocabulary(args.words, rng)
+    rng.shuffle(words)
+    counts = [(word, max(1, args.words // (rank + 1))) for rank, word in enumerate(words)]
+
+    started = time.perf_counter()
+    index = SpellIndex(max_words=args.words)
+    index.build(counts)
+    build = time.perf_counter() - started
+
+    # Память — отдельной сборкой: под tracemalloc сборка в разы медленнее
+    tracemalloc.start()
+    measured = SpellIndex(max_words=args.words)
+    measured.build(counts)
+    memory = tracemalloc.get_traced_memory()[0]
+    del measured
+    tracemalloc.stop()
+
+    popular = zipf(len(words))
+    queries = []
+    for _ in range(args.queries):
+        word = words[popular(rng)]
+        queries.append((word, typo(word, rng.choice((1, 1, 2)), rng)))
+
+    started = time.perf_counter()
+    hits = 0
+    for original, query in queries:
+        if original in index.lookup(query):
+            hits += 1
+    lookup = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for original, _ in queries:
+        index.suspicious(original)
+    known = time.perf_counter() - started
+
+    # Опечатки, исправленные ещё до запроса к API (остальные — после пустого ответа)
+    caught = sum(original in (index.suspicious(query) or ()) for original, query in queries)
+
+    # Новые правильные слова, которых нет в индексе: опечаткой до запроса
+    # к API не должно считаться почти ни одно
+    known_words = set(words)
+    fresh = [word for word in vocabulary(args.queries, rng) if word not in known_words]
+    flagged = sum(index.suspicious(word) is not None for word in fresh)
+
+    results = {
+        "words": len(index),
+        "keys": index.stats()["keys"],
+        "build_seconds": round(build, 2),
+        "memory_mb": round(memory / 2 ** 20, 1),
+        "lookup_us": round(lookup / len(queries) * 1e6, 1),
+        "known_word_check_us": round(known / len(queries) * 1e6, 2),
+        "suggestion_recall": round(hits / len(queries), 3),
+        "typo_caught_before_api": round(caught / len(queries), 3),
+        "new_word_flagged": round(flagged / max(1, len(fresh)), 3),
+    }
+    if args.json:
+        print(json.dumps(results, sort_keys=True))
+    else:
+        for name, value in results.items():
+            print(f"{name:<24}{value:>10}")
+    if results["new_word_flagged"] > MAX_NEW_WORD_FLAGGED:
+        print(f"❌ new_word_flagged выше {MAX_NEW_WORD_FLAGGED}: правильные новые слова "
+              f"ждут лишний ответ, прежде чем уйти в API")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--words", type=int, default=MAX_WORDS)
+    parser.add_argument("--queries", type=int, default=20_000)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", action="store_true")
+    sys.exit(main(parser.parse_args()))
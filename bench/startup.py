@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Холодный старт бота (app.startup).
+
+Каждый прогон — отдельный процесс: импорт app.main, затем фазы запуска
+(схема и прогрев БД, снимок кеша Skyeng) на заранее заполненной
+временной базе; фоновый прогрев (импорт numpy) замеряется отдельно.
+Для сравнения те же фазы гоняются последовательно (--sequential
+в дочернем процессе). На одном ядре без сети выигрыша от параллельности
+почти нет — он появляется с сетевыми прогревами (--network).
+Сетевые прогревы (Skyeng, Telegram getMe) включаются флагом --network.
+Результат — медиана по прогонам, в мс.
+
+Запуск: python -m bench.startup [--runs 5] [--users 1000] [--words 20]
+                                [--cache-entries 5000] [--network] [--json]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+NETWORK_PHASES = ("skyeng_warmup", "telegram_warmup")
+
+
+def prepare(directory: str, users: int, words: int, cache_entries: int):
+    """Временная база с пользователями и словарями плюс снимок кеша Skyeng"""
+    import sqlite3
+
+    from app.database import Database
+
+    db_path = os.path.join(directory, "bot.db")
+    asyncio.run(Database(db_path).init())
+    conn = sqlite3.connect(db_path)
+    conn.executemany("INSERT INTO users (telegram_id) VALUES (?)",
+                     [(i,) for i in range(users)])
+    conn.executemany("INSERT INTO words (word, translation) VALUES (?, ?)",
+                     [(f"word{i}", f"слово{i}") for i in range(words * 10)])
+    conn.executemany(
+        "INSERT INTO user_words (user_id, word_id, seq) VALUES (?, ?, ?)",
+        [(u + 1, (u * 7 + i) % (words * 10) + 1, i + 1)
+         for u in range(users) for i in range(words)],
+    )
+    conn.commit()
+    conn.close()
+
+    cache_path = os.path.join(directory, "skyeng_cache.json")
+    expires = time.time() + 3600
+    entry = [{"id": 1, "text": "word", "meanings": [
+        {"id": 1, "translation": {"text": "слово"}, "transcription": "wɜːd"}]}]
+    with open(cache_path, "w", encoding="utf-8") as f:
+        json.dump({f"search:word{i}": [expires, entry] for i in range(cache_entries)}, f)
+    return db_path, cache_path
+
+
+def child(args):
+    """Один холодный старт; печатает JSON с таймингами"""
+    os.environ.setdefault("BOT_TOKEN", "123:abc")
+    started = time.perf_counter()
+    from app import main as bot_main
+    from app.startup import run_startup, start_background
+    imported = time.perf_counter()
+
+    bot_main.db.db_path = args.db
+    bot_main.SKYENG_CACHE_PATH = args.cache
+    bot_main.create_bot()
+
+    async def run():
+        chains = [
+            [phase for phase in chain if args.network or phase[0] not in NETWORK_PHASES]
+            for chain in bot_main.startup_phases()
+        ]
+        chains = [chain for chain in chains if chain]
+        if args.sequential:
+            chains = [[phase for chain in chains for phase in chain]]
+        try:
+            timings = await run_startup(chains)
+            await asyncio.gather(*start_background(bot_main.background_phases(), timings))
+            return timings
+        finally:
+            await bot_main.skyeng.aclose()
+            await bot_main.bot.session.close()
+
+    timings = asyncio.run(run())
+    timings["import_app_main"] = round((imported - started) * 1000, 1)
+    timings["skyeng_cache_entries"] = bot_main.skyeng.cache_stats()["size"]
+    print(json.dumps(timings))
+
+
+def spawn(args, sequential: bool) -> dict:
+    command = [sys.executable, "-m", "bench.startup", "--child",
+               "--db", args.db, "--cache", args.cache]
+    if sequential:
+        command.append("--sequential")
+    if args.network:
+        command.append("--network")
+    started = time.perf_counter()
+    output = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    result["process"] = round((time.perf_counter() - started) * 1000, 1)
+    return result
+
+
+def median(runs: list) -> dict:
+    return {key: round(statistics.median(run[key] for run in runs), 1) for key in runs[0]}
+
+
+def main(args):
+    with tempfile.TemporaryDirectory() as directory:
+        args.db, args.cache = prepare(directory, args.users, args.words, args.cache_entries)
+        print(f"🗄 база: {args.users} пользователей × {args.words} слов, "
+              f"кеш Skyeng: {args.cache_entries} записей, прогонов: {args.runs}")
+        results = {}
+        for mode, sequential in (("parallel", False), ("sequential", True)):
+            results[mode] = median([spawn(args, sequential) for _ in range(args.runs)])
+            print(f"  {mode}: " + ", ".join(f"{k} {v}" for k, v in results[mode].items()))
+    if args.json:
+        print(json.dumps(results))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--words", type=int, default=20)
+    parser.add_argument("--cache-entries", type=int, default=5000)
+    parser.add_argument("--network", action="store_true",
+                        help="включить прогрев соединений со Skyeng и Telegram")
+    parser.add_argument("--json", action="store_true", help="вывести итог в JSON")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--sequential", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--db", help=argparse.SUPPRESS)
+    parser.add_argument("--cache", help=argparse.SUPPRESS)
+    parsed = parser.parse_args()
+    if parsed.child:
+        child(parsed)
+    else:
+        main(parsed)
@@ -4,7 +4,7 @@ echo "🚀 Запуск Wordy Dasha бота..."
 
 # Остановка существующего контейнера
 echo "🛑 Остановка существующего контейнера..."
-docker stop wordy-dasha 2>/dev/null || true
+docker stop -t 30 wordy-dasha 2>/dev/null || true
 docker rm wordy-dasha 2>/dev/null || true
 
 # Создание директорий для данных
@@ -1,80 +1,127 @@
 #!/usr/bin/env python3
 """
 Скрипт для проверки здоровья Lingua Bot
+
+Параллельно опрашивает:
+- /health и /ready запущенного бота (задержка event loop, SQLite,
+  предохранитель Skyeng, очереди);
+- Telegram Bot API (getMe);
+- Skyeng API.
+
+Запуск: python health_check.py [--url http://localhost:8080] [--local] [--timeout 10]
+  --local — только сам процесс бота, без внешних API
+Код выхода 1, если хоть одна проверка не прошла.
 """
 
-import requests
-import json
+import argparse
+import asyncio
 import os
+import sys
+import time
+
+import httpx
 from dotenv import load_dotenv
 
 # Загружаем переменные окружения
 load_dotenv()
 
-def check_bot_health():
-    """Проверяем здоровье бота"""
-    bot_token = os.getenv("BOT_TOKEN")
-    if not bot_token:
-        print("❌ BOT_TOKEN не найден в .env файле")
-        return False
-    
+HEALTH_URL = os.getenv("HEALTH_URL", f"http://localhost:{os.getenv('WEB_PORT', '8080')}")
+SKYENG_BASE_URL = os.getenv("SKYENG_BASE_URL", "https://dictionary.skyeng.ru/api/public/v1")
+
+
+async def timed(name, check):
+    """Запускает проверку и возвращает (имя, ok, строки отчёта, мс)"""
+    started = time.perf_counter()
     try:
-        # Проверяем API Telegram
-        url = f"https://api.telegram.org/bot{bot_token}/getMe"
-        response = requests.get(url, timeout=10)
-        
-        if response.status_code == 200:
-            data = response.json()
-            if data.get("ok"):
-                bot_info = data.get("result", {})
-                print(f"✅ Бот активен: @{bot_info.get('username')}")
-                print(f"   Имя: {bot_info.get('first_name')}")
-                print(f"   ID: {bot_info.get('id')}")
-                return True
-            else:
-                print(f"❌ Ошибка API: {data.get('description')}")
-                return False
-        else:
-            print(f"❌ HTTP ошибка: {response.status_code}")
-            return False
-            
-    except requests.exceptions.RequestException as e:
-        print(f"❌ Ошибка сети: {e}")
-        return False
+        ok, lines = await check
+    except httpx.HTTPError as e:
+        ok, lines = False, [f"Ошибка сети: {e!r}"]
     except Exception as e:
-        print(f"❌ Неожиданная ошибка: {e}")
-        return False
+        ok, lines = False, [f"Неожиданная ошибка: {e!r}"]
+    return name, ok, lines, (time.perf_counter() - started) * 1000
+
+
+async def check_process(client, base_url):
+    """Проверяем сам процесс бота: /health и /ready"""
+    health, ready = await asyncio.gather(
+        client.get(f"{base_url}/health"), client.get(f"{base_url}/ready")
+    )
+    data = health.json()
+    lines = [f"Статус: {data.get('status')}, режим {data.get('mode')}"]
+    loop = data.get("loop", {})
+    if loop:
+        lines.append(f"Задержка event loop: {loop.get('lag_ms')} мс "
+                     f"(p50 {loop.get('lag_p50_ms')} мс, максимум {loop.get('lag_max_since_start_ms')} мс)")
+    for name, probe in data.get("probes", {}).items():
+        mark = "ok" if probe.get("ok") else f"ошибка {probe.get('error')}"
+        lines.append(f"Проверка {name}: {mark}, {probe.get('ms')} мс")
+    for name, queue in data.get("queues", {}).items():
+        lines.append(f"Очередь {name}: {queue['depth']} / {queue['limit']}")
+    for name, dependency in data.get("dependencies", {}).items():
+        lines.append(f"{name}: предохранитель {dependency.get('state')}")
 
-def check_skyeng_api():
+    ready_data = ready.json()
+    if ready.status_code != 200:
+        reasons = ", ".join(ready_data.get("reasons", [])) or f"режим {ready_data.get('mode')}"
+        lines.append(f"Не готов принимать апдейты: {reasons}")
+    return ready.status_code == 200, lines
+
+
+async def check_bot_health(client):
+    """Проверяем здоровье бота через Telegram API"""
+    bot_token = os.getenv("BOT_TOKEN")
+    if not bot_token:
+        return False, ["BOT_TOKEN не найден в .env файле"]
+
+    response = await client.get(f"https://api.telegram.org/bot{bot_token}/getMe")
+    if response.status_code != 200:
+        return False, [f"HTTP ошибка: {response.status_code}"]
+    data = response.json()
+    if not data.get("ok"):
+        return False, [f"Ошибка API: {data.get('description')}"]
+    bot_info = data.get("result", {})
+    return True, [f"Бот активен: @{bot_info.get('username')}",
+                  f"Имя: {bot_info.get('first_name')}",
+                  f"ID: {bot_info.get('id')}"]
+
+
+async def check_skyeng_api(client):
     """Проверяем доступность Skyeng API"""
-    try:
-        url = "https://dictionary.skyeng.ru/api/public/v1/words/search"
-        response = requests.get(url, params={"search": "test"}, timeout=10)
-        
-        if response.status_code == 200:
-            print("✅ Skyeng API доступен")
-            return True
-        else:
-            print(f"❌ Skyeng API недоступен: {response.status_code}")
-            return False
-            
-    except requests.exceptions.RequestException as e:
-        print(f"❌ Ошибка подключения к Skyeng API: {e}")
-        return False
+    response = await client.get(f"{SKYENG_BASE_URL}/words/search", params={"search": "test"})
+    if response.status_code != 200:
+        return False, [f"Skyeng API недоступен: {response.status_code}"]
+    return True, ["Skyeng API доступен"]
+
+
+async def main(args) -> bool:
+    async with httpx.AsyncClient(timeout=args.timeout) as client:
+        checks = [timed("Процесс бота", check_process(client, args.url.rstrip("/")))]
+        if not args.local:
+            checks.append(timed("Telegram API", check_bot_health(client)))
+            checks.append(timed("Skyeng API", check_skyeng_api(client)))
+        results = await asyncio.gather(*checks)
+
+    for name, ok, lines, ms in results:
+        print(f"{'✅' if ok else '❌'} {name} ({ms:.0f} мс)")
+        for line in lines:
+            print(f"   {line}")
+        print()
+    return all(ok for _, ok, _, _ in results)
+
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Проверка здоровья Lingua Bot")
+    parser.add_argument("--url", default=HEALTH_URL, help="адрес веб-сервера бота")
+    parser.add_argument("--local", action="store_true", help="только процесс бота, без внешних API")
+    parser.add_argument("--timeout", type=float, default=10.0)
+    args = parser.parse_args()
+
     print("🏥 Проверка здоровья Lingua Bot...")
     print("-" * 40)
-    
-    bot_ok = check_bot_health()
-    print()
-    
-    skyeng_ok = check_skyeng_api()
-    print()
-    
-    if bot_ok and skyeng_ok:
+
+    if asyncio.run(main(args)):
         print("🎉 Все системы работают нормально!")
-        exit(0)
+        sys.exit(0)
     else:
         print("⚠️  Обнаружены проблемы!")
-        exit(1)
+        sys.exit(1)